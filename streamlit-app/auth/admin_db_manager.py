@@ -1,10 +1,11 @@
 import psycopg2
 import streamlit as st
 from werkzeug.security import generate_password_hash
-from supabase import create_client, Client
+from supabase import Client
+from bledot_dash_src.supabase_client import get_shared_client
 
 def get_supabase_client() -> Client:
-    """Returns a configured Supabase client."""
+    """Returns the shared Supabase client."""
     url = st.secrets.supabase.get("SUPABASE_URL")
     key = st.secrets.supabase.get("SUPABASE_KEY")
     
@@ -13,7 +14,7 @@ def get_supabase_client() -> Client:
         return None
     
     try:
-        return create_client(url, key)
+        return get_shared_client(url, key)
     except Exception as e:
         st.error(f"Erro ao criar cliente Supabase: {e}")
         return None
@@ -1,9 +1,10 @@
 from werkzeug.security import check_password_hash
 import streamlit as st
-from supabase import create_client, Client
+from supabase import Client
+from bledot_dash_src.supabase_client import get_shared_client
 
 def get_supabase_client() -> Client:
-    """Returns a configured Supabase client."""
+    """Returns the shared Supabase client."""
     url = st.secrets.supabase.get("SUPABASE_URL")
     key = st.secrets.supabase.get("SUPABASE_KEY")
     
@@ -12,7 +13,7 @@ def get_supabase_client() -> Client:
         return None
     
     try:
-        return create_client(url, key)
+        return get_shared_client(url, key)
     except Exception as e:
         st.error(f"Erro ao criar cliente Supabase: {e}")
         return None
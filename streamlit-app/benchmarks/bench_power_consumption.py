@@ -0,0 +1,76 @@
+"""Times the power consumption history (data_coleta buckets + LTTB) as the
+history grows, checking it against a plain pandas resample
+
+The number of plotted points must stay within CHART_MAX_POINTS whatever the
+number of rows, while the min/max envelope of the series is kept.
+
+Run from the streamlit-app directory:
+    python benchmarks/bench_power_consumption.py --rows 100000 1000000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from bledot_dash_src.supabase_data import SupabaseData
+from bledot_dash_src.timeseries import default_bucket, default_max_points
+
+
+def reference_series(metrics_df: pd.DataFrame, bucket: str) -> pd.DataFrame:
+    """Every bucket of the history, without downsampling"""
+    power = metrics_df.set_index("data_coleta")["instant_power_consumption"]
+    return power.resample(bucket).agg(["mean", "min", "max"]).dropna()
+
+
+def make_metrics(rows: int, machines: int, sample_minutes: int, seed: int = 0) -> pd.DataFrame:
+    """Builds a newest-first metrics frame with some missing power samples"""
+    rng = np.random.default_rng(seed)
+    power = rng.uniform(10, 30, rows)
+    power[rng.random(rows) < 0.05] = np.nan
+
+    # Every machine reports once per sample interval
+    end = pd.Timestamp.now(tz="UTC")
+    data_coleta = end - pd.to_timedelta(np.arange(rows) // machines * sample_minutes, unit="min")
+    return pd.DataFrame({
+        "id_maquina": np.arange(rows) % machines + 1,
+        "data_coleta": data_coleta,
+        "instant_power_consumption": power,
+    })
+
+
+def time_call(func, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--machines", type=int, default=50)
+    parser.add_argument("--sample-minutes", type=int, default=5)
+    args = parser.parse_args()
+
+    # The transform does not touch the connection, so no client is needed
+    supabase_data = SupabaseData.__new__(SupabaseData)
+
+    print(f"{'rows':>10} {'buckets':>8} {'points':>7} {'resample (s)':>13} {'series (s)':>11}")
+    for rows in args.rows:
+        metrics_df = make_metrics(rows, args.machines, args.sample_minutes)
+
+        reference_time, expected = time_call(reference_series, metrics_df, default_bucket)
+        series_time, result = time_call(supabase_data._get_power_consumption, metrics_df)
+
+        assert len(result) == min(len(expected), default_max_points)
+        np.testing.assert_allclose(result["min"].min(), expected["min"].min())
+        np.testing.assert_allclose(result["max"].max(), expected["max"].max())
+        if len(expected) <= default_max_points:
+            np.testing.assert_allclose(result["avg"], expected["mean"])
+
+        print(
+            f"{rows:>10} {len(expected):>8} {len(result):>7} "
+            f"{reference_time:>13.4f} {series_time:>11.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Times the data transforms and chart builders over synthetic fleets of
+several sizes, saving baselines and comparing runs against them
+
+Covers the KPIs, issues report, power consumption, machine config and export
+transforms of SupabaseData, and the chart builders of charts.py (each built
+and serialized to a Vega-Lite spec, as on a chart cache miss). Each case is
+timed as the best of its repeats.
+
+Run from the streamlit-app directory:
+    python benchmarks/bench_transforms.py --machines 10 100 1000 --save reference
+    python benchmarks/bench_transforms.py --machines 10 100 1000 --compare reference
+
+Baselines are kept in benchmarks/baselines/<name>.json, and only compare with
+runs of the same fleet parameters on the same hardware. Comparing exits with
+status 1 when a case is slower than its baseline by more than --tolerance (and
+by more than --min-delta seconds, so timer noise on the fastest cases is not
+reported).
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Callable
+import numpy as np
+import pandas as pd
+from synthetic_fleet import make_fleet
+from bledot_dash_src import charts
+from bledot_dash_src.download_metrics import get_download_data
+from bledot_dash_src.supabase_data import SupabaseData
+from bledot_dash_src.view_models import company_view_models
+
+
+baselines_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+
+def time_case(func: Callable[[], object], repeat: int, budget: float) -> float:
+    """Best wall time of up to repeat runs, stopping early once budget seconds are spent"""
+    best = float("inf")
+    spent = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        if spent >= budget:
+            break
+    return best
+
+
+def chart_spec(builder: Callable, **kwargs) -> Callable[[], str]:
+    return lambda: builder(**kwargs).to_json(indent=None)
+
+
+def gauge_kwargs(gauge) -> dict:
+    kwargs = dict(gauge)
+    kwargs.pop("kind")
+    return kwargs
+
+
+def fleet_cases(
+    supabase_data: SupabaseData, machines_df: pd.DataFrame, metrics_df: pd.DataFrame, formats: list[str]
+) -> dict[str, Callable[[], object]]:
+    """Cases of one fleet: name -> function to be timed"""
+    first_machine = metrics_df[metrics_df["id_maquina"] == machines_df["id"].iloc[0]]
+
+    # The chart arguments come from the company views of the fleet, as in the dashboards
+    summary_stats = supabase_data._get_summary_stats(machines_df, metrics_df)
+    views = company_view_models(
+        {"summary_stats": summary_stats, "latest_metrics": metrics_df, "machines": machines_df},
+        supabase_data._metrics_threshold,
+    )
+    power = dict(views["overview"]["power"])
+
+    cases = {
+        "_get_metrics_kpi": lambda: supabase_data._get_metrics_kpi(metrics_df),
+        "_get_metrics_kpi(by_machine)": lambda: supabase_data._get_metrics_kpi(metrics_df, by_machine=True),
+        "_get_issues_report": lambda: supabase_data._get_issues_report(metrics_df),
+        "_get_power_consumption": lambda: supabase_data._get_power_consumption(metrics_df),
+        "_get_machine_config": lambda: supabase_data._get_machine_config(first_machine),
+    }
+    for file_format in formats:
+        cases[f"get_download_data({file_format})"] = (
+            lambda file_format=file_format: get_download_data(metrics_df, file_format)
+        )
+
+    cases.update({
+        "create_speed_chart": chart_spec(
+            charts.create_speed_chart, **gauge_kwargs(views["overview"]["ram_usage"])
+        ),
+        "create_hsbar_chart": chart_spec(
+            charts.create_hsbar_chart, **gauge_kwargs(views["hardware"]["disks"][0][0])
+        ),
+        "create_card_chart": chart_spec(
+            charts.create_card_chart, **gauge_kwargs(views["overview"]["failures"])
+        ),
+        "create_line_chart": chart_spec(charts.create_line_chart, **power),
+        "create_gauge_grid": chart_spec(
+            charts.create_gauge_grid, grid=[list(row) for row in views["processing"]["gauges"]]
+        ),
+    })
+    return cases
+
+
+def fleet_params(args: argparse.Namespace) -> dict:
+    return {"sample_minutes": args.sample_minutes, "days": args.days, "seed": args.seed}
+
+
+def load_baseline(name: str) -> dict:
+    with open(os.path.join(baselines_dir, f"{name}.json"), encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_baseline(name: str, results: dict, args: argparse.Namespace) -> str:
+    os.makedirs(baselines_dir, exist_ok=True)
+    path = os.path.join(baselines_dir, f"{name}.json")
+    baseline = {
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+        },
+        "fleet": fleet_params(args),
+        "seconds": results,
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+        file.write("\n")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--machines", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--sample-minutes", type=int, default=5)
+    parser.add_argument("--days", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--formats", nargs="+", default=["csv", "parquet"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=5.0, help="seconds spent at most on each case")
+    parser.add_argument("--save", metavar="NAME", help="save the results as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="compare the results with a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="slowdown allowed when comparing")
+    parser.add_argument("--min-delta", type=float, default=0.02, help="seconds of slowdown always allowed")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        saved = load_baseline(args.compare)
+        baseline = saved["seconds"]
+        if saved["fleet"] != fleet_params(args):
+            print(f"Warning: the baseline was saved with the fleet {saved['fleet']}")
+
+    # The transforms do not touch the connection, so a stand-in client is enough
+    supabase_data = SupabaseData(client=object(), concurrent=False)
+
+    results = {}
+    regressions = []
+    print(f"{'case':<32} {'machines':>8} {'rows':>9} {'seconds':>10} {'baseline':>10} {'ratio':>7}")
+    for machines in args.machines:
+        machines_df, metrics_df = make_fleet(machines, args.sample_minutes, args.days, args.seed)
+
+        for name, func in fleet_cases(supabase_data, machines_df, metrics_df, args.formats).items():
+            key = f"{name}@{machines}"
+            seconds = time_case(func, args.repeat, args.budget)
+            results[key] = seconds
+
+            expected = baseline.get(key)
+            ratio = seconds / expected if expected else float("nan")
+            flag = ""
+            if expected and ratio > 1 + args.tolerance and seconds - expected > args.min_delta:
+                regressions.append(key)
+                flag = " !"
+            print(
+                f"{name:<32} {machines:>8} {len(metrics_df):>9} {seconds:>10.4f} "
+                f"{expected if expected else float('nan'):>10.4f} {ratio:>7.2f}{flag}"
+            )
+
+    if args.save:
+        print(f"Saved {save_baseline(args.save, results, args)}")
+
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than the baseline by more than {args.tolerance:.0%}:")
+        for key in regressions:
+            print(f"  {key}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
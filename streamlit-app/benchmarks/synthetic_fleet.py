@@ -0,0 +1,232 @@
+"""Builds a reproducible synthetic fleet: maquinas and metricas_maquina rows
+with the columns of sql/local_schema.sql
+
+Each machine reports once per sample interval over the window, with its own
+load profile, idle periods, SMART and firewall status, packet loss pings and
+installed software list. The same arguments (seed included) give the same
+rows, relative to the end of the window.
+
+Run from the streamlit-app directory to write the rows as JSON lines, as
+returned by the database (e.g. to fill a local Postgres stand-in):
+    python benchmarks/synthetic_fleet.py --machines 50 --sample-minutes 5 --days 7 --out fleet
+"""
+import argparse
+import json
+import os
+import uuid
+import numpy as np
+import pandas as pd
+
+
+default_company_id = str(uuid.UUID(int=0xB1ED07))
+
+# Number of pings in each packet loss sample
+pkg_loss_pings = 4
+
+software_catalog = [
+    "firefox", "google-chrome", "libreoffice", "code", "python3", "git", "docker",
+    "slack", "zoom", "spotify", "vlc", "gimp", "inkscape", "thunderbird", "htop",
+    "openssh-server", "nodejs", "postgresql-client", "teams", "keepassxc",
+]
+operating_systems = [("Linux", "6.8.0-45-generic"), ("Linux", "6.5.0-41-generic"), ("Windows", "10.0.22631")]
+processors = ["Intel Core i5-1235U", "Intel Core i7-12700", "AMD Ryzen 5 5600G", "AMD Ryzen 7 7840U"]
+gpus = ["NVIDIA GeForce RTX 3050", "NVIDIA GeForce GTX 1650", "AMD Radeon RX 6600", None]
+integrated_gpus = ["Intel UHD Graphics", "Intel Iris Xe Graphics", "AMD Radeon Graphics"]
+motherboards = [("Dell Inc.", "0K3CM7"), ("LENOVO", "3717"), ("ASUSTeK COMPUTER INC.", "PRIME B550M-A")]
+locations = [
+    ("Brazil", "Sao Paulo", "São Paulo", -23.55, -46.63),
+    ("Brazil", "Minas Gerais", "Belo Horizonte", -19.92, -43.94),
+    ("Brazil", "Rio de Janeiro", "Rio de Janeiro", -22.91, -43.17),
+]
+
+
+def end_of_window(now: pd.Timestamp | None = None) -> pd.Timestamp:
+    return pd.Timestamp.now(tz="UTC").floor("min") if now is None else pd.Timestamp(now)
+
+
+def make_machines(
+    machines: int,
+    company_id: str = default_company_id,
+    seed: int = 0,
+    now: pd.Timestamp | None = None,
+) -> pd.DataFrame:
+    """Builds the maquinas rows of a company (timestamps as loaded by SupabaseData)
+
+    About a tenth of the machines were last seen more than a day before now,
+    so they count as offline.
+    """
+    rng = np.random.default_rng(seed)
+    now = end_of_window(now)
+
+    offline = rng.random(machines) < 0.1
+    last_contact = np.where(
+        offline, rng.uniform(26, 24 * 30, machines), rng.uniform(0, 0.5, machines)
+    )
+    return pd.DataFrame({
+        "id": np.arange(1, machines + 1),
+        "id_empresa": company_id,
+        "label_maquina": [f"Máquina {i:04d}" for i in range(1, machines + 1)],
+        "data_registro": now - pd.to_timedelta(rng.uniform(30, 720, machines), unit="D"),
+        "ultimo_contato": now - pd.to_timedelta(last_contact, unit="h"),
+    })
+
+
+def _machine_config(machine_id: int, rng: np.random.Generator) -> dict:
+    """Config fields of a machine (constant over its rows)"""
+    operation_sys, os_version = operating_systems[rng.integers(len(operating_systems))]
+    motherboard_manuf, motherboard_name = motherboards[rng.integers(len(motherboards))]
+    country, region_name, city, lat, lon = locations[rng.integers(len(locations))]
+    mac = ":".join(f"{byte:02x}" for byte in rng.integers(0, 256, 6))
+    softwares = rng.choice(software_catalog, rng.integers(5, len(software_catalog)), replace=False)
+
+    return {
+        "host_name": f"host-{machine_id:04d}",
+        "model": f"Model {rng.integers(100, 999)}",
+        "operation_sys": operation_sys,
+        "os_version": os_version,
+        "architecture": "x86_64",
+        "processor": processors[rng.integers(len(processors))],
+        "gpu_name": gpus[rng.integers(len(gpus))],
+        "inter_gpu_name": integrated_gpus[rng.integers(len(integrated_gpus))],
+        "motherboard_manuf": motherboard_manuf,
+        "motherboard_name": motherboard_name,
+        "motherboard_snum": f"SN{rng.integers(10**9, 10**10)}",
+        "mac": mac,
+        "ipv4": f"10.0.{machine_id // 256}.{machine_id % 256}",
+        "ipv6": f"fe80::{machine_id:x}",
+        "installed_softwares": sorted(softwares.tolist()),
+        "country": country,
+        "region_name": region_name,
+        "city": city,
+        "lat": lat + rng.normal(0, 0.05),
+        "lon": lon + rng.normal(0, 0.05),
+    }
+
+
+def make_metrics(
+    machines_df: pd.DataFrame,
+    sample_minutes: int = 5,
+    days: float = 7,
+    seed: int = 0,
+    now: pd.Timestamp | None = None,
+) -> pd.DataFrame:
+    """Builds the metricas_maquina rows of some machines, newest first (by
+    data_coleta, then id) as returned by the metrics queries
+
+    Args:
+        machines_df: maquinas rows (make_machines)
+        sample_minutes: minutes between two samples of a machine
+        days: window covered by the samples, ending at now
+        seed: random seed
+        now: end of the window (the current minute by default)
+
+    Returns:
+        One row per machine and sample, with every column of the table
+    """
+    rng = np.random.default_rng(seed)
+    now = end_of_window(now)
+    machine_ids = machines_df["id"].to_numpy()
+    machines = len(machine_ids)
+    samples = max(1, int(days * 24 * 60 // sample_minutes))
+    rows = machines * samples
+
+    # Newest sample first, every machine reporting with a jitter of its own
+    # (within a sample, machines are ordered by their jitter)
+    jitter = rng.uniform(0, min(sample_minutes * 60, 60), machines)
+    order = np.argsort(jitter, kind="stable")
+    step = np.repeat(np.arange(samples), machines)
+    machine = np.tile(order, samples)
+    data_coleta = now - pd.to_timedelta(step * sample_minutes * 60 + jitter[machine], unit="s")
+
+    def profile(low: float, high: float, noise: float) -> np.ndarray:
+        """Per-machine level plus noise, within [0, 1]"""
+        level = rng.uniform(low, high, machines)
+        return np.clip(level[machine] + rng.normal(0, noise, rows), 0, 1)
+
+    idle = rng.random(rows) < 0.15
+    cpu_usage = profile(0.05, 0.9, 0.1)
+    gpu_usage = profile(0.0, 0.7, 0.1)
+    power = np.round(10 + 20 * cpu_usage + rng.normal(0, 1.5, rows), 2)
+    power[rng.random(rows) < 0.02] = np.nan
+
+    smart_failing = rng.random(machines) < 0.05
+    firewall_flagged = rng.random(machines) < 0.2
+    pkg_loss = np.round(np.clip(rng.exponential(0.8, (rows, pkg_loss_pings)) - 0.5, 0, 100), 1)
+
+    configs = [_machine_config(int(machine_id), rng) for machine_id in machine_ids]
+    config_df = pd.DataFrame(configs).iloc[machine].reset_index(drop=True)
+
+    metrics_df = pd.DataFrame({
+        "id": rows - np.arange(rows),
+        "id_maquina": machine_ids[machine],
+        "data_coleta": data_coleta,
+        "cpu_usage": cpu_usage.round(3),
+        "ram_usage": profile(0.3, 0.95, 0.05).round(3),
+        "swap_usage": profile(0.0, 0.4, 0.05).round(3),
+        "gpu_usage": gpu_usage.round(3),
+        "cpu_temperature": np.round(35 + 50 * cpu_usage + rng.normal(0, 3, rows), 1),
+        "gpu_temperature": np.round(35 + 45 * gpu_usage + rng.normal(0, 3, rows), 1),
+        "gpu_voltage": np.round(0.7 + 0.4 * gpu_usage + rng.normal(0, 0.02, rows), 3),
+        "fan_rpm_cpu": np.round(800 + 2200 * cpu_usage),
+        "fan_rpm_gpu": np.round(600 + 2400 * gpu_usage),
+        "disk_usage_root": profile(0.3, 0.98, 0.005).round(3),
+        "disk_usage_home": profile(0.1, 0.9, 0.005).round(3),
+        "disk_usage_boot": profile(0.1, 0.6, 0.005).round(3),
+        "battery_health": profile(0.6, 1.0, 0.001).round(3),
+        "click_rate": np.where(idle, 0.0, rng.gamma(2, 0.5, rows).round(2)),
+        "keypress_rate": np.where(idle, 0.0, rng.gamma(2, 1.5, rows).round(2)),
+        "recent_hardware_failures": rng.poisson(0.02, rows),
+        "failed_logins": rng.poisson(0.5, rows),
+        "instant_power_consumption": power,
+        "smart_overall": np.where(smart_failing[machine], "FAILED", "PASSED"),
+        "firewall_active": np.where(firewall_flagged[machine], "TRUE", "FALSE"),
+        "pkg_loss_list": pkg_loss.tolist(),
+    })
+
+    return pd.concat([metrics_df, config_df], axis=1)
+
+
+def make_fleet(
+    machines: int,
+    sample_minutes: int = 5,
+    days: float = 7,
+    seed: int = 0,
+    now: pd.Timestamp | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Builds the maquinas and metricas_maquina rows of a company"""
+    now = end_of_window(now)
+    machines_df = make_machines(machines, seed=seed, now=now)
+    return machines_df, make_metrics(machines_df, sample_minutes, days, seed=seed + 1, now=now)
+
+
+def to_records(df: pd.DataFrame) -> list[dict]:
+    """Converts rows to the JSON records returned by the database (ISO timestamps, nulls)"""
+    records = df.astype(object).where(df.notna(), None)
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            records[column] = df[column].map(lambda value: value.isoformat())
+    return records.to_dict("records")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--machines", type=int, default=50)
+    parser.add_argument("--sample-minutes", type=int, default=5)
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="fleet")
+    args = parser.parse_args()
+
+    machines_df, metrics_df = make_fleet(args.machines, args.sample_minutes, args.days, args.seed)
+
+    os.makedirs(args.out, exist_ok=True)
+    for table, df in (("maquinas", machines_df), ("metricas_maquina", metrics_df)):
+        path = os.path.join(args.out, f"{table}.jsonl")
+        with open(path, "w", encoding="utf-8") as file:
+            for record in to_records(df):
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"{path}: {len(df)} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import streamlit as st
 from src.bledot_dash_src.session_state import init_session_state, set_session_state
 from auth.auth_handler import authenticate, logout  # imports authentication functions
+from bledot_dash_src.hot_path import serve_metrics
 
 def config_page():
     """Configures page layout"""
@@ -32,4 +33,6 @@ def run_page():
 
 if __name__ == "__main__":
     config_page()
+    # Local Prometheus endpoint of the hot path timings (once per process, when METRICS_PORT is set)
+    serve_metrics()
     run_page()
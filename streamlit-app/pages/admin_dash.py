@@ -1,9 +1,103 @@
+import pandas as pd
 import streamlit as st
 from auth.admin_db_manager import list_companies, add_company, set_company_password
+from bledot_dash_src.chart_cache import chart_cache
+from bledot_dash_src.fragments import rerun_stats
+from bledot_dash_src.hot_path import hot_path_stats
+from bledot_dash_src.session_inspector import session_inspector
+from bledot_dash_src.shared_data import shared_datasets
 
 def config_page():
     st.set_page_config(layout="wide", page_title="Admin - Bledot")
 
+def show_session_memory():
+    """Shows the estimated memory of the session states, by session and by key"""
+    refresh = st.button("Atualizar medição")
+    report = session_inspector.report(refresh=refresh)
+    keys = report["keys"]
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Sessões ativas", report["active_sessions"])
+    col2.metric("Sessões abertas", report["sessions"])
+    col3.metric("Memória estimada (MB)", f"{report['estimated_bytes'] / 2**20:.1f}")
+    col4.metric("Dados compartilhados (MB)", f"{shared_datasets.stats()['bytes'] / 2**20:.1f}")
+    st.caption(
+        f"{report['sampled_sessions']} de {report['sessions']} sessões medidas por amostragem "
+        f"em {report['seconds'] * 1000:.0f} ms."
+    )
+
+    if keys.empty:
+        st.info("Nenhuma sessão encontrada.")
+        return
+
+    st.subheader("Por chave")
+    by_key = keys.groupby("key")[["bytes", "shared_bytes"]].agg(["sum", "max"])
+    by_key.columns = ["total_bytes", "max_bytes", "total_shared_bytes", "max_shared_bytes"]
+    st.dataframe(by_key.sort_values("total_bytes", ascending=False), width="stretch")
+
+    st.subheader("Por sessão")
+    by_session = keys.groupby("session")[["bytes", "shared_bytes"]].sum()
+    by_session["keys"] = keys.groupby("session").size()
+    st.dataframe(by_session.sort_values("bytes", ascending=False), width="stretch")
+
+def show_hot_paths():
+    """Shows the wall time, payload and cache hits of the data layer calls"""
+    stats = hot_path_stats.stats()
+    if not stats:
+        st.info("Nenhuma consulta registrada.")
+        return
+
+    st.dataframe(
+        pd.DataFrame.from_dict(stats, orient="index").sort_values("seconds", ascending=False),
+        column_config={
+            "calls": "Chamadas",
+            "hits": "Acertos de cache",
+            "errors": "Erros",
+            "rows": "Linhas",
+            "bytes": "Bytes",
+            "seconds": st.column_config.NumberColumn("Tempo total (s)", format="%.3f"),
+            "mean_seconds": st.column_config.NumberColumn("Tempo médio (s)", format="%.4f"),
+            "p50_seconds": st.column_config.NumberColumn("p50 (s, limite)", format="%.3f"),
+            "p95_seconds": st.column_config.NumberColumn("p95 (s, limite)", format="%.3f"),
+        },
+        width="stretch",
+    )
+    st.download_button(
+        "Exportar (Prometheus)",
+        hot_path_stats.to_prometheus(),
+        file_name="metrics.txt",
+        mime="text/plain",
+    )
+
+def show_reruns():
+    """Shows the runs of the pages and fragments (fragment-only reruns end in .rerun)"""
+    stats = rerun_stats.stats()
+    if not stats:
+        st.info("Nenhuma execução registrada.")
+        return
+
+    st.dataframe(
+        pd.DataFrame.from_dict(stats, orient="index").sort_index(),
+        column_config={
+            "runs": "Execuções",
+            "seconds": st.column_config.NumberColumn("Tempo total (s)", format="%.3f"),
+            "mean_seconds": st.column_config.NumberColumn("Tempo médio (s)", format="%.4f"),
+            "last_seconds": st.column_config.NumberColumn("Última (s)", format="%.4f"),
+        },
+        width="stretch",
+    )
+
+def show_chart_cache():
+    """Shows the hit rate of the server-wide chart cache"""
+    stats = chart_cache.stats()
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Taxa de acerto", f"{stats['hit_rate']:.1%}")
+    col2.metric("Acertos", stats["hits"])
+    col3.metric("Faltas", stats["misses"])
+    col4.metric("Descartes", stats["evictions"])
+    col5.metric("Gráficos guardados", f"{stats['entries']} / {chart_cache.max_entries}")
+
 def run_page():
     # Only allow access if user is admin
     if st.session_state.get("role") != "admin":
@@ -61,6 +155,22 @@ def run_page():
             hide_index=True
         )
         
+    # Memory of the session states
+    st.divider()
+    st.header("Memória das Sessões")
+    show_session_memory()
+
+    # Timings of the data layer
+    st.divider()
+    st.header("Desempenho da Camada de Dados")
+    show_hot_paths()
+
+    st.subheader("Execuções das Páginas e Fragmentos")
+    show_reruns()
+
+    st.subheader("Cache de Gráficos")
+    show_chart_cache()
+
     if st.button("Logout"):
         from auth.auth_handler import logout
         logout()
@@ -1,4 +1,3 @@
-import os
 import streamlit as st
 import traceback
 from src.bledot_dash_src.supabase_data import SupabaseData
@@ -8,6 +7,12 @@ from src.bledot_dash_src.session_state import (
     get_session_state,
     check_session_state,
 )
+from bledot_dash_src.fragments import fragment, timed
+from bledot_dash_src.download_metrics import export_cache, export_formats, exportable
+from bledot_dash_src.live_feed import default_refresh_seconds, get_live_feed
+from bledot_dash_src.settings import get_setting
+from bledot_dash_src.shared_data import get_session_datasets, get_shared_state, set_shared_state
+from bledot_dash_src.view_models import company_view_models
 from src.bledot_dash_src.company_dashes.overview import run_overview_dash
 from src.bledot_dash_src.company_dashes.processing import run_processing_dash
 from src.bledot_dash_src.company_dashes.hardware import run_hardware_dash
@@ -17,88 +22,192 @@ from auth.user_db_manager import change_password_form
 from auth.auth_handler import logout
 
 
+def build_export(key: tuple, metrics_df) -> None:
+    """Builds an export of the latest metrics, fetched again with every column"""
+    if not exportable(metrics_df):
+        return
+    export_cache.build(key, lambda: SupabaseData().get_metrics_by_ids(metrics_df["id"].tolist()))
+
+
 def download_metrics():
-    with st.spinner("Carregando métricas..."):
+    """Offers the metrics export, built only when requested (once per company data version)"""
+    file_format = st.selectbox(
+        "Formato da planilha:",
+        list(export_formats),
+        format_func=lambda key: export_formats[key]["label"],
+    )
+
+    metrics_df = get_shared_state("company_data")["latest_metrics"]
+    key = export_cache.key(get_session_state("company_id"), metrics_df, file_format)
+    data = export_cache.peek(key)
+
+    if data is None:
+        st.button(
+            "Gerar planilha de métricas",
+            on_click=build_export,
+            args=(key, metrics_df),
+            disabled=not exportable(metrics_df),
+            icon=":material/table_view:",
+            type="secondary",
+            width="stretch",
+        )
+    else:
         st.download_button(
             label="Baixar planilha de métricas",
-            file_name="metrics.csv",
-            data=get_session_state("download_data"),
-            on_click="rerun",
+            file_name=f"metrics.{export_formats[file_format]['extension']}",
+            mime=export_formats[file_format]["mime"],
+            data=data,
+            on_click="ignore",
             icon=":material/download:",
             type="secondary",
         )
 
 
-def make_sidebar(tab_options: list[str]) -> str:
-    with st.spinner("Processando..."):
-        init_session_state("selected_tab", tab_options[0])
-        company_data = get_session_state("company_data")
+def select_tab(tab_options: list[str]) -> str:
+    """Shows the tab selector and gets the selected tab"""
+    selected_tab = init_session_state("selected_tab", tab_options[0])
+    if selected_tab not in tab_options:
+        selected_tab = tab_options[0]
 
-    with st.sidebar:
-        st.markdown(
-            "<h1 style='text-align: center; font-size: 52px; font-weight: bold'>Bledot</h1>",
-            unsafe_allow_html=True,
-        )
-        st.divider()
+    tab_option = st.segmented_control(
+        "Aba",
+        tab_options,
+        default=selected_tab,
+        key="company_tab_selector",
+        label_visibility="collapsed",
+    )
+
+    # Clicking the selected tab again clears the selection, which keeps the tab
+    if tab_option is None:
+        tab_option = selected_tab
+    set_session_state("selected_tab", tab_option)
 
-        for tab_option in tab_options:
-            if tab_option == "Alterar Senha":
-                st.divider()
+    return tab_option
 
-            if st.button(tab_option, width="stretch"):
-                set_session_state("selected_tab", tab_option)
 
-        st.divider()
+def make_sidebar():
+    """Runs the sidebar, meant to run as a fragment so its widgets only rerun it"""
+    company_data = get_shared_state("company_data")
 
-        # Verify if there is a 'label_maquina' or similar column
-        machine_columns = company_data["machines"].columns
-        machine_label_col = None
+    st.markdown(
+        "<h1 style='text-align: center; font-size: 52px; font-weight: bold'>Bledot</h1>",
+        unsafe_allow_html=True,
+    )
+    st.divider()
 
-        for col in ["label_maquina", "nome_maquina", "machine_name", "name", "id"]:
-            if col in machine_columns:
-                machine_label_col = col
-                break
+    # Verify if there is a 'label_maquina' or similar column
+    machine_columns = company_data["machines"].columns
+    machine_label_col = None
 
-        if machine_label_col:
-            target_machine_label = st.selectbox(
-                "Selecione uma máquina:",
-                company_data["machines"][machine_label_col].unique(),
+    for col in ["label_maquina", "nome_maquina", "machine_name", "name", "id"]:
+        if col in machine_columns:
+            machine_label_col = col
+            break
+
+    if machine_label_col:
+        target_machine_label = st.selectbox(
+            "Selecione uma máquina:",
+            company_data["machines"][machine_label_col].unique(),
+        )
+    else:
+        st.warning("Nenhuma coluna de identificação de máquina encontrada")
+        target_machine_label = None
+
+    if (
+        st.button("Ver informações da máquina", type="secondary", width="stretch")
+        and target_machine_label
+    ):
+        set_session_state("target_machine", target_machine_label)
+        st.switch_page("pages/machine_dash.py")
+
+    st.divider()
+    if st.session_state.get("role") == "admin":
+        if st.button("Área do administrador", width="stretch"):
+            st.switch_page("pages/admin_dash.py")
+
+    download_metrics()
+
+    if st.button("Logout", width="stretch"):
+        logout()
+
+
+def store_company_data(company_data) -> None:
+    """Stores references to a company data snapshot and its tab views in session
+
+    The views are built once for all the sessions holding the same snapshot
+    (same content version), and only if the company has machines (the tabs are
+    not shown otherwise).
+    """
+    key = ("company_data", company_data["client_id"], company_data["version"])
+    company_data = set_shared_state("company_data", key, company_data)
+    set_session_state("loaded_company_id", company_data["client_id"])
+    set_session_state(
+        "machines_with_issues",
+        company_data["summary_stats"]["machines_with_issues"],
+    )
+    if company_data["machines"].empty:
+        return
+
+    metrics_threshold = get_session_state("metrics_threshold")
+    get_session_datasets().get_or_build(
+        "company_view",
+        ("company_view", *key),
+        lambda: company_view_models(company_data, metrics_threshold),
+        keep=("company_data",),
+    )
+
+
+def run_tab(tab_option: str, tab_options: list[str]):
+    """Runs the dashboard of the selected tab"""
+    if tab_option == tab_options[0]:
+        run_overview_dash()
+    elif tab_option == tab_options[1]:
+        run_processing_dash()
+    elif tab_option == tab_options[2]:
+        run_hardware_dash()
+    elif tab_option == tab_options[3]:
+        run_software_dash()
+    elif tab_option == tab_options[4]:
+        change_password_form()
+    elif tab_option == tab_options[5]:
+        run_issues_dash()
+
+
+def apply_live_updates(live_feed):
+    """Rebuilds the company data when live updates arrive"""
+    company_id = get_session_state("company_id")
+    version = live_feed.version(company_id)
+
+    if get_session_state("live_version") != version:
+        company_data = SupabaseData().load_live_client_dashboard_data(
+            get_shared_state("company_data"), live_feed.last_contacts(company_id)
+        )
+        if company_data is not get_shared_state("company_data"):
+            store_company_data(company_data)
+            set_session_state(
+                "issues", company_data["summary_stats"]["machines_with_issues"].rules_present()
             )
-        else:
-            st.warning("Nenhuma coluna de identificação de máquina encontrada")
-            target_machine_label = None
+        set_session_state("live_version", version)
 
-        if (
-            st.button("Ver informações da máquina", type="secondary", width="stretch")
-            and target_machine_label
-        ):
-            set_session_state("target_machine", target_machine_label)
-            st.switch_page("pages/machine_dash.py")
 
-        st.divider()
-        if st.session_state.get("role") == "admin":
-            if st.button("Área do administrador", width="stretch"):
-                st.switch_page("pages/admin_dash.py")
+def run_tab_body(live_feed, tab_options: list[str]):
+    """Runs the tab selector and the selected tab
 
-        download_metrics()
+    Meant to run as a fragment, so switching tabs (or checking live updates)
+    only reruns the tab body.
+    """
+    tab_option = select_tab(tab_options)
 
-        if st.button("Logout", width="stretch"):
-            logout()
+    if live_feed is not None:
+        apply_live_updates(live_feed)
 
-    return get_session_state("selected_tab")
+    run_tab(tab_option, tab_options)
 
 
 def config_page():
     """Configures page layout"""
     st.set_page_config(layout="wide", page_title="Dashboard - Bledot")
 
-    curr_dir = os.path.dirname(__file__)
-    download_dir = os.path.join(curr_dir, "temp")
-    if not os.path.exists(download_dir):
-        os.mkdir(download_dir)
-
-    init_session_state("download_dir", download_dir)
-
 
 def run_page():
     """Runs page script"""
@@ -112,30 +221,30 @@ def run_page():
 
         company_id = get_session_state("company_id")
 
-        # Load data only if not already loaded or if company_id has changed
-        if (
-            "company_data" not in st.session_state
-            or st.session_state.get("loaded_company_id") != company_id
-        ):
-            # Load and return Supabase Database Client
-            supabase_data = SupabaseData()
-            company_data = supabase_data.load_client_dashboard_data(company_id)
+        # Get the shared snapshot of the company data (reloaded when its TTL expires)
+        supabase_data = SupabaseData()
+        company_data = supabase_data.load_cached_client_dashboard_data(company_id)
 
-            # Store data in session
-            set_session_state("company_data", company_data)
-            set_session_state("loaded_company_id", company_id)
-        else:
-            company_data = get_session_state("company_data")
+        # In live mode, pushed changes are applied to the cached data without reloading
+        live_feed = get_live_feed()
+
+        # Store a reference to the snapshot in session (the live version is reset
+        # only when a new snapshot is served)
+        if get_shared_state("company_data") is not company_data and live_feed is not None:
+            set_session_state("live_version", live_feed.version(company_id))
+        store_company_data(company_data)
+
+        if live_feed is not None and not company_data["machines"].empty:
+            live_feed.subscribe(company_id, company_data["machines"]["id"].tolist())
 
         if not company_data["machines"].empty:
             summary_data = company_data["summary_stats"]
-            issues = set()
-            for issue_list in summary_data["machines_with_issues"].values():
-                for issue in issue_list:
-                    issues.add(issue)
-            set_session_state("issues", issues)
+            set_session_state(
+                "issues", summary_data["machines_with_issues"].rules_present()
+            )
 
             st.title(f"Métricas - {company_data['client_info']['nome_empresa']}")
+            st.caption(f"Indicadores e problemas calculados sobre {summary_data['kpi_window']}")
 
             tab_options = [
                 "Visão Geral",
@@ -146,30 +255,25 @@ def run_page():
                 "Máquinas comprometidas",
             ]
 
-            tab_option = make_sidebar(tab_options)
-
-            if tab_option == tab_options[0]:
-                run_overview_dash()
-            elif tab_option == tab_options[1]:
-                run_processing_dash()
-            elif tab_option == tab_options[2]:
-                run_hardware_dash()
-            elif tab_option == tab_options[3]:
-                run_software_dash()
-            elif tab_option == tab_options[4]:
-                change_password_form()
-            elif tab_option == tab_options[5]:
-                run_issues_dash()
+            with st.sidebar:
+                fragment("company_dash.sidebar", make_sidebar)()
+
+            run_every = None
+            if live_feed is not None:
+                run_every = get_setting("LIVE_REFRESH_SECONDS", default_refresh_seconds)
+            fragment("company_dash.tab", run_tab_body, run_every=run_every)(
+                live_feed, tab_options
+            )
 
         else:
             st.info("Nenhuma máquina encontrada para esta empresa")
-            tab_options = ["Alterar Senha"]
-            tab_option = make_sidebar(tab_options)
 
-            if tab_option == tab_options[0]:
-                change_password_form()
+            with st.sidebar:
+                fragment("company_dash.sidebar", make_sidebar)()
+
+            change_password_form()
 
 
 if __name__ == "__main__":
     config_page()
-    run_page()
+    timed("company_dash.page", run_page)()
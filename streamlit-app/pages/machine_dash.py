@@ -13,68 +13,144 @@ from src.bledot_dash_src.machine_dashes.hardware import run_hardware_dash
 from src.bledot_dash_src.machine_dashes.software import run_software_dash
 from src.bledot_dash_src.machine_dashes.issues import run_issues_dash
 from src.bledot_dash_src.machine_dashes.specifics import run_specifics_dash
+from bledot_dash_src.fragments import fragment, timed
+from bledot_dash_src.live_feed import default_refresh_seconds, get_live_feed
+from bledot_dash_src.settings import get_setting
+from bledot_dash_src.shared_data import get_session_datasets, get_shared_state, set_shared_state
+from bledot_dash_src.view_models import machine_view_models
 from auth.user_db_manager import change_password_form
 from auth.auth_handler import logout
 
 
-def make_sidebar(tab_options: list[str]) -> str:
-    with st.spinner("Processando..."):
-        init_session_state("selected_tab", tab_options[0])
-        company_data = get_session_state("company_data")
+def select_tab(tab_options: list[str]) -> str:
+    """Shows the tab selector and gets the selected tab"""
+    selected_tab = init_session_state("selected_tab", tab_options[0])
+    if selected_tab not in tab_options:
+        selected_tab = tab_options[0]
 
-    with st.sidebar:
-        st.markdown(
-            "<h1 style='text-align: center; font-size: 52px; font-weight: bold'>Bledot</h1>",
-            unsafe_allow_html=True,
-        )
-        st.divider()
+    tab_option = st.segmented_control(
+        "Aba",
+        tab_options,
+        default=selected_tab,
+        key="machine_tab_selector",
+        label_visibility="collapsed",
+    )
 
-        for tab_option in tab_options:
-            if tab_option == "Alterar Senha":
-                st.divider()
+    # Clicking the selected tab again clears the selection, which keeps the tab
+    if tab_option is None:
+        tab_option = selected_tab
+    set_session_state("selected_tab", tab_option)
 
-            if st.button(tab_option, width="stretch"):
-                set_session_state("selected_tab", tab_option)
+    return tab_option
 
-        st.divider()
 
-        # Verify if there is a 'label_maquina' or similar column
-        machine_columns = company_data["machines"].columns
-        machine_label_col = None
+def make_sidebar():
+    """Runs the sidebar, meant to run as a fragment so its widgets only rerun it"""
+    company_data = get_shared_state("company_data")
 
-        for col in ["label_maquina", "nome_maquina", "machine_name", "name", "id"]:
-            if col in machine_columns:
-                machine_label_col = col
-                break
+    st.markdown(
+        "<h1 style='text-align: center; font-size: 52px; font-weight: bold'>Bledot</h1>",
+        unsafe_allow_html=True,
+    )
+    st.divider()
 
-        if machine_label_col:
-            target_machine_label = st.selectbox(
-                "Selecione uma máquina:",
-                company_data["machines"][machine_label_col].unique(),
-            )
-        else:
-            st.warning("Nenhuma coluna de identificação de máquina encontrada")
-            target_machine_label = None
+    # Verify if there is a 'label_maquina' or similar column
+    machine_columns = company_data["machines"].columns
+    machine_label_col = None
 
-        if (
-            st.button("Ver informações da máquina", type="secondary", width="stretch")
-            and target_machine_label
-        ):
-            set_session_state("target_machine", target_machine_label)
-            st.switch_page("pages/machine_dash.py")
+    for col in ["label_maquina", "nome_maquina", "machine_name", "name", "id"]:
+        if col in machine_columns:
+            machine_label_col = col
+            break
 
-        if st.button("Voltar à página da empresa", type="secondary", width="stretch"):
-            st.switch_page("pages/company_dash.py")
+    if machine_label_col:
+        target_machine_label = st.selectbox(
+            "Selecione uma máquina:",
+            company_data["machines"][machine_label_col].unique(),
+        )
+    else:
+        st.warning("Nenhuma coluna de identificação de máquina encontrada")
+        target_machine_label = None
+
+    if (
+        st.button("Ver informações da máquina", type="secondary", width="stretch")
+        and target_machine_label
+    ):
+        set_session_state("target_machine", target_machine_label)
+        st.switch_page("pages/machine_dash.py")
+
+    if st.button("Voltar à página da empresa", type="secondary", width="stretch"):
+        st.switch_page("pages/company_dash.py")
+
+    st.divider()
+    if st.session_state.get("role") == "admin":
+        if st.button("Área do administrador", width="stretch"):
+            st.switch_page("pages/admin_dash.py")
+
+    if st.button("Logout", width="stretch"):
+        logout()
+
+
+def store_machine_data(machine_data) -> None:
+    """Stores references to the machine data and its tab views in session
+
+    The data and the views are shared by the sessions with the same version of
+    the machine history.
+    """
+    machine_id = get_session_state("machine_id")
+    key = ("machine_data", machine_id, *machine_data.version)
+    machine_data = set_shared_state("machine_data", key, machine_data, keep=("company_data",))
+    if machine_data:
+        metrics_threshold = get_session_state("metrics_threshold")
+        get_session_datasets().get_or_build(
+            "machine_view",
+            ("machine_view", *key),
+            lambda: machine_view_models(machine_data, machine_id, metrics_threshold),
+            keep=("company_data", "machine_data"),
+        )
+
+
+def run_tab(tab_option: str, tab_options: list[str]):
+    """Runs the dashboard of the selected tab"""
+    if tab_option == tab_options[0]:
+        run_overview_dash()
+    elif tab_option == tab_options[1]:
+        run_processing_dash()
+    elif tab_option == tab_options[2]:
+        run_hardware_dash()
+    elif tab_option == tab_options[3]:
+        run_software_dash()
+    elif tab_option == tab_options[4]:
+        run_specifics_dash()
+    elif tab_option == tab_options[5]:
+        change_password_form()
+
+
+def apply_live_updates(live_feed):
+    """Rebuilds the machine data when live updates arrive"""
+    version = live_feed.version(get_session_state("company_id"))
+
+    if get_session_state("live_machine_version") != version:
+        machine_data = SupabaseData().load_live_machine_metrics_history(
+            get_session_state("machine_id"), get_shared_state("machine_data")["config"] or {}
+        )
+        if machine_data is not None:
+            store_machine_data(machine_data)
+        set_session_state("live_machine_version", version)
 
-        st.divider()
-        if st.session_state.get("role") == "admin":
-            if st.button("Área do administrador", width="stretch"):
-                st.switch_page("pages/admin_dash.py")
 
-        if st.button("Logout", width="stretch"):
-            logout()
+def run_tab_body(live_feed, tab_options: list[str]):
+    """Runs the tab selector and the selected tab
 
-    return get_session_state("selected_tab")
+    Meant to run as a fragment, so switching tabs (or checking live updates)
+    only reruns the tab body.
+    """
+    tab_option = select_tab(tab_options)
+
+    if live_feed is not None:
+        apply_live_updates(live_feed)
+
+    run_tab(tab_option, tab_options)
 
 
 def config_page():
@@ -97,26 +173,35 @@ def run_page():
             st.switch_page("pages/company_dash.py")
 
         machine_label = get_session_state("target_machine")
-        company_data = get_session_state("company_data")
+        # The company data may have been dropped from the session memory budget
+        company_data = get_shared_state("company_data")
+        if company_data is None:
+            st.switch_page("pages/company_dash.py")
+
         machine_id = company_data["machines"][
             company_data["machines"]["label_maquina"] == machine_label
         ]["id"].item()
         set_session_state("machine_id", machine_id)
 
+        # In live mode, pushed changes are applied to the cached data without reloading
+        live_feed = get_live_feed()
+
         # Load data only if not already loaded or if company_id has changed
-        if (
-            "machine_data" not in st.session_state
-            or st.session_state.get("loaded_machine_id") != machine_id
-        ):
+        machine_data = get_shared_state("machine_data")
+        if machine_data is None or st.session_state.get("loaded_machine_id") != machine_id:
             # Load and return Supabase Database Client
             supabase_data = SupabaseData()
-            machine_data = supabase_data.get_machine_metrics_history(machine_id)
+            machine_data = supabase_data.get_machine_metrics_history(
+                machine_id, company_id=get_session_state("company_id")
+            )
 
             # Store data in session
-            set_session_state("machine_data", machine_data)
+            store_machine_data(machine_data)
             set_session_state("loaded_machine_id", machine_id)
-        else:
-            machine_data = get_session_state("machine_data")
+            if live_feed is not None:
+                set_session_state(
+                    "live_machine_version", live_feed.version(get_session_state("company_id"))
+                )
 
         st.title(f"Métricas - {company_data['client_info']['nome_empresa']} - {machine_label}")
 
@@ -130,30 +215,28 @@ def run_page():
                 "Alterar Senha",
             ]
 
-            tab_option = make_sidebar(tab_options)
-
-            if tab_option == tab_options[0]:
-                run_overview_dash()
-            elif tab_option == tab_options[1]:
-                run_processing_dash()
-            elif tab_option == tab_options[2]:
-                run_hardware_dash()
-            elif tab_option == tab_options[3]:
-                run_software_dash()
-            elif tab_option == tab_options[4]:
-                run_specifics_dash()
-            elif tab_option == tab_options[5]:
-                change_password_form()
+            with st.sidebar:
+                fragment("machine_dash.sidebar", make_sidebar)()
+
+            run_every = None
+            if live_feed is not None:
+                live_feed.subscribe(
+                    get_session_state("company_id"), company_data["machines"]["id"].tolist()
+                )
+                run_every = get_setting("LIVE_REFRESH_SECONDS", default_refresh_seconds)
+            fragment("machine_dash.tab", run_tab_body, run_every=run_every)(
+                live_feed, tab_options
+            )
 
         else:
             st.info("Nenhuma informação encontrada para esta máquina")
-            tab_options = ["Alterar Senha"]
-            tab_option = make_sidebar(tab_options)
 
-            if tab_option == tab_options[0]:
-                change_password_form()
+            with st.sidebar:
+                fragment("machine_dash.sidebar", make_sidebar)()
+
+            change_password_form()
 
 
 if __name__ == "__main__":
     config_page()
-    run_page()
+    timed("machine_dash.page", run_page)()
@@ -0,0 +1,161 @@
+-- Database-side aggregates used by SupabaseData when pushdown is enabled.
+-- Apply to the Supabase project (SQL editor) or to a local Postgres stand-in.
+--
+-- The numeric metrics are listed column by column, so only those columns are
+-- read: the config and list columns of each row (installed_softwares,
+-- pkg_loss_list...) are never serialized. A new numeric metric needs a line in
+-- both functions.
+
+-- Mean, min, max and count of every numeric metric of a company's machines,
+-- either fleet-wide (id_maquina is null) or per machine
+create or replace function public.fleet_metric_kpis(
+    p_company_id public.maquinas.id_empresa%type,
+    p_since timestamptz default null,
+    p_per_machine boolean default false
+)
+returns table (
+    id_maquina public.metricas_maquina.id_maquina%type,
+    metric text,
+    mean double precision,
+    min double precision,
+    max double precision,
+    count bigint
+)
+language sql stable
+as $$
+    with stats as (
+        -- One [mean, min, max, count] array per metric, in a single scan
+        select
+            case when p_per_machine then m.id_maquina end as id_maquina,
+            array[avg(m.cpu_usage), min(m.cpu_usage), max(m.cpu_usage), count(m.cpu_usage)] as cpu_usage,
+            array[avg(m.ram_usage), min(m.ram_usage), max(m.ram_usage), count(m.ram_usage)] as ram_usage,
+            array[avg(m.swap_usage), min(m.swap_usage), max(m.swap_usage), count(m.swap_usage)] as swap_usage,
+            array[avg(m.gpu_usage), min(m.gpu_usage), max(m.gpu_usage), count(m.gpu_usage)] as gpu_usage,
+            array[avg(m.cpu_temperature), min(m.cpu_temperature), max(m.cpu_temperature), count(m.cpu_temperature)] as cpu_temperature,
+            array[avg(m.gpu_temperature), min(m.gpu_temperature), max(m.gpu_temperature), count(m.gpu_temperature)] as gpu_temperature,
+            array[avg(m.gpu_voltage), min(m.gpu_voltage), max(m.gpu_voltage), count(m.gpu_voltage)] as gpu_voltage,
+            array[avg(m.fan_rpm_cpu), min(m.fan_rpm_cpu), max(m.fan_rpm_cpu), count(m.fan_rpm_cpu)] as fan_rpm_cpu,
+            array[avg(m.fan_rpm_gpu), min(m.fan_rpm_gpu), max(m.fan_rpm_gpu), count(m.fan_rpm_gpu)] as fan_rpm_gpu,
+            array[avg(m.disk_usage_root), min(m.disk_usage_root), max(m.disk_usage_root), count(m.disk_usage_root)] as disk_usage_root,
+            array[avg(m.disk_usage_home), min(m.disk_usage_home), max(m.disk_usage_home), count(m.disk_usage_home)] as disk_usage_home,
+            array[avg(m.disk_usage_boot), min(m.disk_usage_boot), max(m.disk_usage_boot), count(m.disk_usage_boot)] as disk_usage_boot,
+            array[avg(m.battery_health), min(m.battery_health), max(m.battery_health), count(m.battery_health)] as battery_health,
+            array[avg(m.click_rate), min(m.click_rate), max(m.click_rate), count(m.click_rate)] as click_rate,
+            array[avg(m.keypress_rate), min(m.keypress_rate), max(m.keypress_rate), count(m.keypress_rate)] as keypress_rate,
+            array[avg(m.recent_hardware_failures), min(m.recent_hardware_failures), max(m.recent_hardware_failures), count(m.recent_hardware_failures)]::float8[] as recent_hardware_failures,
+            array[avg(m.failed_logins), min(m.failed_logins), max(m.failed_logins), count(m.failed_logins)]::float8[] as failed_logins,
+            array[avg(m.instant_power_consumption), min(m.instant_power_consumption), max(m.instant_power_consumption), count(m.instant_power_consumption)] as instant_power_consumption
+        from public.metricas_maquina m
+        join public.maquinas q on q.id = m.id_maquina
+        where q.id_empresa = p_company_id
+          and (p_since is null or m.data_coleta >= p_since)
+        group by 1
+    )
+    select s.id_maquina, kv.metric, kv.agg[1], kv.agg[2], kv.agg[3], kv.agg[4]::bigint
+    from stats s
+    cross join lateral (values
+        ('cpu_usage', s.cpu_usage),
+        ('ram_usage', s.ram_usage),
+        ('swap_usage', s.swap_usage),
+        ('gpu_usage', s.gpu_usage),
+        ('cpu_temperature', s.cpu_temperature),
+        ('gpu_temperature', s.gpu_temperature),
+        ('gpu_voltage', s.gpu_voltage),
+        ('fan_rpm_cpu', s.fan_rpm_cpu),
+        ('fan_rpm_gpu', s.fan_rpm_gpu),
+        ('disk_usage_root', s.disk_usage_root),
+        ('disk_usage_home', s.disk_usage_home),
+        ('disk_usage_boot', s.disk_usage_boot),
+        ('battery_health', s.battery_health),
+        ('click_rate', s.click_rate),
+        ('keypress_rate', s.keypress_rate),
+        ('recent_hardware_failures', s.recent_hardware_failures),
+        ('failed_logins', s.failed_logins),
+        ('instant_power_consumption', s.instant_power_consumption)
+    ) kv(metric, agg)
+    where kv.agg[4] > 0
+$$;
+
+-- Whether a value violates a {"val": <number>, "asc": <bool>} threshold (null
+-- when either of them is missing, so the row does not count)
+create or replace function public.fleet_threshold_hit(p_value double precision, p_threshold jsonb)
+returns boolean
+language sql immutable
+as $$
+    select case
+        when (p_threshold ->> 'asc')::boolean then p_value >= (p_threshold ->> 'val')::float8
+        else p_value <= (p_threshold ->> 'val')::float8
+    end
+    where p_threshold ->> 'asc' is not null
+$$;
+
+-- (machine, rule) pairs of the violated thresholds, where p_thresholds is
+-- {"<metric>": {"val": <number>, "asc": <bool>}, ...} and smart_overall and
+-- firewall_active are status rules
+create or replace function public.fleet_issue_flags(
+    p_company_id public.maquinas.id_empresa%type,
+    p_thresholds jsonb,
+    p_since timestamptz default null
+)
+returns table (
+    id_maquina public.metricas_maquina.id_maquina%type,
+    rule text
+)
+language sql stable
+as $$
+    with flags as (
+        -- Whether any row of each machine violates each rule, in a single scan
+        select
+            m.id_maquina,
+            bool_or(public.fleet_threshold_hit(m.cpu_usage, p_thresholds -> 'cpu_usage')) as cpu_usage,
+            bool_or(public.fleet_threshold_hit(m.ram_usage, p_thresholds -> 'ram_usage')) as ram_usage,
+            bool_or(public.fleet_threshold_hit(m.swap_usage, p_thresholds -> 'swap_usage')) as swap_usage,
+            bool_or(public.fleet_threshold_hit(m.gpu_usage, p_thresholds -> 'gpu_usage')) as gpu_usage,
+            bool_or(public.fleet_threshold_hit(m.cpu_temperature, p_thresholds -> 'cpu_temperature')) as cpu_temperature,
+            bool_or(public.fleet_threshold_hit(m.gpu_temperature, p_thresholds -> 'gpu_temperature')) as gpu_temperature,
+            bool_or(public.fleet_threshold_hit(m.gpu_voltage, p_thresholds -> 'gpu_voltage')) as gpu_voltage,
+            bool_or(public.fleet_threshold_hit(m.fan_rpm_cpu, p_thresholds -> 'fan_rpm_cpu')) as fan_rpm_cpu,
+            bool_or(public.fleet_threshold_hit(m.fan_rpm_gpu, p_thresholds -> 'fan_rpm_gpu')) as fan_rpm_gpu,
+            bool_or(public.fleet_threshold_hit(m.disk_usage_root, p_thresholds -> 'disk_usage_root')) as disk_usage_root,
+            bool_or(public.fleet_threshold_hit(m.disk_usage_home, p_thresholds -> 'disk_usage_home')) as disk_usage_home,
+            bool_or(public.fleet_threshold_hit(m.disk_usage_boot, p_thresholds -> 'disk_usage_boot')) as disk_usage_boot,
+            bool_or(public.fleet_threshold_hit(m.battery_health, p_thresholds -> 'battery_health')) as battery_health,
+            bool_or(public.fleet_threshold_hit(m.click_rate, p_thresholds -> 'click_rate')) as click_rate,
+            bool_or(public.fleet_threshold_hit(m.keypress_rate, p_thresholds -> 'keypress_rate')) as keypress_rate,
+            bool_or(public.fleet_threshold_hit(m.recent_hardware_failures, p_thresholds -> 'recent_hardware_failures')) as recent_hardware_failures,
+            bool_or(public.fleet_threshold_hit(m.failed_logins, p_thresholds -> 'failed_logins')) as failed_logins,
+            bool_or(public.fleet_threshold_hit(m.instant_power_consumption, p_thresholds -> 'instant_power_consumption')) as instant_power_consumption,
+            bool_or(m.smart_overall not in ('PASSED', 'OK')) as smart_overall,
+            bool_or(m.firewall_active = 'TRUE') as firewall_active
+        from public.metricas_maquina m
+        join public.maquinas q on q.id = m.id_maquina
+        where q.id_empresa = p_company_id
+          and (p_since is null or m.data_coleta >= p_since)
+        group by m.id_maquina
+    )
+    select f.id_maquina, r.rule
+    from flags f
+    cross join lateral (values
+        ('cpu_usage', f.cpu_usage),
+        ('ram_usage', f.ram_usage),
+        ('swap_usage', f.swap_usage),
+        ('gpu_usage', f.gpu_usage),
+        ('cpu_temperature', f.cpu_temperature),
+        ('gpu_temperature', f.gpu_temperature),
+        ('gpu_voltage', f.gpu_voltage),
+        ('fan_rpm_cpu', f.fan_rpm_cpu),
+        ('fan_rpm_gpu', f.fan_rpm_gpu),
+        ('disk_usage_root', f.disk_usage_root),
+        ('disk_usage_home', f.disk_usage_home),
+        ('disk_usage_boot', f.disk_usage_boot),
+        ('battery_health', f.battery_health),
+        ('click_rate', f.click_rate),
+        ('keypress_rate', f.keypress_rate),
+        ('recent_hardware_failures', f.recent_hardware_failures),
+        ('failed_logins', f.failed_logins),
+        ('instant_power_consumption', f.instant_power_consumption),
+        ('smart_overall', f.smart_overall),
+        ('firewall_active', f.firewall_active)
+    ) r(rule, hit)
+    where r.hit and p_thresholds ? r.rule
+$$;
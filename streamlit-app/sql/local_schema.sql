@@ -0,0 +1,70 @@
+-- Minimal copy of the tables read by the dashboard, used to run a local
+-- Postgres stand-in of the Supabase database (columns as consumed by the app)
+
+create table if not exists public.empresas (
+    id uuid primary key default gen_random_uuid(),
+    nome_empresa text unique not null,
+    password_hash text,
+    role text default 'client',
+    is_active boolean default true,
+    created_by text,
+    data_criacao timestamptz default now()
+);
+
+create table if not exists public.maquinas (
+    id bigint generated by default as identity primary key,
+    id_empresa uuid not null references public.empresas (id),
+    label_maquina text,
+    data_registro timestamptz default now(),
+    ultimo_contato timestamptz
+);
+
+create table if not exists public.metricas_maquina (
+    id bigint generated by default as identity primary key,
+    id_maquina bigint not null references public.maquinas (id),
+    data_coleta timestamptz not null default now(),
+    cpu_usage double precision,
+    ram_usage double precision,
+    swap_usage double precision,
+    gpu_usage double precision,
+    cpu_temperature double precision,
+    gpu_temperature double precision,
+    gpu_voltage double precision,
+    fan_rpm_cpu double precision,
+    fan_rpm_gpu double precision,
+    disk_usage_root double precision,
+    disk_usage_home double precision,
+    disk_usage_boot double precision,
+    battery_health double precision,
+    click_rate double precision,
+    keypress_rate double precision,
+    recent_hardware_failures integer,
+    failed_logins integer,
+    instant_power_consumption double precision,
+    smart_overall text,
+    firewall_active text,
+    pkg_loss_list jsonb,
+    installed_softwares jsonb,
+    host_name text,
+    model text,
+    operation_sys text,
+    os_version text,
+    architecture text,
+    processor text,
+    gpu_name text,
+    inter_gpu_name text,
+    motherboard_manuf text,
+    motherboard_name text,
+    motherboard_snum text,
+    mac text,
+    ipv4 text,
+    ipv6 text,
+    country text,
+    region_name text,
+    city text,
+    lat double precision,
+    lon double precision
+);
+
+create index if not exists metricas_maquina_machine_time_idx
+    on public.metricas_maquina (id_maquina, data_coleta desc, id desc);
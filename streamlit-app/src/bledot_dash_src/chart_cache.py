@@ -0,0 +1,176 @@
+import functools
+import hashlib
+import inspect
+import json
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Callable, Hashable
+import altair as alt
+import numpy as np
+import pandas as pd
+from bledot_dash_src.charts import (
+    create_card_chart,
+    create_gauge_grid,
+    create_hsbar_chart,
+    create_line_chart,
+    create_speed_chart,
+)
+from bledot_dash_src.settings import get_setting
+
+
+# Number of chart specs kept in memory and decimal places the chart values are
+# rounded to, overridable through the [supabase] secrets section
+# (CHART_CACHE_ENTRIES, CHART_CACHE_DIGITS)
+default_cache_entries = 512
+default_digits = 2
+
+
+def normalize_arg(value: Any, digits: int) -> tuple[Any, Hashable]:
+    """Rounds a chart argument and gets its part of the cache key
+
+    Args:
+        value: argument of a chart builder
+        digits: decimal places floats are rounded to
+
+    Returns:
+        Rounded argument (passed on to the builder) and its hashable key
+
+    Raises:
+        TypeError: if the argument can not be part of a key (e.g. a DataFrame)
+    """
+    if isinstance(value, (float, np.floating)):
+        value = round(float(value), digits)
+        return value, value
+
+    # Nested arguments (e.g. the rows of a gauge grid) are normalized item by item
+    if isinstance(value, Mapping):
+        items = {name: normalize_arg(item, digits) for name, item in value.items()}
+        return (
+            {name: item for name, (item, _) in items.items()},
+            tuple((name, key) for name, (_, key) in items.items()),
+        )
+    if isinstance(value, (list, tuple)) and any(isinstance(item, (Mapping, list, tuple)) for item in value):
+        items = [normalize_arg(item, digits) for item in value]
+        return [item for item, _ in items], tuple(key for _, key in items)
+
+    if isinstance(value, (list, tuple, np.ndarray, pd.Series, pd.Index)):
+        values = value if isinstance(value, (pd.Series, pd.Index)) else pd.Series(value)
+        if pd.api.types.is_float_dtype(values.dtype):
+            values = values.round(digits)
+            value = values.to_numpy()
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        digest = hashlib.blake2b(hashes.tobytes(), digest_size=16).hexdigest()
+        return value, (str(values.dtype), len(values), digest)
+
+    if isinstance(value, np.generic):
+        value = value.item()
+
+    try:
+        hash(value)
+    except TypeError:
+        raise TypeError(
+            f"Chart arguments of type {type(value).__name__} can not be cached, "
+            "pass their columns as lists or series instead"
+        ) from None
+
+    return value, value
+
+
+class ChartCache:
+    """Server-wide Vega-Lite specs by (builder, rounded arguments), with least
+    recently used eviction
+
+    Specs are stored serialized, so every session gets its own copy and an
+    unchanged chart is not rebuilt on each rerun.
+    """
+
+    def __init__(self, max_entries: int, digits: int):
+        self.max_entries = max_entries
+        self.digits = digits
+        self._entries: OrderedDict[Hashable, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, builder: Callable[..., alt.TopLevelMixin], *args, **kwargs) -> dict:
+        """Gets the spec of a chart, building it on a miss
+
+        Args:
+            builder: chart builder (e.g. create_speed_chart)
+            *args, **kwargs: builder arguments, floats are rounded to digits
+
+        Returns:
+            Vega-Lite spec of the chart
+        """
+        bound = inspect.signature(builder).bind(*args, **kwargs)
+        bound.apply_defaults()
+
+        arguments = {}
+        key = [builder.__qualname__]
+        for name, value in bound.arguments.items():
+            arguments[name], value_key = normalize_arg(value, self.digits)
+            key.append((name, value_key))
+        key = tuple(key)
+
+        with self._lock:
+            spec = self._entries.get(key)
+            if spec is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return json.loads(spec)
+
+        # Concurrent misses of the same chart may both build it, which is harmless
+        spec = builder(**arguments).to_json(indent=None)
+        with self._lock:
+            self._entries[key] = spec
+            self._stats["misses"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+        return json.loads(spec)
+
+    def memoize(self, builder: Callable[..., alt.TopLevelMixin]) -> Callable[..., dict]:
+        """Wraps a chart builder so it returns cached specs"""
+
+        @functools.wraps(builder)
+        def wrapper(*args, **kwargs) -> dict:
+            return self.get(builder, *args, **kwargs)
+
+        return wrapper
+
+    def clear(self) -> None:
+        """Drops every spec"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Gets the number of hits, misses, evictions and entries, and the hit rate"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+            }
+
+
+chart_cache = ChartCache(
+    max_entries=get_setting("CHART_CACHE_ENTRIES", default_cache_entries),
+    digits=get_setting("CHART_CACHE_DIGITS", default_digits),
+)
+
+# Memoized builders, returning specs to be drawn with st.vega_lite_chart
+speed_chart = chart_cache.memoize(create_speed_chart)
+hsbar_chart = chart_cache.memoize(create_hsbar_chart)
+card_chart = chart_cache.memoize(create_card_chart)
+line_chart = chart_cache.memoize(create_line_chart)
+gauge_grid = chart_cache.memoize(create_gauge_grid)
+
+gauge_charts = {"speed": speed_chart, "hsbar": hsbar_chart, "card": card_chart}
+
+
+def gauge_spec(gauge: Mapping) -> dict:
+    """Gets the spec of a single gauge, given by its kind and arguments as in create_gauge_grid"""
+    kwargs = dict(gauge)
+    return gauge_charts[kwargs.pop("kind")](**kwargs)
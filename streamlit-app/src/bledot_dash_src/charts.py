@@ -37,7 +37,23 @@ def frac_val(val: float, start_val: float, end_val: float) -> float:
     return (val - start_val) / (end_val - start_val)
 
 
-def create_speed_chart(
+def clamp(val: float, start_val: float, end_val: float) -> float:
+    return min(max(val, start_val), end_val)
+
+
+def text_row(gauge: int, val: typing.Any, format_str: str, title: str) -> dict:
+    return {"gauge": gauge, "part": "text", "label": format_str.format(val), "title": title}
+
+
+def gauge_chart(gauge: int, part: str = "text") -> alt.Chart:
+    """Gets a chart of the rows of one gauge, taken from the data of its parent"""
+    return alt.Chart().transform_filter(
+        (alt.datum.gauge == gauge) & (alt.datum.part == part)
+    )
+
+
+def speed_gauge(
+    gauge: int,
     val: float,
     start_val: float,
     end_val: float,
@@ -53,10 +69,18 @@ def create_speed_chart(
     corner_radius: float = 5.0,
     width: int = 250,
     height: int = 280,
-) -> alt.LayerChart:
-    val = min(max(val, start_val), end_val)
-    min_val = min(max(min_val, start_val), end_val)
-    max_val = min(max(max_val, start_val), end_val)
+) -> tuple[list[dict], alt.LayerChart]:
+    """Gets the data rows and the layers of a speed gauge
+
+    Args:
+        gauge: index of the gauge in the shared data
+
+    Returns:
+        Data rows and chart without data (taken from its parent)
+    """
+    val = clamp(val, start_val, end_val)
+    min_val = clamp(min_val, start_val, end_val)
+    max_val = clamp(max_val, start_val, end_val)
 
     start_angle = -np.pi / 2
     total_span = np.pi
@@ -65,18 +89,10 @@ def create_speed_chart(
     frac_avg = frac_val(val, start_val, end_val)
     frac_max = frac_val(max_val, start_val, end_val)
 
-    source = pd.DataFrame(
-        [
-            {"category": "range", "value": frac_max - frac_min, "color": color_val},
-            {"category": "average", "value": 0.06, "color": color_avg},
-            {"category": "background", "value": 1, "color": color_bg},
-        ]
-    )
-
-    text = pd.DataFrame([{"label": format_str.format(val), "title": title}])
+    rows = [text_row(gauge, val, format_str, title)]
 
     background_chart = (
-        alt.Chart(source)
+        gauge_chart(gauge)
         .mark_arc(
             innerRadius=inner_radius,
             outerRadius=outer_radius,
@@ -93,7 +109,7 @@ def create_speed_chart(
     max_angle = total_span * frac_max
 
     progress_chart = (
-        alt.Chart(source)
+        gauge_chart(gauge)
         .mark_arc(
             innerRadius=inner_radius,
             outerRadius=outer_radius,
@@ -107,7 +123,7 @@ def create_speed_chart(
     )
 
     avg_chart = (
-        alt.Chart(source)
+        gauge_chart(gauge)
         .mark_arc(
             innerRadius=inner_radius,
             outerRadius=outer_radius,
@@ -121,7 +137,7 @@ def create_speed_chart(
     )
 
     label = (
-        alt.Chart(text)
+        gauge_chart(gauge)
         .mark_text(
             align="center",
             baseline="middle",
@@ -134,7 +150,7 @@ def create_speed_chart(
     )
 
     title_label = (
-        alt.Chart(text)
+        gauge_chart(gauge)
         .mark_text(
             align="center",
             baseline="middle",
@@ -146,51 +162,95 @@ def create_speed_chart(
         .encode(text="title:N")
     )
 
-    final_chart = (
-        (background_chart + progress_chart + avg_chart + label + title_label)
-        .properties(width=width, height=height)
-        .configure_view(stroke=None)
+    chart = (background_chart + progress_chart + avg_chart + label + title_label).properties(
+        width=width, height=height
     )
 
-    return final_chart
+    return rows, chart
 
 
-def create_hsbar_chart(
+def create_speed_chart(
     val: float,
+    start_val: float,
+    end_val: float,
     min_val: float,
     max_val: float,
     format_str: str,
     title: str,
-    start_val: float = 0,
-    end_val: float = 100,
     color_val: str = default_colors["val"],
     color_avg: str = default_colors["avg"],
     color_bg: str = default_colors["background"],
+    inner_radius: float = 70.0,
+    outer_radius: float = 100.0,
     corner_radius: float = 5.0,
     width: int = 250,
     height: int = 280,
-):
-    val = min(max(val, start_val), end_val)
-    min_val = min(max(min_val, start_val), end_val)
-    max_val = min(max(max_val, start_val), end_val)
-
-    df = pd.DataFrame(
-        [
-            {"category": "value", "start": 0, "end": max_val, "color": color_bg},
-            {"category": "value", "start": min_val, "end": max_val, "color": color_val},
-            {
-                "category": "value",
-                "start": val - 0.5,
-                "end": val + 0.5,
-                "color": color_avg,
-            },
-        ]
+) -> alt.LayerChart:
+    rows, chart = speed_gauge(
+        0,
+        val=val,
+        start_val=start_val,
+        end_val=end_val,
+        min_val=min_val,
+        max_val=max_val,
+        format_str=format_str,
+        title=title,
+        color_val=color_val,
+        color_avg=color_avg,
+        color_bg=color_bg,
+        inner_radius=inner_radius,
+        outer_radius=outer_radius,
+        corner_radius=corner_radius,
+        width=width,
+        height=height,
     )
+    return chart.properties(data=pd.DataFrame(rows)).configure_view(stroke=None)
+
 
-    text = pd.DataFrame([{"label": format_str.format(val), "title": title}])
+def hsbar_gauge(
+    gauge: int,
+    val: float,
+    min_val: float,
+    max_val: float,
+    format_str: str,
+    title: str,
+    start_val: float = 0,
+    end_val: float = 100,
+    color_val: str = default_colors["val"],
+    color_avg: str = default_colors["avg"],
+    color_bg: str = default_colors["background"],
+    corner_radius: float = 5.0,
+    width: int = 250,
+    height: int = 280,
+) -> tuple[list[dict], alt.HConcatChart]:
+    """Gets the data rows and the layers of a horizontal bar gauge
+
+    Args:
+        gauge: index of the gauge in the shared data
+
+    Returns:
+        Data rows and chart without data (taken from its parent)
+    """
+    val = clamp(val, start_val, end_val)
+    min_val = clamp(min_val, start_val, end_val)
+    max_val = clamp(max_val, start_val, end_val)
+
+    rows = [
+        {"gauge": gauge, "part": "bar", "category": "value", "start": 0, "end": max_val, "color": color_bg},
+        {"gauge": gauge, "part": "bar", "category": "value", "start": min_val, "end": max_val, "color": color_val},
+        {
+            "gauge": gauge,
+            "part": "bar",
+            "category": "value",
+            "start": val - 0.5,
+            "end": val + 0.5,
+            "color": color_avg,
+        },
+        text_row(gauge, val, format_str, title),
+    ]
 
     bar_chart = (
-        alt.Chart(df)
+        gauge_chart(gauge, "bar")
         .mark_bar(height=0.6 * height, cornerRadius=corner_radius)
         .encode(
             x=alt.X(
@@ -208,7 +268,7 @@ def create_hsbar_chart(
     )
 
     text_label = (
-        alt.Chart(text)
+        gauge_chart(gauge)
         .mark_text(
             align="left",
             baseline="middle",
@@ -217,27 +277,68 @@ def create_hsbar_chart(
             dx=10,
             color=default_colors["text"],
         )
-        .encode(text=alt.Text("label"))
+        .encode(text=alt.Text("label:N"))
         .properties(height=height)
     )
 
-    final_chart = alt.hconcat(bar_chart, text_label).configure_view(stroke=None)
+    return rows, alt.hconcat(bar_chart, text_label)
 
-    return final_chart
 
+def create_hsbar_chart(
+    val: float,
+    min_val: float,
+    max_val: float,
+    format_str: str,
+    title: str,
+    start_val: float = 0,
+    end_val: float = 100,
+    color_val: str = default_colors["val"],
+    color_avg: str = default_colors["avg"],
+    color_bg: str = default_colors["background"],
+    corner_radius: float = 5.0,
+    width: int = 250,
+    height: int = 280,
+) -> alt.HConcatChart:
+    rows, chart = hsbar_gauge(
+        0,
+        val=val,
+        min_val=min_val,
+        max_val=max_val,
+        format_str=format_str,
+        title=title,
+        start_val=start_val,
+        end_val=end_val,
+        color_val=color_val,
+        color_avg=color_avg,
+        color_bg=color_bg,
+        corner_radius=corner_radius,
+        width=width,
+        height=height,
+    )
+    return chart.properties(data=pd.DataFrame(rows)).configure_view(stroke=None)
 
-def create_card_chart(
+
+def card_gauge(
+    gauge: int,
     val: typing.Any,
     format_str: str,
     title: str,
     color: str = default_colors["avg"],
     width: int = 250,
     height: int = 280,
-):
-    text = pd.DataFrame([{"label": format_str.format(val), "title": title}])
+) -> tuple[list[dict], alt.LayerChart]:
+    """Gets the data rows and the layers of a card
+
+    Args:
+        gauge: index of the gauge in the shared data
+
+    Returns:
+        Data rows and chart without data (taken from its parent)
+    """
+    rows = [text_row(gauge, val, format_str, title)]
 
     label = (
-        alt.Chart(text)
+        gauge_chart(gauge)
         .mark_text(
             align="center",
             baseline="middle",
@@ -246,11 +347,11 @@ def create_card_chart(
             dy=40,
             color=color,
         )
-        .encode(text=alt.Text("label"))
+        .encode(text=alt.Text("label:N"))
     )
 
     title_label = (
-        alt.Chart(text)
+        gauge_chart(gauge)
         .mark_text(
             align="center",
             baseline="middle",
@@ -259,19 +360,66 @@ def create_card_chart(
             dy=-60,
             color=default_colors["text"],
         )
-        .encode(text=alt.Text("title"))
+        .encode(text=alt.Text("title:N"))
     )
 
-    final_chart = (
-        (label + title_label)
-        .properties(width=width, height=height)
-        .configure_view(stroke=None)
+    return rows, (label + title_label).properties(width=width, height=height)
+
+
+def create_card_chart(
+    val: typing.Any,
+    format_str: str,
+    title: str,
+    color: str = default_colors["avg"],
+    width: int = 250,
+    height: int = 280,
+) -> alt.LayerChart:
+    rows, chart = card_gauge(
+        0,
+        val=val,
+        format_str=format_str,
+        title=title,
+        color=color,
+        width=width,
+        height=height,
     )
+    return chart.properties(data=pd.DataFrame(rows)).configure_view(stroke=None)
 
-    return final_chart
 
+# Gauge builders by kind, for create_gauge_grid
+gauge_builders: dict[str, typing.Callable[..., tuple[list[dict], alt.TopLevelMixin]]] = {
+    "speed": speed_gauge,
+    "hsbar": hsbar_gauge,
+    "card": card_gauge,
+}
+
+
+def create_gauge_grid(grid: list[list[dict]]) -> alt.VConcatChart:
+    """Draws several gauges as one chart, all of them reading the same data
+
+    Args:
+        grid: rows of gauges, each gauge given by its kind (key of
+            gauge_builders) and the arguments of its builder, e.g.
+            {"kind": "speed", "val": 50, "start_val": 0, ...}
+
+    Returns:
+        Chart with one row of gauges per row of grid
+    """
+    rows = []
+    chart_rows = []
+    gauge_count = 0
+    for grid_row in grid:
+        charts = []
+        for gauge in grid_row:
+            kwargs = dict(gauge)
+            builder = gauge_builders[kwargs.pop("kind")]
+            gauge_rows, chart = builder(gauge_count, **kwargs)
+            gauge_count += 1
+            rows.extend(gauge_rows)
+            charts.append(chart)
+        chart_rows.append(alt.hconcat(*charts))
 
-from datetime import datetime
+    return alt.vconcat(*chart_rows, data=pd.DataFrame(rows)).configure_view(stroke=None)
 
 
 def create_line_chart(
@@ -287,16 +435,22 @@ def create_line_chart(
     width: int = 600,
     height: int = 500,
     threshold: float = -1000,
+    time: pd.DatetimeIndex | None = None,
 ):
-    n = len(val)
-    time_data = pd.to_datetime(pd.date_range(datetime.now(), periods=n, freq="1h"))
+    # Without timestamps the points are spread over hours only to order them,
+    # so the time labels are hidden
+    show_time = time is not None
+    if time is None:
+        time = pd.date_range(pd.Timestamp.now(), periods=len(val), freq="1h")
+    time_axis = alt.Axis(labels=show_time, format="%d/%m %H:%M")
+    time_tooltip = [alt.Tooltip("time:T", title="Time", format="%d/%m %H:%M")] if show_time else []
 
     source = pd.DataFrame(
         {
-            "time": time_data,
-            "val": pd.Series(val),
-            "min": pd.Series(min_val),
-            "max": pd.Series(max_val),
+            "time": pd.DatetimeIndex(time),
+            "val": np.asarray(val, dtype=float),
+            "min": np.asarray(min_val, dtype=float),
+            "max": np.asarray(max_val, dtype=float),
             "color": color_avg,
             "title": title,
         }
@@ -306,10 +460,10 @@ def create_line_chart(
         alt.Chart(source)
         .mark_line(point=True, strokeWidth=3)
         .encode(
-            x=alt.X("time:T", title="Time", axis=alt.Axis(labels=False)),
+            x=alt.X("time:T", title="Time", axis=time_axis),
             y=alt.Y("val:Q", title=title, scale=alt.Scale(domain=[start_val, end_val])),
             color=alt.Color("color:N", legend=None, scale=None),
-            tooltip=[alt.Tooltip("val:Q", title=title, format=".1f")],
+            tooltip=time_tooltip + [alt.Tooltip("val:Q", title=title, format=".1f")],
         )
     )
 
@@ -317,7 +471,7 @@ def create_line_chart(
         alt.Chart(source)
         .mark_line(point=False, strokeWidth=3, color=color_val)
         .encode(
-            x=alt.X("time:T", title="Time", axis=alt.Axis(labels=False)),
+            x=alt.X("time:T", title="Time", axis=time_axis),
             y=alt.Y("min:Q", title=title, scale=alt.Scale(domain=[start_val, end_val])),
             tooltip=[alt.Tooltip("min:Q", title=title, format=".1f")],
         )
@@ -327,7 +481,7 @@ def create_line_chart(
         alt.Chart(source)
         .mark_line(point=False, strokeWidth=3, color=color_val)
         .encode(
-            x=alt.X("time:T", title=None, axis=alt.Axis(labels=False)),
+            x=alt.X("time:T", title=None, axis=time_axis),
             y=alt.Y("max:Q", title=title, scale=alt.Scale(domain=[start_val, end_val])),
             tooltip=[alt.Tooltip("max:Q", title=title, format=".1f")],
         )
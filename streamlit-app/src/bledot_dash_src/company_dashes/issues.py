@@ -1,26 +1,21 @@
 import streamlit as st
-from src.bledot_dash_src.session_state import get_session_state
+from bledot_dash_src.shared_data import get_shared_state
 
 
 def run_issues_dash():
     st.header("Máquinas comprometidas")
 
-    company_machines = get_session_state("company_data")["machines"]
-    machines_with_issues = get_session_state("machines_with_issues")
-    metrics_threshold = get_session_state("metrics_threshold")
+    view = get_shared_state("company_view")["issues"]
 
     is_first = True
-    for machine_id, issues in machines_with_issues.items():
+    for machine in view:
         if is_first:
             is_first = False
         else:
             st.divider()
 
-        machine = company_machines[company_machines["id"] == machine_id]
-        machine_label = machine["label_maquina"].item()
-        st.header(machine_label)
-        st.markdown(f"**ID**: {machine_id}")
+        st.header(machine["label"])
+        st.markdown(f"**ID**: {machine['id']}")
         st.subheader("Falhas detectadas")
-        for issue in issues:
-            st.markdown(f"- {metrics_threshold[issue]['str']}")
-
+        for issue in machine["issues"]:
+            st.markdown(f"- {issue}")
@@ -0,0 +1,196 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Any, Callable, Hashable
+import numpy as np
+import pandas as pd
+from bledot_dash_src.settings import get_setting
+
+
+# Default cache lifetimes (seconds), overridable through the [supabase] secrets
+# section (CACHE_TTL, CACHE_STALE_TTL)
+default_ttl = 300.0
+default_stale_ttl = 600.0
+
+
+def _set_read_only(value: pd.DataFrame | pd.Series) -> None:
+    """Makes the arrays holding the values of a frame or series read-only, in
+    place (but the object ones, which some pandas routines can not read when
+    read-only, e.g. memory_usage(deep=True))"""
+    for array in value._mgr.arrays:
+        # Extension arrays (e.g. timestamps with a time zone) wrap an ndarray
+        values = getattr(array, "_ndarray", array)
+        if isinstance(values, np.ndarray) and values.dtype != object:
+            values.flags.writeable = False
+
+
+def freeze(value: Any) -> Any:
+    """Recursively turns dicts, lists and sets into read-only views, and makes
+    the values of frames, series and arrays read-only
+
+    Frames keep their object, so writing to their numeric and timestamp
+    values raises, while the frames derived from them (filters, sorts, copies)
+    are new and writable. Object columns (text, lists) stay writable, so the
+    shared frames are copy-on-write by convention: copy a frame before
+    changing it.
+
+    Args:
+        value: value to be frozen
+
+    Returns:
+        Read-only version of value (scalars and other objects are returned as is)
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(val) for key, val in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        _set_read_only(value)
+    elif isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    return value
+
+
+class TTLCache:
+    """Server-wide cache with time-to-live and stale-while-revalidate
+
+    Entries younger than ttl are served as is. Entries between ttl and
+    ttl + stale_ttl are served immediately while a background thread reloads
+    them. Older entries are reloaded before being served. Values rejected by
+    cacheable (by default, empty ones) are served but not stored, so a failed
+    load is retried by the next request.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        stale_ttl: float,
+        max_workers: int = 2,
+        cacheable: Callable[[Any], bool] = bool,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.cacheable = cacheable
+        self._entries: dict[Hashable, tuple[Any, float]] = {}
+        self._key_locks: dict[Hashable, threading.Lock] = {}
+        self._refreshing: set[Hashable] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="cache-refresh"
+        )
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0}
+
+    def _key_lock(self, key: Hashable) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _load(self, key: Hashable, loader: Callable[[Hashable], Any]) -> Any:
+        value = freeze(loader(key))
+        if self.cacheable(value):
+            with self._lock:
+                self._entries[key] = (value, time.monotonic())
+        return value
+
+    def _refresh(self, key: Hashable, loader: Callable[[Hashable], Any]) -> None:
+        try:
+            with self._key_lock(key):
+                self._load(key, loader)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get(self, key: Hashable, loader: Callable[[Hashable], Any]) -> Any:
+        """Gets the read-only snapshot stored for key
+
+        Args:
+            key: cache key
+            loader: function that loads the value of a key on a miss
+
+        Returns:
+            Cached (possibly stale) or freshly loaded value
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry is not None:
+            value, loaded_at = entry
+            age = time.monotonic() - loaded_at
+
+            if age < self.ttl:
+                with self._lock:
+                    self._stats["hits"] += 1
+                return value
+
+            if age < self.ttl + self.stale_ttl:
+                with self._lock:
+                    self._stats["stale_hits"] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._stats["refreshes"] += 1
+                        self._executor.submit(self._refresh, key, loader)
+                return value
+
+        # Only one session loads a missing key, the others wait for its result
+        with self._key_lock(key):
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl:
+                with self._lock:
+                    self._stats["hits"] += 1
+                return entry[0]
+
+            with self._lock:
+                self._stats["misses"] += 1
+            return self._load(key, loader)
+
+    def put(self, key: Hashable, value: Any) -> Any:
+        """Stores a value built elsewhere (e.g. from live updates) as a fresh entry
+
+        Args:
+            key: cache key
+            value: value to be stored
+
+        Returns:
+            Read-only snapshot of value
+        """
+        value = freeze(value)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+        return value
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """Drops one entry, or every entry if no key is given
+
+        Args:
+            key: cache key to be dropped
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        """Gets the cache counters
+
+        Returns:
+            Number of hits, stale hits, misses, background refreshes and entries
+        """
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+
+def is_complete(data: Any) -> bool:
+    """Whether a dashboard snapshot was loaded without errors (see
+    SupabaseData.load_client_dashboard_data)"""
+    return bool(data) and data.get("complete", True)
+
+
+company_data_cache = TTLCache(
+    ttl=get_setting("CACHE_TTL", default_ttl),
+    stale_ttl=get_setting("CACHE_STALE_TTL", default_stale_ttl),
+    cacheable=is_complete,
+)
@@ -0,0 +1,365 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable
+import numpy as np
+import pandas as pd
+from bledot_dash_src.history_aggregator import (
+    config_fields,
+    get_first_values,
+    get_kpi,
+)
+from bledot_dash_src.issue_matrix import IssueMatrix
+from bledot_dash_src.settings import get_setting
+from bledot_dash_src.timeseries import get_time_series
+
+
+# Width of the time buckets holding the partial aggregates and how far before
+# the watermark each refresh fetches again (rows uploaded late), overridable
+# through the [supabase] secrets section (DELTA_SYNC_BUCKET, DELTA_SYNC_LAG,
+# DELTA_SYNC_MAX_WINDOWS)
+default_bucket = "1h"
+default_lag = "1h"
+default_max_windows = 256
+
+
+def _concat_rows(newer: pd.DataFrame, older: pd.DataFrame) -> pd.DataFrame:
+    """Concatenates two metrics frames, giving the columns that are all
+    missing on one side the dtype of the other side"""
+    frames = []
+    for frame, other in ((newer, older), (older, newer)):
+        dtypes = {
+            column: other[column].dtype
+            for column in frame.columns.intersection(other.columns)
+            if frame[column].isna().all() and not other[column].isna().all()
+        }
+        try:
+            frames.append(frame.astype(dtypes))
+        except (TypeError, ValueError):
+            frames.append(frame)
+
+    return pd.concat(frames, ignore_index=True)
+
+
+# How the partial aggregates of the same bucket are combined
+stats_merge = {"sum": "sum", "min": "min", "max": "max", "count": "sum"}
+
+
+class MetricsWindow:
+    """Cached metrics of a sliding window, refreshed with the rows newer than a
+    data_coleta watermark
+
+    The window keeps the rows of the last days and/or the newest limit rows.
+    KPI stats, issue flags and packet loss are kept per data_coleta bucket, so
+    new rows only update the buckets they fall in and evicted rows only
+    recompute the oldest buckets. Each refresh fetches again from lag before
+    the watermark (the rows already cached are skipped by id), so rows a
+    machine uploads late are picked up as long as they are at most lag older
+    than the newest cached row, e.g. the newest row of another machine.
+    """
+
+    def __init__(
+        self,
+        metrics_threshold: dict,
+        days: int | None = None,
+        limit: int | None = None,
+        bucket: str | None = None,
+        machine_ids: Iterable | None = None,
+        columns: list[str] | None = None,
+        lag: str | None = None,
+    ):
+        self.metrics_threshold = metrics_threshold
+        self.days = days
+        self.limit = limit
+        # Machines and columns of the cached rows (rows pushed by live updates are filtered by them)
+        self.machine_ids = frozenset(machine_ids) if machine_ids is not None else None
+        self.columns = columns
+        self.bucket = bucket or get_setting("DELTA_SYNC_BUCKET", default_bucket)
+        self.lag = pd.Timedelta(lag or get_setting("DELTA_SYNC_LAG", default_lag))
+        self.lock = threading.Lock()
+        self.frame = pd.DataFrame()
+        self.watermark: pd.Timestamp | None = None
+        self.config = dict.fromkeys(config_fields)
+        self.stats = {"refreshes": 0, "rows_added": 0, "rows_evicted": 0}
+        # Partial aggregates (index: bucket, metric / bucket, id_maquina / bucket)
+        self._stats = None
+        self._hits = None
+        self._pkg_loss = None
+
+    @property
+    def rows(self) -> int:
+        return len(self.frame)
+
+    def since(self, start_date: str | None = None) -> str | None:
+        """Gets the lower data_coleta bound of the next fetch
+
+        Args:
+            start_date: beginning of the window (ISO format)
+
+        Returns:
+            Latest of the watermark minus lag and start_date, in ISO format
+        """
+        if self.watermark is None:
+            return start_date
+        since = self.watermark - self.lag
+        if start_date is None:
+            return since.isoformat()
+        return max(since, pd.Timestamp(start_date)).isoformat()
+
+    def _reduce(self, rows: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """Partial aggregates of some rows, per bucket"""
+        keys = rows["data_coleta"].dt.floor(self.bucket).to_numpy()
+
+        numeric_df = rows.select_dtypes(include=["number", "bool"]).astype(float)
+        groups = numeric_df.groupby(keys)
+        stats = pd.concat(
+            {"sum": groups.sum(), "min": groups.min(), "max": groups.max(), "count": groups.count()},
+            axis=1,
+        ).stack(level=1, future_stack=True).reindex(columns=list(stats_merge))
+        if numeric_df.columns.empty:
+            stats.index = pd.MultiIndex.from_arrays([[], []])
+        stats.index.names = ["bucket", "metric"]
+
+        hits = IssueMatrix.evaluate(rows, self.metrics_threshold) \
+            .groupby([keys, rows["id_maquina"].to_numpy()]).any()
+        hits.index.names = ["bucket", "id_maquina"]
+
+        pkg_loss = (
+            rows["pkg_loss_list"].dropna().map(np.mean)
+            if "pkg_loss_list" in rows.columns else pd.Series(dtype=float)
+        )
+        pkg_loss = pkg_loss.astype(float).groupby(keys[rows.index.get_indexer(pkg_loss.index)]) \
+            .agg(["sum", "count"])
+        pkg_loss.index.name = "bucket"
+
+        return stats, hits, pkg_loss
+
+    def _merge(self, stats: pd.DataFrame, hits: pd.DataFrame, pkg_loss: pd.DataFrame) -> None:
+        """Combines partial aggregates with the ones of the same buckets"""
+        if self._stats is None:
+            self._stats, self._hits, self._pkg_loss = stats, hits, pkg_loss
+            return
+
+        self._stats = pd.concat([self._stats, stats]).groupby(level=[0, 1]).agg(stats_merge)
+        self._hits = pd.concat([self._hits, hits]).fillna(False).astype(bool).groupby(level=[0, 1]).any()
+        self._pkg_loss = pd.concat([self._pkg_loss, pkg_loss]).groupby(level=0).sum()
+
+    def update(self, new_rows: pd.DataFrame) -> int:
+        """Appends the rows not cached yet and updates the buckets they fall in
+
+        Args:
+            new_rows: metrics rows with id and data_coleta (as timestamps)
+
+        Returns:
+            Number of appended rows
+        """
+        if new_rows.empty:
+            return 0
+
+        if self.machine_ids is not None:
+            new_rows = new_rows[new_rows["id_maquina"].isin(self.machine_ids)]
+        # Config fields may come in rows fetched with more columns than the cached ones
+        config_columns = list(new_rows.columns.intersection(config_fields))
+        config = get_first_values(
+            new_rows.sort_values(["data_coleta", "id"], ascending=False)[config_columns], config_columns
+        ) if config_columns else {}
+        if self.columns is not None:
+            new_rows = new_rows[new_rows.columns.intersection(self.columns, sort=False)]
+        if new_rows.empty:
+            return 0
+
+        if not self.frame.empty:
+            new_rows = new_rows[~new_rows["id"].isin(self.frame["id"])]
+            if new_rows.empty:
+                return 0
+
+        # Rows older than the cached ones (e.g. the next page of a refresh) only fill the missing config values
+        newer = self.watermark is None or new_rows["data_coleta"].max() >= self.watermark
+        new_rows = new_rows.sort_values(["data_coleta", "id"], ascending=False, ignore_index=True)
+        if self.frame.empty:
+            self.frame = new_rows
+        else:
+            self.frame = _concat_rows(new_rows, self.frame) \
+                .sort_values(["data_coleta", "id"], ascending=False, ignore_index=True)
+        self.watermark = self.frame["data_coleta"].iloc[0]
+
+        self._merge(*self._reduce(new_rows))
+
+        # Newer rows have priority over the cached config values
+        self.config.update({
+            field: value for field, value in config.items()
+            if value is not None and (newer or self.config[field] is None)
+        })
+
+        self.stats["rows_added"] += len(new_rows)
+        return len(new_rows)
+
+    def fill_config(self, rows: pd.DataFrame) -> None:
+        """Fills the config fields still missing from rows fetched apart (newest first)"""
+        missing = [field for field, value in self.config.items() if value is None]
+        if missing and not rows.empty:
+            self.config.update(get_first_values(rows, missing))
+
+    def evict(self, now: pd.Timestamp | None = None) -> int:
+        """Drops the rows out of the window and recomputes the buckets they were in
+
+        Args:
+            now: end of the window (current time by default)
+
+        Returns:
+            Number of evicted rows
+        """
+        if self.frame.empty:
+            return 0
+
+        keep = np.ones(len(self.frame), dtype=bool)
+        if self.days is not None:
+            now = now if now is not None else pd.Timestamp.now(tz="UTC")
+            keep &= (self.frame["data_coleta"] >= now - pd.Timedelta(days=self.days)).to_numpy()
+        if self.limit is not None:
+            keep[self.limit:] = False
+
+        if keep.all():
+            return 0
+
+        bucket_keys = self.frame["data_coleta"].dt.floor(self.bucket)
+        evicted_keys = bucket_keys[~keep].unique()
+        remaining = self.frame[keep & bucket_keys.isin(evicted_keys).to_numpy()]
+
+        self._stats = self._stats.drop(index=evicted_keys, level="bucket", errors="ignore")
+        self._hits = self._hits.drop(index=evicted_keys, level="bucket", errors="ignore")
+        self._pkg_loss = self._pkg_loss.drop(index=evicted_keys, errors="ignore")
+        if not remaining.empty:
+            self._merge(*self._reduce(remaining))
+
+        evicted = int((~keep).sum())
+        self.frame = self.frame[keep].reset_index(drop=True)
+
+        self.stats["rows_evicted"] += evicted
+        return evicted
+
+    def consume(self, chunks: Iterable[pd.DataFrame], now: pd.Timestamp | None = None) -> "MetricsWindow":
+        """Refreshes the window with each chunk of new rows as it comes, then
+        evicts the old ones
+
+        Only the chunk being merged is held besides the cached rows. If getting
+        a chunk fails, the window is restored to its state before the refresh
+        (its watermark included), so the next refresh fetches the same rows.
+        """
+        state = self._state()
+        try:
+            for chunk in chunks:
+                self.update(chunk)
+        except Exception:
+            self._restore(state)
+            raise
+        self.evict(now)
+        self.stats["refreshes"] += 1
+        return self
+
+    def _state(self) -> dict:
+        """Gets the cached rows, watermark and partial aggregates (which are
+        replaced, not modified, by update and evict)"""
+        return {
+            "frame": self.frame,
+            "watermark": self.watermark,
+            "config": dict(self.config),
+            "stats": dict(self.stats),
+            "_stats": self._stats,
+            "_hits": self._hits,
+            "_pkg_loss": self._pkg_loss,
+        }
+
+    def _restore(self, state: dict) -> None:
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def aggregates(self) -> tuple[pd.DataFrame, IssueMatrix]:
+        """Gets the KPI table and the issues of the cached rows, merged from the buckets"""
+        if self._stats is None or self.frame.empty:
+            return get_kpi(None), IssueMatrix([], [], np.zeros((0, 0), dtype=bool))
+
+        stats = self._stats.groupby(level="metric").agg(stats_merge)
+        per_machine = self._hits.groupby(level="id_maquina").any()
+
+        return get_kpi(stats), IssueMatrix(
+            per_machine.index.tolist(), list(per_machine.columns), per_machine.to_numpy()
+        )
+
+    def result(self) -> dict:
+        """Gets the KPI table, power history, packet loss mean, issues and config,
+        like HistoryAggregator.result"""
+        metrics_kpi, issues = self.aggregates()
+        pkg_loss_sum, pkg_loss_count = (
+            self._pkg_loss[["sum", "count"]].sum() if self._pkg_loss is not None else (0.0, 0)
+        )
+
+        return {
+            "metrics_kpi": metrics_kpi,
+            "power_consumption_hist": get_time_series(self.frame),
+            "pkg_loss_mean": pkg_loss_sum / pkg_loss_count if pkg_loss_count else np.nan,
+            "issues": issues,
+            "config": dict(self.config),
+        }
+
+
+class WindowRegistry:
+    """Server-wide metrics windows, with least recently used eviction"""
+
+    def __init__(self, max_windows: int):
+        self.max_windows = max_windows
+        self._windows: OrderedDict[Hashable, MetricsWindow] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, factory: Callable[[], MetricsWindow]) -> MetricsWindow:
+        """Gets the window stored for key, creating it on a miss
+
+        Args:
+            key: window key (e.g. ("machine", machine_id, days, columns))
+            factory: function that creates an empty window
+
+        Returns:
+            Window of key (lock it while refreshing and reading it)
+        """
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = factory()
+                while len(self._windows) > self.max_windows:
+                    self._windows.popitem(last=False)
+            else:
+                self._windows.move_to_end(key)
+            return window
+
+    def windows_of(self, machine_id) -> list[MetricsWindow]:
+        """Gets the loaded windows holding the rows of a machine"""
+        with self._lock:
+            windows = list(self._windows.values())
+        return [
+            window for window in windows
+            if window.watermark is not None
+            and window.machine_ids is not None
+            and machine_id in window.machine_ids
+        ]
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """Drops one window, or every window if no key is given"""
+        with self._lock:
+            if key is None:
+                self._windows.clear()
+            else:
+                self._windows.pop(key, None)
+
+    def stats(self) -> dict:
+        """Gets the number of windows and their refresh counters"""
+        with self._lock:
+            windows = list(self._windows.values())
+        return {
+            "windows": len(windows),
+            "rows": sum(window.rows for window in windows),
+            "refreshes": sum(window.stats["refreshes"] for window in windows),
+            "rows_added": sum(window.stats["rows_added"] for window in windows),
+            "rows_evicted": sum(window.stats["rows_evicted"] for window in windows),
+        }
+
+
+metric_windows = WindowRegistry(get_setting("DELTA_SYNC_MAX_WINDOWS", default_max_windows))
@@ -1,28 +1,242 @@
-import os
-from copy import deepcopy
-from datetime import datetime
-import streamlit as st
+import gzip
+import io
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterator
+import numpy as np
 import pandas as pd
-from bledot_dash_src.session_state import (
-    get_session_state,
-    init_session_state,
-    check_session_state,
-)
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+from bledot_dash_src.hot_path import hot_path_stats
+from bledot_dash_src.settings import get_setting
 
 
-def get_download_data(df: pd.DataFrame) -> bytes:
-    if check_session_state("download_data"):
-        return get_session_state("download_data")
+# Rows formatted at a time by the exports and number of exports kept in memory,
+# overridable through the [supabase] secrets section (EXPORT_CHUNK_ROWS,
+# EXPORT_CACHE_ENTRIES)
+default_chunk_rows = 10_000
+default_cache_entries = 32
 
-    csv_df = deepcopy(df)
-    sheet_path = os.path.join(get_session_state("download_dir"), r"sheet.csv")
+timestamp_format = "%y-%m-%d %H:%M:%S.%f"
 
-    if type(csv_df["data_coleta"][0]) is not str:
-        csv_df["data_coleta"] = csv_df["data_coleta"].apply(
-            lambda x: x.strftime("%y-%m-%d %H:%M:%S.%f")
-        )
 
-    csv_df.to_csv(sheet_path, index=False)
+def format_timestamps(series: pd.Series) -> pd.Series:
+    """Formats timestamps as timestamp_format (wall time, missing ones stay missing)
 
-    with open(sheet_path, "rb") as sheet:
-        return sheet.read()
+    Vectorized equivalent of series.dt.strftime(timestamp_format).
+    """
+    if series.empty:
+        return series.astype(object)
+    if series.dt.tz is not None:
+        series = series.dt.tz_localize(None)
+
+    text = np.datetime_as_string(series.to_numpy().astype("datetime64[us]"), unit="us")
+    formatted = pd.Series(np.char.replace(text, "T", " "), index=series.index).str.slice(2)
+
+    return formatted.where(series.notna())
+
+
+def iter_chunks(df: pd.DataFrame, chunk_rows: int | None = None) -> Iterator[pd.DataFrame]:
+    """Yields consecutive row slices of a frame, with the timestamps formatted as text
+
+    Only the slice being yielded is copied, the frame itself is left untouched.
+
+    Args:
+        df: frame to be exported
+        chunk_rows: rows per slice (EXPORT_CHUNK_ROWS by default)
+    """
+    chunk_rows = chunk_rows or get_setting("EXPORT_CHUNK_ROWS", default_chunk_rows)
+    timestamp_columns = [
+        column for column in df.columns if pd.api.types.is_datetime64_any_dtype(df[column])
+    ]
+
+    for start in range(0, max(len(df), 1), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        if timestamp_columns:
+            chunk = chunk.assign(
+                **{column: format_timestamps(chunk[column]) for column in timestamp_columns}
+            )
+        yield chunk
+
+
+def iter_csv(df: pd.DataFrame, chunk_rows: int | None = None) -> Iterator[bytes]:
+    """Yields the CSV export of a frame, chunk by chunk (header first)"""
+    for position, chunk in enumerate(iter_chunks(df, chunk_rows)):
+        yield chunk.to_csv(index=False, header=position == 0).encode("utf-8")
+
+
+def to_csv(df: pd.DataFrame) -> bytes:
+    """CSV export"""
+    return b"".join(iter_csv(df))
+
+
+def to_csv_gzip(df: pd.DataFrame) -> bytes:
+    """Gzip-compressed CSV export, compressed chunk by chunk"""
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=6) as file:
+        for data in iter_csv(df):
+            file.write(data)
+    return buffer.getvalue()
+
+
+def to_parquet(df: pd.DataFrame) -> bytes:
+    """Parquet export, one row group per chunk (timestamps keep their type)"""
+    chunk_rows = get_setting("EXPORT_CHUNK_ROWS", default_chunk_rows)
+    buffer = io.BytesIO()
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(buffer, schema) as writer:
+        for start in range(0, len(df), chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    return buffer.getvalue()
+
+
+def _cell(value):
+    """Converts a value to one a worksheet cell accepts"""
+    if isinstance(value, (list, tuple, dict, np.ndarray)):
+        return json.dumps(value.tolist() if isinstance(value, np.ndarray) else value, default=str)
+    if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def to_xlsx(df: pd.DataFrame) -> bytes:
+    """Excel export written row by row with a write-only workbook"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("metrics")
+    sheet.append([str(column) for column in df.columns])
+
+    for chunk in iter_chunks(df):
+        for row in chunk.itertuples(index=False, name=None):
+            sheet.append([_cell(value) for value in row])
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+# Export formats offered for download: label, file extension, MIME type and writer
+export_formats: dict[str, dict] = {
+    "csv": {"label": "CSV", "extension": "csv", "mime": "text/csv", "writer": to_csv},
+    "csv.gz": {
+        "label": "CSV (gzip)", "extension": "csv.gz", "mime": "application/gzip", "writer": to_csv_gzip,
+    },
+    "parquet": {
+        "label": "Parquet", "extension": "parquet", "mime": "application/vnd.apache.parquet",
+        "writer": to_parquet,
+    },
+    "xlsx": {
+        "label": "Excel",
+        "extension": "xlsx",
+        "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "writer": to_xlsx,
+    },
+}
+
+
+def get_download_data(df: pd.DataFrame, file_format: str = "csv") -> bytes:
+    """Exports a metrics frame in memory, recording the export time and size
+
+    Args:
+        df: metrics to be exported
+        file_format: key of export_formats
+
+    Returns:
+        File content
+    """
+    writer: Callable[[pd.DataFrame], bytes] = export_formats[file_format]["writer"]
+    return hot_path_stats.call(
+        "get_download_data", writer, df, measure=lambda data: (len(df), len(data))
+    )
+
+
+def exportable(df: pd.DataFrame) -> bool:
+    """Whether a metrics frame has rows to be exported (the export fetches them by id)"""
+    return not df.empty and "id" in df.columns
+
+
+def data_version(df: pd.DataFrame) -> int:
+    """Gets a version of a metrics frame, which changes with its set of rows"""
+    ids = df["id"] if "id" in df.columns else df
+    return int(pd.util.hash_pandas_object(ids, index=False).sum()) ^ len(df)
+
+
+class ExportCache:
+    """Server-wide exports by (company, data version, format), with least
+    recently used eviction
+
+    Exports are only built when requested, and only once while the data does
+    not change, whichever session asks for them.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, bytes] = OrderedDict()
+        self._key_locks: dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "builds": 0}
+
+    @staticmethod
+    def key(company_id: Any, df: pd.DataFrame, file_format: str) -> tuple:
+        return company_id, data_version(df), file_format
+
+    def peek(self, key: Hashable) -> bytes | None:
+        """Gets an export if it was already built"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+            return data
+
+    def build(self, key: Hashable, load: Callable[[], pd.DataFrame]) -> bytes:
+        """Gets an export, building it on the first request
+
+        Args:
+            key: key made by ExportCache.key
+            load: gets the metrics to be exported (only called on a build, so
+                they may be fetched with more columns than the dashboards use)
+
+        Returns:
+            File content (not kept if the loaded metrics are empty, e.g. after
+            a failed query)
+        """
+        data = self.peek(key)
+        if data is not None:
+            hot_path_stats.record_hit("get_download_data")
+            return data
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Concurrent requests of the same export wait for a single build
+        with key_lock:
+            data = self.peek(key)
+            if data is not None:
+                return data
+
+            df = load()
+            data = get_download_data(df, key[-1])
+            if df.empty:
+                return data
+
+            with self._lock:
+                self._entries[key] = data
+                self._stats["builds"] += 1
+                while len(self._entries) > self.max_entries:
+                    evicted_key, _ = self._entries.popitem(last=False)
+                    self._key_locks.pop(evicted_key, None)
+
+        return data
+
+    def stats(self) -> dict:
+        """Gets the number of hits, builds and entries"""
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+
+export_cache = ExportCache(get_setting("EXPORT_CACHE_ENTRIES", default_cache_entries))
@@ -0,0 +1,87 @@
+import functools
+import threading
+import time
+from typing import Callable
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+
+class RerunStats:
+    """Server-wide number of runs and run time of each part of the pages
+
+    Parts are full page runs and fragments, so the reruns saved by the
+    fragments can be compared with the full runs. A fragment's runs within a
+    full page run are recorded apart from its fragment-only reruns.
+    """
+
+    def __init__(self):
+        self._stats: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        """Records one run of a part
+
+        Args:
+            name: part name (e.g. "company_dash.tab")
+            seconds: run time
+        """
+        with self._lock:
+            stats = self._stats.setdefault(name, {"runs": 0, "seconds": 0.0, "last_seconds": 0.0})
+            stats["runs"] += 1
+            stats["seconds"] += seconds
+            stats["last_seconds"] = seconds
+
+    def stats(self) -> dict:
+        """Gets the runs, total, mean and last run time of each part"""
+        with self._lock:
+            return {
+                name: {**stats, "mean_seconds": stats["seconds"] / stats["runs"]}
+                for name, stats in self._stats.items()
+            }
+
+
+rerun_stats = RerunStats()
+
+
+def timed(name: str, func: Callable) -> Callable:
+    """Wraps a function so each of its runs is recorded under name
+
+    Runs interrupted by st.rerun or st.switch_page are recorded as well.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            rerun_stats.record(name, time.perf_counter() - start)
+
+    return wrapper
+
+
+def is_fragment_rerun() -> bool:
+    """Checks whether the current script run only reruns some fragments"""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx is not None and bool(ctx.fragment_ids_this_run)
+
+
+def fragment(name: str, func: Callable, run_every: float | None = None) -> Callable:
+    """Wraps a function as a Streamlit fragment whose runs are recorded under
+    name within full page runs and under "<name>.rerun" on their own
+
+    Widgets inside a fragment (and run_every) only rerun the fragment.
+
+    Args:
+        name: part name
+        func: fragment body
+        run_every: seconds between automatic reruns (None for none)
+    """
+    page_run = timed(name, func)
+    rerun = timed(f"{name}.rerun", func)
+
+    @functools.wraps(func)
+    def body(*args, **kwargs):
+        return (rerun if is_fragment_rerun() else page_run)(*args, **kwargs)
+
+    return st.fragment(body, run_every=run_every)
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+from bledot_dash_src.issue_matrix import IssueMatrix
+from bledot_dash_src.settings import get_setting
+from bledot_dash_src.timeseries import (
+    default_bucket,
+    default_max_points,
+    downsample,
+    get_bucket_stats,
+    series_from_stats,
+)
+
+
+# Machine properties shown on the specifics tab (most recent non-null value)
+config_fields = [
+    "host_name", "model", "operation_sys", "os_version", "architecture",
+    "processor", "gpu_name", "inter_gpu_name", "motherboard_manuf",
+    "motherboard_name", "motherboard_snum", "mac", "ipv4", "ipv6",
+    "installed_softwares", "country", "region_name", "city", "lat", "lon"
+]
+
+
+def get_first_values(df: pd.DataFrame, fields: list[str]) -> dict:
+    """Gets the first non-null value of each field
+
+    Args:
+        df: frame to be searched, in priority order
+        fields: columns to be searched
+
+    Returns:
+        First non-null value of each field (None if there is none)
+    """
+    values = {}
+    for field in fields:
+        series = df[field].dropna() if field in df.columns else pd.Series()
+        values[field] = series.iloc[0] if len(series) else None
+
+    return values
+
+
+def merge_stats(stats: pd.DataFrame | None, new_stats: pd.DataFrame) -> pd.DataFrame:
+    """Merges two frames of sum/min/max/count partial aggregates"""
+    if stats is None:
+        return new_stats
+
+    stats, new_stats = stats.align(new_stats, join="outer")
+    return pd.DataFrame({
+        "sum": stats["sum"].add(new_stats["sum"], fill_value=0),
+        "min": np.fmin(stats["min"], new_stats["min"]),
+        "max": np.fmax(stats["max"], new_stats["max"]),
+        "count": stats["count"].add(new_stats["count"], fill_value=0),
+    })
+
+
+def get_partial_stats(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Gets the sum, min, max and count of the numeric metrics of a chunk (index: metric)"""
+    numeric_df = chunk.select_dtypes(include=["number", "bool"]).astype(float)
+    return numeric_df.agg(["sum", "min", "max", "count"]).T
+
+
+def get_kpi(stats: pd.DataFrame | None) -> pd.DataFrame:
+    """Gets the KPI table (index: metric, columns: mean, min, max and count)
+    from merged partial stats"""
+    if stats is None:
+        return pd.DataFrame(columns=["mean", "min", "max", "count"], index=pd.Index([], name="metric"))
+
+    kpi = pd.DataFrame({
+        "mean": stats["sum"] / stats["count"],
+        "min": stats["min"],
+        "max": stats["max"],
+        "count": stats["count"],
+    })
+    kpi.index.name = "metric"
+
+    return kpi[kpi["count"] > 0]
+
+
+class KpiAccumulator:
+    """Mean, min, max and count of the numeric metrics, updated chunk by chunk"""
+
+    def __init__(self):
+        self._stats = None
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        self._stats = merge_stats(self._stats, get_partial_stats(chunk))
+
+    def result(self) -> pd.DataFrame:
+        """Gets the KPI table (index: metric, columns: mean, min, max and count)"""
+        return get_kpi(self._stats)
+
+
+class SeriesAccumulator:
+    """Avg, min and max of a metric per data_coleta bucket, updated chunk by chunk
+    (chunks may come in any order)"""
+
+    def __init__(self, metric: str = "instant_power_consumption", bucket: str | None = None):
+        self.metric = metric
+        self.bucket = bucket or get_setting("CHART_BUCKET", default_bucket)
+        self._stats = None
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        stats = get_bucket_stats(chunk, self.metric, self.bucket)
+        if not stats.empty:
+            self._stats = merge_stats(self._stats, stats)
+
+    def result(self, max_points: int | None = None) -> pd.DataFrame:
+        """Gets the avg, min and max per bucket (index: bucket start, oldest first),
+        downsampled to the chart point budget"""
+        return downsample(
+            series_from_stats(self._stats),
+            max_points or get_setting("CHART_MAX_POINTS", default_max_points),
+        )
+
+
+class HistoryAggregator:
+    """Builds the machine dashboard data from metric chunks with bounded memory
+
+    Chunks must come newest first, each one is reduced and dropped on update.
+    """
+
+    def __init__(self, metrics_threshold: dict):
+        self.metrics_threshold = metrics_threshold
+        self.rows = 0
+        self.chunks = 0
+        self._kpi = KpiAccumulator()
+        self._power = SeriesAccumulator()
+        self._issues = IssueMatrix([], [], np.zeros((0, 0), dtype=bool))
+        self._pkg_loss_sum = 0.0
+        self._pkg_loss_count = 0
+        self._config = dict.fromkeys(config_fields)
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        if chunk.empty:
+            return
+
+        self.rows += len(chunk)
+        self.chunks += 1
+
+        self._kpi.update(chunk)
+        self._power.update(chunk)
+        self._issues = self._issues.union(IssueMatrix.from_metrics(chunk, self.metrics_threshold))
+
+        if "pkg_loss_list" in chunk.columns:
+            pkg_loss = chunk["pkg_loss_list"].dropna().map(np.mean)
+            self._pkg_loss_sum += float(pkg_loss.sum())
+            self._pkg_loss_count += len(pkg_loss)
+
+        # Newer chunks have priority, so only fields still missing are searched
+        missing = [field for field, value in self._config.items() if value is None]
+        if missing:
+            self._config.update(
+                {field: value for field, value in get_first_values(chunk, missing).items() if value is not None}
+            )
+
+    def consume(self, chunks) -> "HistoryAggregator":
+        """Updates the aggregates with every chunk of an iterable"""
+        for chunk in chunks:
+            self.update(chunk)
+        return self
+
+    def result(self) -> dict:
+        """Gets the KPI table, power history, packet loss mean, issues and config"""
+        return {
+            "metrics_kpi": self._kpi.result(),
+            "power_consumption_hist": self._power.result(),
+            "pkg_loss_mean": (
+                self._pkg_loss_sum / self._pkg_loss_count if self._pkg_loss_count else np.nan
+            ),
+            "issues": self._issues,
+            "config": dict(self._config),
+        }
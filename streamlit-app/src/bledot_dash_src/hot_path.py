@@ -0,0 +1,265 @@
+import bisect
+import functools
+import json
+import threading
+import time
+from collections.abc import Sized
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+import pandas as pd
+from bledot_dash_src.settings import get_setting
+
+
+# Port of the local Prometheus endpoint (0 leaves it off), overridable through
+# the [supabase] secrets section (METRICS_PORT)
+default_metrics_port = 0
+
+# Upper bounds of the wall time (seconds) and payload (bytes) histogram buckets
+latency_buckets = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+payload_buckets = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+# Rows of a query response serialized to estimate its size
+response_sample_rows = 16
+
+
+class Histogram:
+    """Counts of observed values by bucket, with their sum"""
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """Gets the number of values up to each bound (the last one being inf)"""
+        total = 0
+        buckets = []
+        for bound, count in zip((*self.bounds, float("inf")), self.counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+    def quantile(self, q: float) -> float:
+        """Gets the bound of the bucket holding the q quantile (nan if empty)"""
+        if not self.count:
+            return float("nan")
+        for bound, total in self.cumulative():
+            if total >= q * self.count:
+                return bound if bound != float("inf") else self.bounds[-1]
+        return self.bounds[-1]
+
+
+def response_bytes(rows: list) -> int:
+    """Estimates the JSON size of the rows of a response from a sample of them"""
+    if not rows:
+        return 2
+    sample = rows[::max(1, len(rows) // response_sample_rows)][:response_sample_rows]
+    return int(len(json.dumps(sample, default=str)) * len(rows) / len(sample))
+
+
+def payload_size(value: Any) -> tuple[int | None, int | None]:
+    """Gets the rows and bytes of a query response or a transform result (None
+    when they do not apply)"""
+    if isinstance(value, pd.DataFrame):
+        return len(value), int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, (bytes, bytearray)):
+        return None, len(value)
+    if isinstance(value, list):
+        return len(value), response_bytes(value)
+    if hasattr(value, "data"):
+        return payload_size(value.data)
+    if isinstance(value, Sized):
+        return len(value), None
+    return None, None
+
+
+class HotPathStats:
+    """Server-wide wall time, rows, payload, cache hits and errors of the data
+    layer queries and transforms, by name
+
+    Wall times and payloads are kept as histograms, so they can be exported in
+    the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._paths: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> dict:
+        return self._paths.setdefault(name, {
+            "seconds": Histogram(latency_buckets),
+            "bytes": Histogram(payload_buckets),
+            "rows": 0,
+            "hits": 0,
+            "errors": 0,
+        })
+
+    def record(
+        self,
+        name: str,
+        seconds: float,
+        rows: int | None = None,
+        nbytes: int | None = None,
+        error: bool = False,
+    ) -> None:
+        """Records one call
+
+        Args:
+            name: query or transform name (e.g. "query.metricas_maquina")
+            seconds: wall time
+            rows: rows returned (None if they do not apply)
+            nbytes: bytes returned (None if they do not apply)
+            error: whether the call raised
+        """
+        with self._lock:
+            path = self._path(name)
+            path["seconds"].observe(seconds)
+            path["rows"] += rows or 0
+            path["errors"] += error
+            if nbytes is not None:
+                path["bytes"].observe(nbytes)
+
+    def record_hit(self, name: str) -> None:
+        """Records a call served from a cache, without running it"""
+        with self._lock:
+            self._path(name)["hits"] += 1
+
+    def record_error(self, name: str) -> None:
+        """Records an error handled outside of a recorded call (e.g. a fallback)"""
+        with self._lock:
+            self._path(name)["errors"] += 1
+
+    def call(
+        self,
+        name: str,
+        func: Callable,
+        *args,
+        measure: Callable[[Any], tuple[int | None, int | None]] = payload_size,
+        **kwargs,
+    ) -> Any:
+        """Runs a function, recording its wall time and the payload measured on its result"""
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record(name, time.perf_counter() - start, error=True)
+            raise
+        seconds = time.perf_counter() - start
+        self.record(name, seconds, *measure(result))
+        return result
+
+    def stats(self) -> dict:
+        """Gets the calls, hits, errors, rows, bytes and wall time quantiles of each name"""
+        with self._lock:
+            return {
+                name: {
+                    "calls": path["seconds"].count,
+                    "hits": path["hits"],
+                    "errors": path["errors"],
+                    "rows": path["rows"],
+                    "bytes": int(path["bytes"].sum),
+                    "seconds": path["seconds"].sum,
+                    "mean_seconds": path["seconds"].sum / path["seconds"].count
+                    if path["seconds"].count else 0.0,
+                    "p50_seconds": path["seconds"].quantile(0.5),
+                    "p95_seconds": path["seconds"].quantile(0.95),
+                }
+                for name, path in self._paths.items()
+            }
+
+    def to_prometheus(self) -> str:
+        """Gets the stats in the Prometheus text exposition format"""
+        lines = []
+
+        def histogram(metric: str, help_text: str, key: str) -> None:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for name, path in self._paths.items():
+                for bound, total in path[key].cumulative():
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f'{metric}_bucket{{name="{name}",le="{le}"}} {total}')
+                lines.append(f'{metric}_sum{{name="{name}"}} {path[key].sum!r}')
+                lines.append(f'{metric}_count{{name="{name}"}} {path[key].count}')
+
+        def counter(metric: str, help_text: str, key: str) -> None:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, path in self._paths.items():
+                lines.append(f'{metric}{{name="{name}"}} {path[key]}')
+
+        with self._lock:
+            histogram("bledot_hot_path_seconds", "Wall time of the data layer calls.", "seconds")
+            histogram("bledot_hot_path_response_bytes", "Payload returned by the data layer calls.", "bytes")
+            counter("bledot_hot_path_rows_total", "Rows returned by the data layer calls.", "rows")
+            counter("bledot_hot_path_cache_hits_total", "Data layer calls served from a cache.", "hits")
+            counter("bledot_hot_path_errors_total", "Data layer calls that raised or fell back.", "errors")
+
+        return "\n".join(lines) + "\n"
+
+
+hot_path_stats = HotPathStats()
+
+
+def instrumented(name: str) -> Callable[[Callable], Callable]:
+    """Decorates a function so each of its calls is recorded under name (see HotPathStats.call)"""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return hot_path_stats.call(name, func, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = hot_path_stats.to_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: ThreadingHTTPServer | None = None
+_server_lock = threading.Lock()
+
+
+def serve_metrics(port: int | None = None, host: str = "127.0.0.1") -> ThreadingHTTPServer | None:
+    """Starts the local Prometheus endpoint (/metrics) once per process
+
+    Args:
+        port: listening port (METRICS_PORT by default, 0 leaves the endpoint off)
+        host: listening address, local only by default
+
+    Returns:
+        Running server, or None if it is off or could not be started
+    """
+    global _server
+    port = get_setting("METRICS_PORT", default_metrics_port) if port is None else port
+    if not port:
+        return None
+
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                print(f"ERROR: Could not serve the metrics on {host}:{port}: {e}")
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-endpoint", daemon=True).start()
+        return _server
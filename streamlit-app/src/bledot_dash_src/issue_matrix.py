@@ -0,0 +1,153 @@
+from collections.abc import Mapping
+from typing import Any, Iterable, Iterator
+import numpy as np
+import pandas as pd
+
+
+class IssueMatrix(Mapping):
+    """Machines x rules boolean matrix of the violated metric thresholds
+
+    Behaves as a read-only mapping from the id of each machine with at least one
+    issue to the set of its violated rules, with vectorized accessors on top.
+    """
+
+    def __init__(self, machine_ids: Iterable[Any], rules: list[str], matrix: np.ndarray):
+        self.machine_ids = list(machine_ids)
+        self.rules = list(rules)
+        self.matrix = np.asarray(matrix, dtype=bool).reshape(len(self.machine_ids), len(self.rules))
+        self.matrix.setflags(write=False)
+
+        self._machine_pos = {machine_id: pos for pos, machine_id in enumerate(self.machine_ids)}
+        self._rule_pos = {rule: pos for pos, rule in enumerate(self.rules)}
+        self._has_issues = self.matrix.any(axis=1)
+
+    @classmethod
+    def from_metrics(cls, metrics_df: pd.DataFrame, metrics_threshold: dict) -> "IssueMatrix":
+        """Evaluates every threshold over a metrics frame in one pass
+
+        Args:
+            metrics_df: metrics rows, with an id_maquina column
+            metrics_threshold: rules as {label: {'val', 'asc', 'str'}}, where
+                'smart_overall' and 'firewall_active' are status rules
+
+        Returns:
+            Matrix flagging a rule for a machine if any of its rows violates it
+        """
+        if metrics_df.empty:
+            return cls([], [], np.zeros((0, 0), dtype=bool))
+
+        hits = cls.evaluate(metrics_df, metrics_threshold)
+        per_machine = hits.groupby(metrics_df["id_maquina"].to_numpy()).any()
+
+        return cls(per_machine.index.tolist(), list(hits.columns), per_machine.to_numpy())
+
+    @staticmethod
+    def evaluate(metrics_df: pd.DataFrame, metrics_threshold: dict) -> pd.DataFrame:
+        """Evaluates every threshold over each row of a metrics frame
+
+        Args:
+            metrics_df: metrics rows
+            metrics_threshold: rules as in from_metrics
+
+        Returns:
+            Boolean frame (index: metrics_df index, columns: rules present in metrics_df)
+        """
+        rules = [label for label in metrics_threshold if label in metrics_df.columns]
+        numeric_rules = [label for label in rules if metrics_threshold[label]["asc"] is not None]
+
+        # rows x numeric rules, compared against the whole threshold vector at once
+        values = metrics_df[numeric_rules].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        limits = np.array([metrics_threshold[label]["val"] for label in numeric_rules], dtype=float)
+        ascending = np.array([metrics_threshold[label]["asc"] for label in numeric_rules], dtype=bool)
+        with np.errstate(invalid="ignore"):
+            numeric_hits = np.where(ascending, values >= limits, values <= limits)
+
+        hits = pd.DataFrame(numeric_hits, columns=numeric_rules, index=metrics_df.index)
+
+        if "smart_overall" in rules:
+            smart = metrics_df["smart_overall"]
+            hits["smart_overall"] = ~smart.isin(["PASSED", "OK"]) & smart.notna()
+
+        if "firewall_active" in rules:
+            hits["firewall_active"] = metrics_df["firewall_active"] == "TRUE"
+
+        return hits[rules]
+
+    @classmethod
+    def from_pairs(cls, pairs: pd.DataFrame, rules: list[str]) -> "IssueMatrix":
+        """Builds the matrix from (id_maquina, rule) rows, such as the ones
+        computed by the database
+
+        Args:
+            pairs: frame with id_maquina and rule columns
+            rules: every rule that may appear, in display order
+
+        Returns:
+            Matrix flagging each listed pair
+        """
+        if pairs.empty:
+            return cls([], rules, np.zeros((0, len(rules)), dtype=bool))
+
+        flags = pd.crosstab(pairs["id_maquina"], pairs["rule"]).reindex(columns=rules, fill_value=0) > 0
+        return cls(flags.index.tolist(), rules, flags.to_numpy())
+
+    def union(self, other: "IssueMatrix") -> "IssueMatrix":
+        """Combines two matrices, flagging a rule if either of them does
+
+        Args:
+            other: matrix evaluated over other rows (e.g. the next page of metrics)
+
+        Returns:
+            Matrix over the machines and rules of both
+        """
+        rules = self.rules + [rule for rule in other.rules if rule not in self._rule_pos]
+        flags = self.to_frame().reindex(columns=rules, fill_value=False)
+        other_flags = other.to_frame().reindex(columns=rules, fill_value=False)
+        combined = flags.combine(other_flags, np.logical_or, fill_value=False).astype(bool)
+
+        return IssueMatrix(combined.index.tolist(), rules, combined.to_numpy())
+
+    def to_frame(self) -> pd.DataFrame:
+        """Gets the matrix as a boolean frame (index: machine, columns: rules)"""
+        return pd.DataFrame(self.matrix, index=self.machine_ids, columns=self.rules)
+
+    def issues_of(self, machine_id: Any) -> set[str]:
+        """Gets the rules violated by a machine (empty if it has none)"""
+        pos = self._machine_pos.get(machine_id)
+        if pos is None:
+            return set()
+        return {rule for rule, hit in zip(self.rules, self.matrix[pos]) if hit}
+
+    def machines_with(self, rule: str) -> list:
+        """Gets the machines that violate a rule"""
+        pos = self._rule_pos.get(rule)
+        if pos is None:
+            return []
+        return [self.machine_ids[i] for i in np.flatnonzero(self.matrix[:, pos])]
+
+    def machines_with_all(self, rules: Iterable[str]) -> list:
+        """Gets the machines that violate every one of the given rules"""
+        positions = [self._rule_pos.get(rule) for rule in rules]
+        if None in positions:
+            return []
+        return [self.machine_ids[i] for i in np.flatnonzero(self.matrix[:, positions].all(axis=1))]
+
+    def rule_counts(self) -> dict[str, int]:
+        """Gets the number of machines violating each rule"""
+        return dict(zip(self.rules, self.matrix.sum(axis=0).tolist()))
+
+    def rules_present(self) -> set[str]:
+        """Gets the rules violated by at least one machine"""
+        return {rule for rule, count in self.rule_counts().items() if count}
+
+    def __getitem__(self, machine_id: Any) -> set[str]:
+        pos = self._machine_pos.get(machine_id)
+        if pos is None or not self._has_issues[pos]:
+            raise KeyError(machine_id)
+        return self.issues_of(machine_id)
+
+    def __iter__(self) -> Iterator:
+        return (self.machine_ids[i] for i in np.flatnonzero(self._has_issues))
+
+    def __len__(self) -> int:
+        return int(self._has_issues.sum())
@@ -0,0 +1,235 @@
+import asyncio
+import json
+import threading
+from typing import Any, Iterable
+import pandas as pd
+from realtime import AsyncRealtimeClient, RealtimeSubscribeStates
+from bledot_dash_src.delta_sync import metric_windows
+from bledot_dash_src.settings import get_setting
+
+
+# Seconds between the checks for live updates made by the open dashboards and
+# of the subscription timeout, overridable through the [supabase] secrets
+# section (LIVE_REFRESH_SECONDS, LIVE_SUBSCRIBE_TIMEOUT)
+default_refresh_seconds = 5.0
+default_subscribe_timeout = 10.0
+
+# Values Realtime accepts at most in an in.(...) filter
+in_filter_max_values = 100
+
+
+class LiveFeed:
+    """Supabase Realtime subscription feeding the cached metrics windows
+
+    The async Realtime client runs on an event loop of its own thread. Inserts
+    on metricas_maquina are appended to the loaded windows of their machine
+    (subscribed in channels of at most in_filter_max_values machines each) and
+    updates of maquinas (ultimo_contato) are kept per company, without querying
+    the database. Every event bumps the version of its company, so the open
+    dashboards know when to rebuild their data. Events missed while
+    disconnected only show up with the next reload of the windows.
+    """
+
+    def __init__(self, url: str, key: str, record_path: str | None = None):
+        self.url = url
+        self.record_path = record_path
+        self.stats = {"events": 0, "metric_inserts": 0, "contact_updates": 0, "errors": 0}
+        self._versions: dict[Any, int] = {}
+        self._last_contacts: dict[Any, dict] = {}
+        self._channels: dict[Any, tuple[frozenset, list]] = {}
+        self._lock = threading.Lock()
+        self._record_lock = threading.Lock()
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="live-feed", daemon=True)
+        self._thread.start()
+        self._client = AsyncRealtimeClient(url, key)
+
+    def subscribe(self, company_id: Any, machine_ids: Iterable) -> None:
+        """Subscribes to the metrics inserted for a company's machines and to the
+        updates of the machines (again only if the machines changed)
+
+        Args:
+            company_id: company ID
+            machine_ids: IDs of the company's machines
+        """
+        machine_ids = frozenset(machine_ids)
+        with self._lock:
+            subscription = self._channels.get(company_id)
+            if subscription is not None and subscription[0] == machine_ids:
+                return
+            self._channels[company_id] = (machine_ids, [])
+            self._versions.setdefault(company_id, 0)
+
+        old_channels = subscription[1] if subscription is not None else []
+        try:
+            channels = asyncio.run_coroutine_threadsafe(
+                self._subscribe(company_id, machine_ids, old_channels), self._loop
+            ).result(timeout=get_setting("LIVE_SUBSCRIBE_TIMEOUT", default_subscribe_timeout))
+        except Exception as e:
+            print(f"ERROR: Live feed subscription for company {company_id} failed: {e}")
+            with self._lock:
+                self.stats["errors"] += 1
+                self._channels.pop(company_id, None)
+            return
+
+        with self._lock:
+            self._channels[company_id] = (machine_ids, channels)
+
+    async def _subscribe(self, company_id: Any, machine_ids: frozenset, old_channels: list) -> list:
+        for old_channel in old_channels:
+            await self._client.remove_channel(old_channel)
+
+        # Realtime refuses in filters over in_filter_max_values, so the metrics
+        # inserts are followed by one channel per chunk of machines
+        channels = []
+        machine_ids = sorted(machine_ids)
+        try:
+            for chunk, start in enumerate(range(0, len(machine_ids), in_filter_max_values)):
+                chunk_ids = machine_ids[start:start + in_filter_max_values]
+                channel = self._client.channel(f"company-{company_id}-metrics-{chunk}")
+                channel.on_postgres_changes(
+                    "INSERT",
+                    self._on_metric_insert,
+                    table="metricas_maquina",
+                    schema="public",
+                    filter=f"id_maquina=in.({','.join(str(machine_id) for machine_id in chunk_ids)})",
+                )
+                channels.append(await channel.subscribe(self._on_subscribe_state))
+
+            channel = self._client.channel(f"company-{company_id}")
+            channel.on_postgres_changes(
+                "UPDATE",
+                lambda payload: self._on_machine_update(company_id, payload),
+                table="maquinas",
+                schema="public",
+                filter=f"id_empresa=eq.{company_id}",
+            )
+            channels.append(await channel.subscribe(self._on_subscribe_state))
+        except Exception:
+            for channel in channels:
+                await self._client.remove_channel(channel)
+            raise
+
+        return channels
+
+    def _on_subscribe_state(self, state: RealtimeSubscribeStates, error: Exception | None) -> None:
+        if error is not None or state in (
+            RealtimeSubscribeStates.CHANNEL_ERROR, RealtimeSubscribeStates.TIMED_OUT
+        ):
+            print(f"ERROR: Live feed channel {state}: {error}")
+            with self._lock:
+                self.stats["errors"] += 1
+
+    def _on_metric_insert(self, payload: dict) -> None:
+        # Runs on the event loop thread, an exception would stop the listener
+        try:
+            record = payload["data"]["record"]
+            self._record(payload)
+
+            row = pd.DataFrame([record])
+            row["data_coleta"] = pd.to_datetime(row["data_coleta"])
+            for window in metric_windows.windows_of(record["id_maquina"]):
+                with window.lock:
+                    window.consume([row])
+
+            with self._lock:
+                company_id = next(
+                    (company_id for company_id, (machine_ids, _) in self._channels.items()
+                     if record["id_maquina"] in machine_ids),
+                    None,
+                )
+                self.stats["metric_inserts"] += 1
+            self._bump(company_id)
+        except Exception as e:
+            print(f"ERROR: Live feed failed to apply a metrics insert: {e}")
+            with self._lock:
+                self.stats["errors"] += 1
+
+    def _on_machine_update(self, company_id: Any, payload: dict) -> None:
+        try:
+            record = payload["data"]["record"]
+            self._record(payload)
+
+            if record.get("ultimo_contato") is not None:
+                with self._lock:
+                    self._last_contacts.setdefault(company_id, {})[record["id"]] = \
+                        pd.Timestamp(record["ultimo_contato"])
+                    self.stats["contact_updates"] += 1
+            self._bump(company_id)
+        except Exception as e:
+            print(f"ERROR: Live feed failed to apply a machine update: {e}")
+            with self._lock:
+                self.stats["errors"] += 1
+
+    def _bump(self, company_id: Any) -> None:
+        with self._lock:
+            self.stats["events"] += 1
+            if company_id is not None:
+                self._versions[company_id] = self._versions.get(company_id, 0) + 1
+
+    def _record(self, payload: dict) -> None:
+        """Appends a received change to the recording replayed by the local stand-in"""
+        if not self.record_path:
+            return
+
+        data = payload["data"]
+        change = {"table": data["table"], "type": data["type"], "record": data["record"]}
+        with self._record_lock, open(self.record_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(change, default=str) + "\n")
+
+    def version(self, company_id: Any) -> int:
+        """Gets the number of events received for a company"""
+        with self._lock:
+            return self._versions.get(company_id, 0)
+
+    def last_contacts(self, company_id: Any) -> dict:
+        """Gets the last ultimo_contato received for each machine of a company"""
+        with self._lock:
+            return dict(self._last_contacts.get(company_id, {}))
+
+    def close(self) -> None:
+        """Closes the connection and stops the event loop thread"""
+        async def close_client():
+            await self._client.remove_all_channels()
+            await self._client.close()
+
+        try:
+            asyncio.run_coroutine_threadsafe(close_client(), self._loop).result(timeout=5.0)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5.0)
+
+
+_live_feed: LiveFeed | None = None
+_live_feed_lock = threading.Lock()
+
+
+def get_live_feed() -> LiveFeed | None:
+    """Gets the server-wide live feed, connected on the first call
+
+    Live mode is enabled with LIVE_MODE in the [supabase] secrets section.
+    LIVE_REALTIME_URL points it to another Realtime server (e.g. the local
+    stand-in) and LIVE_RECORD_PATH records the received changes.
+
+    Returns:
+        Live feed, or None if live mode is off or the credentials are missing
+    """
+    global _live_feed
+    if not get_setting("LIVE_MODE", False):
+        return None
+
+    with _live_feed_lock:
+        if _live_feed is None:
+            url = get_setting("SUPABASE_URL", "")
+            key = get_setting("SUPABASE_KEY", "")
+            if not url or not key:
+                return None
+
+            _live_feed = LiveFeed(
+                get_setting("LIVE_REALTIME_URL", f"{url}/realtime/v1"),
+                key,
+                get_setting("LIVE_RECORD_PATH", "") or None,
+            )
+
+    return _live_feed
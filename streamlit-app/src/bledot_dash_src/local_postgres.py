@@ -0,0 +1,41 @@
+import re
+from types import SimpleNamespace
+import psycopg2
+from psycopg2.extras import Json, RealDictCursor
+
+
+class LocalPostgresClient:
+    """Stand-in for the Supabase client backed by a local Postgres database
+
+    Only RPC calls are supported, which is enough to exercise the database-side
+    aggregates (sql/fleet_aggregates.sql) without a Supabase project.
+    """
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+
+    def rpc(self, fn: str, params: dict | None = None) -> "_LocalRpcCall":
+        for name in [fn, *(params or {})]:
+            if not re.fullmatch(r"[A-Za-z_]\w*", name):
+                raise ValueError(f"Invalid identifier: {name}")
+        return _LocalRpcCall(self.dsn, fn, params or {})
+
+
+class _LocalRpcCall:
+    def __init__(self, dsn: str, fn: str, params: dict):
+        self.dsn = dsn
+        self.fn = fn
+        self.params = {
+            name: Json(value) if isinstance(value, (dict, list)) else value
+            for name, value in params.items()
+        }
+
+    def execute(self) -> SimpleNamespace:
+        args = ", ".join(f"{name} => %({name})s" for name in self.params)
+        conn = psycopg2.connect(self.dsn)
+        try:
+            with conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(f"select * from public.{self.fn}({args})", self.params)
+                return SimpleNamespace(data=[dict(row) for row in cursor.fetchall()])
+        finally:
+            conn.close()
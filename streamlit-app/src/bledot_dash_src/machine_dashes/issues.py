@@ -1,11 +1,12 @@
 import streamlit as st
 from src.bledot_dash_src.session_state import get_session_state
+from bledot_dash_src.shared_data import get_shared_state
 
 
 def run_issues_dash():
     st.header("Máquinas comprometidas")
 
-    company_machines = get_session_state("company_data")["machines"]
+    company_machines = get_shared_state("company_data")["machines"]
     machines_with_issues = get_session_state("machines_with_issues")
     metrics_threshold = get_session_state("metrics_threshold")
 
@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from src.bledot_dash_src.session_state import get_session_state
+from bledot_dash_src.shared_data import get_shared_state
 from src.bledot_dash_src.charts import (
     get_colors,
     create_hsbar_chart,
@@ -14,8 +15,8 @@ from src.bledot_dash_src.charts import (
 def run_specifics_dash():
     st.header("Propriedades")
 
-    machine_data = get_session_state("machine_data")
-    issues = machine_data["issues"][get_session_state("machine_id")]
+    machine_data = get_shared_state("machine_data")
+    issues = machine_data["issues"].issues_of(get_session_state("machine_id"))
     config = machine_data["config"]
 
     st.subheader("Configuração")
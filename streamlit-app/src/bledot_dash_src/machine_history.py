@@ -0,0 +1,102 @@
+from collections.abc import Mapping
+from typing import Any, Iterator
+import pandas as pd
+
+
+class MachineHistory(Mapping):
+    """Machine dashboard data, with how it was loaded
+
+    Reads as the mapping indexed by the machine dashboards (metrics_kpi,
+    avg_metrics, max_metrics, min_metrics, power_consumption_hist,
+    pkg_loss_mean, issues and config). A history without metrics is falsy and
+    all of its values are None.
+
+    Attributes:
+        source: "window" (date window), "latest" (last samples fallback),
+            "live" (live updates) or "empty"
+        rows: number of metric rows the data was computed from
+        pages: number of pages read from the database
+        queries: number of queries made to load it
+        seconds: load time
+    """
+
+    fields = [
+        "metrics_kpi", "avg_metrics", "max_metrics", "min_metrics",
+        "power_consumption_hist", "pkg_loss_mean", "issues", "config",
+    ]
+
+    def __init__(
+        self,
+        values: dict | None = None,
+        source: str = "empty",
+        rows: int = 0,
+        pages: int = 0,
+        queries: int = 0,
+        seconds: float = 0.0,
+    ):
+        self._values = {field: (values or {}).get(field) for field in self.fields}
+        self.source = source
+        self.rows = rows
+        self.pages = pages
+        self.queries = queries
+        self.seconds = seconds
+
+    @classmethod
+    def from_result(cls, result: dict, **load_info) -> "MachineHistory":
+        """Builds the dashboard data from a HistoryAggregator or MetricsWindow result
+
+        Args:
+            result: KPI table, power history, packet loss mean, issues and config
+            load_info: source, rows, pages, queries and seconds
+
+        Returns:
+            Machine history with the KPIs split into avg, max and min dicts
+        """
+        kpi: pd.DataFrame = result["metrics_kpi"]
+        return cls(
+            {
+                **result,
+                "avg_metrics": kpi["mean"].to_dict(),
+                "max_metrics": kpi["max"].dropna().to_dict(),
+                "min_metrics": kpi["min"].dropna().to_dict(),
+            },
+            **load_info,
+        )
+
+    @property
+    def empty(self) -> bool:
+        return self._values["metrics_kpi"] is None
+
+    @property
+    def version(self) -> tuple:
+        """Version of the history, which changes with the metrics it was computed from"""
+        if self.empty:
+            return ("empty",)
+        kpi_hash = int(pd.util.hash_pandas_object(self._values["metrics_kpi"]).sum())
+        return (self.rows, kpi_hash)
+
+    @property
+    def load_stats(self) -> dict:
+        """Source, rows, pages, queries and seconds of the load"""
+        return {
+            "source": self.source,
+            "rows": self.rows,
+            "pages": self.pages,
+            "queries": self.queries,
+            "seconds": self.seconds,
+        }
+
+    def __getitem__(self, field: str) -> Any:
+        return self._values[field]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.fields)
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    def __bool__(self) -> bool:
+        return not self.empty
+
+    def __repr__(self) -> str:
+        return f"MachineHistory({self.load_stats})"
@@ -0,0 +1,349 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from bledot_dash_src.settings import get_setting
+
+try:
+    import fcntl
+except ImportError:  # Windows: writes are only serialized within the process
+    fcntl = None
+
+
+# Location, age and total size limits of the on-disk metrics cache, overridable
+# through the [supabase] secrets section (DISK_CACHE_PATH, DISK_CACHE_MAX_DAYS,
+# DISK_CACHE_MAX_MB); it is enabled with DISK_CACHE
+default_path = ".cache/metrics"
+default_max_days = 30
+default_max_mb = 512.0
+
+# Bumped whenever the file layout changes, so older files are dropped
+format_version = 1
+
+
+def _json_value(value: Any) -> Any:
+    """Converts numpy scalars and arrays of the config fields to JSON values"""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def _drop_duplicate_ids(table: pa.Table) -> pa.Table:
+    """Keeps the last row of each id"""
+    ids = table["id"].to_numpy()
+    _, last_from_end = np.unique(ids[::-1], return_index=True)
+    return table.take(np.sort(len(ids) - 1 - last_from_end))
+
+
+class MetricsStore:
+    """On-disk cache of the metrics of each company, one Arrow IPC file per day
+
+    Files live in <root>/v<format_version>/company=<id>/day=<YYYY-MM-DD>.arrow
+    and are read memory-mapped. A manifest per company keeps, for each machine,
+    the data_coleta range whose rows are all stored (so a range can be served
+    without querying), its config fields, and the size of each file. The
+    manifest also holds a fingerprint of the stored columns: writing other
+    columns, a file that does not match the manifest or a newer
+    format_version invalidate the old files. Days older than max_days and the
+    oldest days beyond max_bytes are evicted.
+    """
+
+    def __init__(self, root: str, max_days: int, max_bytes: float):
+        self.root = Path(root)
+        self.max_days = max_days
+        self.max_bytes = max_bytes
+        self.stats = {"reads": 0, "rows_read": 0, "writes": 0, "rows_written": 0,
+                      "evicted_files": 0, "invalidations": 0}
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(columns: list[str]) -> str:
+        """Gets the schema fingerprint of a column list"""
+        return hashlib.sha1(f"{format_version}:{','.join(sorted(columns))}".encode()).hexdigest()
+
+    def _company_dir(self, company_id: Any) -> Path:
+        return self.root / f"v{format_version}" / f"company={company_id}"
+
+    @contextmanager
+    def _company_lock(self, company_id: Any) -> Iterator[None]:
+        """Serializes the access to a company's files, across threads and processes"""
+        with self._lock:
+            lock = self._locks.setdefault(str(company_id), threading.Lock())
+
+        with lock:
+            company_dir = self._company_dir(company_id)
+            company_dir.mkdir(parents=True, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(company_dir / ".lock", "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_manifest(self, company_id: Any) -> dict:
+        try:
+            with open(self._company_dir(company_id) / "manifest.json", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, company_id: Any, manifest: dict) -> None:
+        path = self._company_dir(company_id) / "manifest.json"
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, default=_json_value)
+        os.replace(temp_path, path)
+
+    def _invalidate(self, company_id: Any) -> None:
+        """Drops every file of a company (must hold its lock)"""
+        company_dir = self._company_dir(company_id)
+        for path in company_dir.glob("day=*.arrow"):
+            path.unlink(missing_ok=True)
+        (company_dir / "manifest.json").unlink(missing_ok=True)
+        with self._lock:
+            self.stats["invalidations"] += 1
+
+    def _read_day(self, company_id: Any, day: str, manifest: dict) -> pa.Table | None:
+        """Opens a day file memory-mapped, checking it against the manifest"""
+        path = self._company_dir(company_id) / f"day={day}.arrow"
+        entry = manifest["days"].get(day)
+        if entry is None:
+            return None
+        if not path.exists() or path.stat().st_size != entry["bytes"]:
+            raise ValueError(f"{path} does not match the manifest")
+
+        with pa.memory_map(str(path)) as source:
+            table = pa.ipc.open_file(source).read_all()
+        metadata = table.schema.metadata or {}
+        if metadata.get(b"fingerprint", b"").decode() != manifest["fingerprint"]:
+            raise ValueError(f"{path} has another schema")
+
+        return table
+
+    def _write_day(self, company_id: Any, day: str, table: pa.Table, fingerprint: str) -> int:
+        """Writes a day file atomically, returning its size"""
+        path = self._company_dir(company_id) / f"day={day}.arrow"
+        temp_path = path.with_suffix(".tmp")
+        table = table.replace_schema_metadata({"fingerprint": fingerprint})
+        with pa.OSFile(str(temp_path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(temp_path, path)
+        return path.stat().st_size
+
+    def read(
+        self, company_id: Any, machine_id: Any, start: pd.Timestamp, columns: list[str]
+    ) -> tuple[pd.DataFrame, dict] | None:
+        """Gets a machine's stored rows after start, if the store covers them
+
+        Args:
+            company_id: company of the machine
+            machine_id: machine ID
+            start: beginning of the range
+            columns: metric columns to be read
+
+        Returns:
+            Rows newest first and config fields of the machine, or None if the
+            stored range does not reach back to start
+        """
+        with self._company_lock(company_id):
+            manifest = self._read_manifest(company_id)
+            coverage = manifest.get("coverage", {}).get(str(machine_id))
+            if manifest.get("fingerprint") != self.fingerprint(columns) or coverage is None:
+                return None
+
+            covered_from, covered_to = (pd.Timestamp(bound) for bound in coverage)
+            if covered_from > start:
+                return None
+
+            days = [
+                day.strftime("%Y-%m-%d")
+                for day in pd.date_range(start.floor("D"), covered_to.floor("D"), freq="D")
+            ]
+            try:
+                tables = [
+                    table.filter(pc.equal(table["id_maquina"], machine_id))
+                    for table in (self._read_day(company_id, day, manifest) for day in days)
+                    if table is not None
+                ]
+            except (OSError, ValueError, pa.ArrowException) as e:
+                print(f"ERROR: Invalid metrics cache of company {company_id}, dropping it: {e}")
+                self._invalidate(company_id)
+                return None
+
+        rows = pa.concat_tables(tables).to_pandas() if tables else pd.DataFrame(columns=columns)
+        if not rows.empty:
+            rows = rows[(rows["data_coleta"] >= start) & (rows["data_coleta"] <= covered_to)] \
+                .sort_values(["data_coleta", "id"], ascending=False, ignore_index=True)
+
+        with self._lock:
+            self.stats["reads"] += 1
+            self.stats["rows_read"] += len(rows)
+        return rows, manifest.get("config", {}).get(str(machine_id), {})
+
+    def write(
+        self, company_id: Any, machine_id: Any, rows: pd.DataFrame, start: pd.Timestamp, config: dict
+    ) -> None:
+        """Stores the rows of a machine's range [start, newest row] whose ids are
+        not stored yet
+
+        Args:
+            company_id: company of the machine
+            machine_id: machine ID
+            rows: every row of the machine from start on, with the stored columns
+            start: beginning of the range
+            config: config fields of the machine
+        """
+        if rows.empty:
+            return
+
+        columns = list(rows.columns)
+        fingerprint = self.fingerprint(columns)
+        newest = rows["data_coleta"].max()
+
+        with self._company_lock(company_id):
+            manifest = self._read_manifest(company_id)
+            if manifest.get("fingerprint") != fingerprint:
+                if manifest:
+                    self._invalidate(company_id)
+                manifest = {"fingerprint": fingerprint, "days": {}, "coverage": {}, "config": {}}
+
+            # The stored range grows to include the rows, unless the ranges do not touch
+            coverage = manifest["coverage"].get(str(machine_id))
+            if coverage is not None:
+                covered_from, covered_to = (pd.Timestamp(bound) for bound in coverage)
+                if start <= covered_to:
+                    start, newest = min(start, covered_from), max(newest, covered_to)
+            new_coverage = [start.isoformat(), newest.isoformat()]
+
+            # Every row whose id is not stored yet is written, including rows
+            # uploaded late into the stored range
+            written = 0
+            try:
+                for day, day_rows in rows.groupby(rows["data_coleta"].dt.strftime("%Y-%m-%d")):
+                    stored = self._read_day(company_id, day, manifest)
+                    if stored is not None:
+                        day_rows = day_rows[~day_rows["id"].isin(stored["id"].to_numpy())]
+                        if day_rows.empty:
+                            continue
+                    table = pa.Table.from_pandas(day_rows[columns], preserve_index=False)
+                    if stored is not None:
+                        table = _drop_duplicate_ids(
+                            pa.concat_tables([stored, table], promote_options="permissive")
+                        )
+                    manifest["days"][day] = {"bytes": self._write_day(company_id, day, table, fingerprint)}
+                    written += len(day_rows)
+            except (OSError, ValueError, pa.ArrowException) as e:
+                print(f"ERROR: Could not store the metrics of company {company_id}: {e}")
+                self._invalidate(company_id)
+                return
+
+            if not written and coverage == new_coverage:
+                return
+
+            manifest["coverage"][str(machine_id)] = new_coverage
+            manifest["config"][str(machine_id)] = config
+            self._write_manifest(company_id, manifest)
+
+        with self._lock:
+            self.stats["writes"] += 1
+            self.stats["rows_written"] += written
+        self.evict()
+
+    def evict(self, now: pd.Timestamp | None = None) -> int:
+        """Drops the files of older formats, the days older than max_days and
+        the oldest days while the store is over max_bytes
+
+        Args:
+            now: current time (by default, the actual one)
+
+        Returns:
+            Number of evicted day files
+        """
+        now = now if now is not None else pd.Timestamp.now(tz="UTC")
+        oldest_day = (now - pd.Timedelta(days=self.max_days)).strftime("%Y-%m-%d")
+
+        for version_dir in self.root.glob("v*"):
+            if version_dir.name != f"v{format_version}":
+                shutil.rmtree(version_dir, ignore_errors=True)
+
+        # (day, company, bytes) of every stored file
+        files = []
+        for company_dir in self.root.glob(f"v{format_version}/company=*"):
+            company_id = company_dir.name.split("=", 1)[1]
+            for day, entry in self._read_manifest(company_id).get("days", {}).items():
+                files.append((day, company_id, entry["bytes"]))
+
+        files.sort()
+        total_bytes = sum(size for _, _, size in files)
+        evicted: dict[str, list[str]] = {}
+        for day, company_id, size in files:
+            if day >= oldest_day and total_bytes <= self.max_bytes:
+                break
+            evicted.setdefault(company_id, []).append(day)
+            total_bytes -= size
+
+        for company_id, days in evicted.items():
+            with self._company_lock(company_id):
+                manifest = self._read_manifest(company_id)
+                for day in days:
+                    manifest["days"].pop(day, None)
+                    (self._company_dir(company_id) / f"day={day}.arrow").unlink(missing_ok=True)
+
+                # Stored ranges now start after the newest evicted day
+                kept_from = (pd.Timestamp(max(days), tz="UTC") + pd.Timedelta(days=1)).isoformat()
+                for machine_id, (covered_from, covered_to) in list(manifest["coverage"].items()):
+                    if pd.Timestamp(covered_to) < pd.Timestamp(kept_from):
+                        del manifest["coverage"][machine_id]
+                    else:
+                        manifest["coverage"][machine_id] = [max(covered_from, kept_from, key=pd.Timestamp), covered_to]
+                self._write_manifest(company_id, manifest)
+
+        count = sum(len(days) for days in evicted.values())
+        with self._lock:
+            self.stats["evicted_files"] += count
+        return count
+
+    def size(self) -> int:
+        """Gets the total size of the stored files (bytes)"""
+        return sum(path.stat().st_size for path in self.root.glob(f"v{format_version}/company=*/day=*.arrow"))
+
+
+_metrics_store: MetricsStore | None = None
+_metrics_store_lock = threading.Lock()
+
+
+def get_metrics_store() -> MetricsStore | None:
+    """Gets the server-wide on-disk metrics cache
+
+    Enabled with DISK_CACHE in the [supabase] secrets section.
+
+    Returns:
+        Metrics store, or None if the disk cache is off
+    """
+    global _metrics_store
+    if not get_setting("DISK_CACHE", False):
+        return None
+
+    with _metrics_store_lock:
+        if _metrics_store is None:
+            _metrics_store = MetricsStore(
+                get_setting("DISK_CACHE_PATH", default_path),
+                get_setting("DISK_CACHE_MAX_DAYS", default_max_days),
+                get_setting("DISK_CACHE_MAX_MB", default_max_mb) * 1024 * 1024,
+            )
+
+    return _metrics_store
@@ -0,0 +1,62 @@
+from typing import Iterable
+from bledot_dash_src.history_aggregator import config_fields
+
+
+# Columns every metrics query needs (keys and ordering)
+base_columns = ["id", "id_maquina", "data_coleta"]
+
+# Columns of metricas_maquina displayed by each dashboard tab
+tab_columns = {
+    "overview": [
+        "recent_hardware_failures", "click_rate", "keypress_rate",
+        "instant_power_consumption", "cpu_temperature", "gpu_temperature", "ram_usage",
+    ],
+    "processing": [
+        "cpu_usage", "cpu_temperature", "gpu_usage", "gpu_temperature",
+        "gpu_voltage", "fan_rpm_cpu", "fan_rpm_gpu",
+    ],
+    "hardware": [
+        "disk_usage_root", "disk_usage_home", "disk_usage_boot", "ram_usage",
+        "smart_overall", "battery_health", "swap_usage", "instant_power_consumption",
+    ],
+    "software": [
+        "firewall_active", "failed_logins", "click_rate", "keypress_rate", "pkg_loss_list",
+    ],
+    "specifics": config_fields,
+    "issues": [],
+}
+
+company_tabs = ["overview", "processing", "hardware", "software", "issues"]
+machine_tabs = ["overview", "processing", "hardware", "software", "specifics"]
+
+# Columns of the metrics export (every column, so the config fields are kept),
+# only fetched when an export is built
+export_columns = None
+
+# Columns of the other tables read by the dashboards
+client_columns = ["id", "nome_empresa"]
+machine_columns = ["id", "id_empresa", "label_maquina", "data_registro", "ultimo_contato"]
+
+
+def get_metric_columns(tabs: Iterable[str], extra_columns: Iterable[str] = ()) -> list[str]:
+    """Gets the union of the metric columns needed by some tabs
+
+    Args:
+        tabs: names of the tabs (keys of tab_columns)
+        extra_columns: other needed columns (e.g. the thresholded metrics)
+
+    Returns:
+        Needed columns, without repetitions
+    """
+    columns = base_columns + list(extra_columns)
+    for tab in tabs:
+        columns = columns + tab_columns[tab]
+
+    return list(dict.fromkeys(columns))
+
+
+def to_select(columns: Iterable[str] | None) -> str:
+    """Formats columns as a PostgREST select ("*" if columns is None)"""
+    if columns is None:
+        return "*"
+    return ",".join(columns)
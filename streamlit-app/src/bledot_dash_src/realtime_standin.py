@@ -0,0 +1,167 @@
+"""Local stand-in for Supabase Realtime that replays recorded changes
+
+Speaks the part of the Realtime websocket protocol used by LiveFeed (channel
+joins with postgres_changes bindings, heartbeats and leaves) and pushes the
+changes of a JSON lines recording, one per line as
+{"table": ..., "type": "INSERT" | "UPDATE", "record": {...}, "delay": seconds}
+(the format written with LIVE_RECORD_PATH). Point the dashboard to it with
+LIVE_REALTIME_URL = "ws://localhost:4000".
+
+Run from the streamlit-app directory:
+    python -m bledot_dash_src.realtime_standin recording.jsonl --port 4000 --now
+"""
+import argparse
+import asyncio
+import itertools
+import json
+from datetime import datetime, timezone
+from typing import Any
+from websockets.asyncio.server import ServerConnection, serve
+
+
+# Timestamp columns rewritten to the replay time with --now
+timestamp_fields = ["data_coleta", "ultimo_contato"]
+
+# Values accepted at most in an in.(...) filter, as by Realtime (joins with a
+# longer filter are refused)
+in_filter_max_values = 100
+
+
+def load_recording(path: str) -> list[dict]:
+    """Loads the recorded changes of a JSON lines file"""
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def matches_filter(record: dict, binding_filter: str | None) -> bool:
+    """Checks a record against a Realtime filter (column=eq.value or column=in.(values))"""
+    if not binding_filter:
+        return True
+
+    column, condition = binding_filter.split("=", 1)
+    operator, value = condition.split(".", 1)
+    if operator == "eq":
+        return str(record.get(column)) == value
+    if operator == "in":
+        return str(record.get(column)) in value.strip("()").split(",")
+    return False
+
+
+def filter_error(binding_filter: str | None) -> str | None:
+    """Gets the reason Realtime would refuse a filter (None if it is accepted)"""
+    if not binding_filter or "=in." not in binding_filter:
+        return None
+
+    values = binding_filter.split("=in.", 1)[1].strip("()").split(",")
+    if len(values) > in_filter_max_values:
+        return f"in filters accept at most {in_filter_max_values} values, got {len(values)}"
+    return None
+
+
+class RealtimeStandin:
+    """Realtime server replaying a recording to every joined channel"""
+
+    def __init__(self, changes: list[dict], interval: float = 1.0, loop: bool = False, now: bool = False):
+        self.changes = changes
+        self.interval = interval
+        self.loop = loop
+        self.now = now
+        self._binding_ids = itertools.count(1)
+
+    def _message(self, event: str, topic: str, payload: dict, ref: Any = None) -> str:
+        return json.dumps({"event": event, "topic": topic, "payload": payload, "ref": ref})
+
+    def _change_payload(self, change: dict, ids: list[int]) -> dict:
+        record = dict(change["record"])
+        if self.now:
+            for field in timestamp_fields:
+                if field in record:
+                    record[field] = datetime.now(timezone.utc).isoformat()
+
+        return {
+            "ids": ids,
+            "data": {
+                "schema": "public",
+                "table": change["table"],
+                "commit_timestamp": datetime.now(timezone.utc).isoformat(),
+                "type": change["type"],
+                "errors": None,
+                "columns": [],
+                "record": record,
+            },
+        }
+
+    async def _replay(self, websocket: ServerConnection, channels: dict[str, list[dict]]) -> None:
+        while True:
+            for change in self.changes:
+                await asyncio.sleep(change.get("delay", self.interval))
+                for topic, bindings in list(channels.items()):
+                    ids = [
+                        binding["id"] for binding in bindings
+                        if binding["table"] == change["table"]
+                        and binding["event"] in (change["type"], "*")
+                        and matches_filter(change["record"], binding.get("filter"))
+                    ]
+                    if ids:
+                        await websocket.send(
+                            self._message("postgres_changes", topic, self._change_payload(change, ids))
+                        )
+            if not self.loop:
+                return
+
+    async def handle(self, websocket: ServerConnection) -> None:
+        """Serves one client connection"""
+        channels: dict[str, list[dict]] = {}
+        replay = None
+        try:
+            async for raw_message in websocket:
+                message = json.loads(raw_message)
+                event, topic, ref = message["event"], message["topic"], message.get("ref")
+                response: dict = {}
+
+                if event == "phx_join":
+                    bindings = message["payload"].get("config", {}).get("postgres_changes", [])
+                    reason = next(filter(None, (filter_error(binding.get("filter")) for binding in bindings)), None)
+                    if reason is not None:
+                        await websocket.send(self._message(
+                            "phx_reply", topic, {"status": "error", "response": {"reason": reason}}, ref
+                        ))
+                        continue
+
+                    bindings = [{**binding, "id": next(self._binding_ids)} for binding in bindings]
+                    channels[topic] = bindings
+                    response = {"postgres_changes": bindings}
+                    if replay is None:
+                        replay = asyncio.create_task(self._replay(websocket, channels))
+                elif event == "phx_leave":
+                    channels.pop(topic, None)
+
+                await websocket.send(
+                    self._message("phx_reply", topic, {"status": "ok", "response": response}, ref)
+                )
+        finally:
+            if replay is not None:
+                replay.cancel()
+
+    async def serve(self, host: str, port: int) -> None:
+        """Serves until cancelled"""
+        async with serve(self.handle, host, port) as server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording", help="JSON lines file with the changes to be replayed")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=4000)
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between changes without a delay")
+    parser.add_argument("--loop", action="store_true", help="replay the recording forever")
+    parser.add_argument("--now", action="store_true", help="stamp the changes with the replay time")
+    args = parser.parse_args()
+
+    standin = RealtimeStandin(load_recording(args.recording), args.interval, args.loop, args.now)
+    asyncio.run(standin.serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
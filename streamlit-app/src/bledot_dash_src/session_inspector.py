@@ -0,0 +1,103 @@
+import random
+import sys
+import threading
+import time
+import pandas as pd
+from streamlit.runtime import Runtime
+from bledot_dash_src.settings import get_setting
+from bledot_dash_src.shared_data import SessionDatasets, deep_size
+
+
+# Items measured per container or object column, sessions measured per report
+# and seconds a report is reused, overridable through the [supabase] secrets
+# section (INSPECTOR_SAMPLE_ITEMS, INSPECTOR_MAX_SESSIONS, INSPECTOR_TTL)
+default_sample_items = 64
+default_max_sessions = 50
+default_ttl = 30.0
+
+
+def _list_sessions() -> tuple[list, int]:
+    """Gets the sessions of the server and the number of active ones (none if
+    the runtime does not expose them, e.g. in tests)"""
+    if not Runtime.exists():
+        return [], 0
+    try:
+        session_mgr = Runtime.instance()._session_mgr
+        return list(session_mgr.list_sessions()), int(session_mgr.num_active_sessions())
+    except Exception:
+        return [], 0
+
+
+def _session_values(session_info) -> dict:
+    """Gets the session state of a session, widget values included"""
+    try:
+        return session_info.session.session_state.filtered_state
+    except Exception:
+        return {}
+
+
+def inspect_sessions(
+    max_sessions: int | None = None, sample_items: int | None = None
+) -> dict:
+    """Measures the session states of the server
+
+    The sizes are estimated with deep_size, sampling sample_items items per
+    container, on up to max_sessions sessions, and the totals extrapolated to
+    every session. Shared datasets are counted
+    apart, as they are held once for all the sessions referencing them.
+
+    Returns:
+        Session counts, rows of (session, key, bytes, shared_bytes), and the
+        measured and estimated totals
+    """
+    max_sessions = max_sessions or get_setting("INSPECTOR_MAX_SESSIONS", default_max_sessions)
+    sample_items = sample_items or get_setting("INSPECTOR_SAMPLE_ITEMS", default_sample_items)
+
+    started = time.perf_counter()
+    sessions, active = _list_sessions()
+    sampled = random.sample(sessions, max_sessions) if len(sessions) > max_sessions else sessions
+
+    rows = []
+    for session_info in sampled:
+        session_id = session_info.session.id
+        for key, value in _session_values(session_info).items():
+            if isinstance(value, SessionDatasets):
+                rows.append((session_id, key, sys.getsizeof(value), value.size))
+            else:
+                rows.append((session_id, key, deep_size(value, sample_items=sample_items), 0))
+
+    keys = pd.DataFrame(rows, columns=["session", "key", "bytes", "shared_bytes"])
+    measured = int(keys["bytes"].sum())
+    scale = len(sessions) / len(sampled) if sampled else 0
+
+    return {
+        "sessions": len(sessions),
+        "active_sessions": active,
+        "sampled_sessions": len(sampled),
+        "keys": keys,
+        "measured_bytes": measured,
+        "estimated_bytes": int(measured * scale),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+class SessionInspector:
+    """Server-wide session state report, reused for INSPECTOR_TTL seconds"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._report: dict | None = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def report(self, refresh: bool = False) -> dict:
+        """Gets the last report of inspect_sessions, measuring again if it is
+        older than ttl (or if refresh is set)"""
+        with self._lock:
+            if refresh or self._report is None or time.monotonic() - self._loaded_at >= self.ttl:
+                self._report = inspect_sessions()
+                self._loaded_at = time.monotonic()
+            return self._report
+
+
+session_inspector = SessionInspector(get_setting("INSPECTOR_TTL", default_ttl))
@@ -48,3 +48,12 @@ def check_session_state(key: str) -> bool:
         True if session state variable exists, false otherwise
     """
     return key in st.session_state
+
+def delete_session_state(key: str) -> None:
+    """Deletes a session state variable if it exists
+
+    Args:
+        key: key for session state variable
+    """
+    if key in st.session_state:
+        del st.session_state[key]
@@ -0,0 +1,54 @@
+import streamlit as st
+from typing import Any
+
+
+true_values = {"true", "1", "yes", "on"}
+false_values = {"false", "0", "no", "off"}
+
+
+def parse_setting(value: Any, default: Any) -> Any:
+    """Converts a stored setting to the type of its default
+
+    Booleans are parsed from their usual spellings ("true"/"1"/"yes"/"on" and
+    "false"/"0"/"no"/"off"), so a quoted "false" reads as False.
+
+    Raises:
+        ValueError: if the value cannot be converted
+    """
+    if isinstance(default, bool):
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text in true_values:
+            return True
+        if text in false_values:
+            return False
+        raise ValueError(f"invalid boolean {value!r}")
+
+    return type(default)(value)
+
+
+def get_setting(key: str, default: Any) -> Any:
+    """Gets an optional setting from the [supabase] secrets section
+
+    Args:
+        key: key of the setting in the secrets file
+        default: value used when the setting (or the secrets file) is missing,
+            its type is also used to convert the stored value
+
+    Returns:
+        Value of the setting (default if it cannot be converted)
+    """
+    try:
+        value = st.secrets.supabase.get(key)
+    except Exception:
+        return default
+
+    if value is None:
+        return default
+
+    try:
+        return parse_setting(value, default)
+    except (TypeError, ValueError) as e:
+        print(f"ERROR: Invalid setting {key}={value!r}, using {default!r}: {e}")
+        return default
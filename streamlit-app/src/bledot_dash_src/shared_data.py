@@ -0,0 +1,293 @@
+import random
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from typing import Any, Callable, Hashable
+import numpy as np
+import pandas as pd
+import streamlit as st
+from bledot_dash_src.data_cache import freeze
+from bledot_dash_src.settings import get_setting
+
+
+# Memory budget of the datasets referenced by each session (MB), overridable
+# through the [supabase] secrets section (SESSION_MEMORY_MB)
+default_session_memory_mb = 256.0
+
+session_key = "shared_datasets"
+
+
+def deep_size(value: Any, seen: set[int] | None = None, sample_items: int | None = None) -> int:
+    """Estimates the memory used by a value and everything it references
+
+    Frames, series and arrays are measured by their buffers (strings included),
+    and objects referenced more than once are counted once. With sample_items,
+    containers and object columns with more items are measured on a random
+    sample of them and extrapolated, so large values cost the same to measure
+    as small ones.
+
+    Args:
+        value: value to be measured
+        seen: ids of the objects already counted
+        sample_items: items measured per container or object column (all of
+            them if not given)
+
+    Returns:
+        Size in bytes (estimated when sampling)
+    """
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, pd.DataFrame):
+        if sample_items is None:
+            return int(value.memory_usage(index=True, deep=True).sum())
+        size = int(value.index.memory_usage())
+        for _, column in value.items():
+            size += deep_size(column, seen, sample_items)
+        return size
+    if isinstance(value, (pd.Series, pd.Index)):
+        if sample_items is None or value.dtype != object:
+            return int(value.memory_usage(deep=True))
+        return int(value.memory_usage(deep=False)) + _items_size(value.to_numpy(), seen, sample_items)
+    if isinstance(value, np.ndarray):
+        if value.dtype != object:
+            return int(value.nbytes)
+        return int(value.nbytes) + _items_size(value.ravel(), seen, sample_items)
+
+    size = sys.getsizeof(value)
+    if isinstance(value, Mapping):
+        size += _items_size([*value.keys(), *value.values()], seen, sample_items)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += _items_size(value if isinstance(value, (list, tuple)) else list(value), seen, sample_items)
+    if hasattr(value, "__dict__"):
+        size += deep_size(vars(value), seen, sample_items)
+
+    return size
+
+
+def _items_size(items: Sequence, seen: set[int], sample_items: int | None) -> int:
+    """Sums deep_size over the items, or over a random sample of sample_items
+    of them scaled to all the items"""
+    if sample_items is None or len(items) <= sample_items:
+        return sum(deep_size(item, seen, sample_items) for item in items)
+    sample = [items[i] for i in random.sample(range(len(items)), sample_items)]
+    return int(sum(deep_size(item, seen, sample_items) for item in sample) * len(items) / sample_items)
+
+
+class SharedDatasets:
+    """Server-wide read-only datasets referenced by the sessions, with reference
+    counting
+
+    Sessions sharing a key share one frozen value, which is dropped when the last
+    session referencing it lets it go.
+    """
+
+    def __init__(self):
+        # key: [value, size, references]
+        self._entries: dict[Hashable, list] = {}
+        self._key_locks: dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._stats = {"shared": 0, "added": 0, "dropped": 0}
+
+    def acquire(self, key: Hashable, loader: Callable[[], Any]) -> tuple[Any, int]:
+        """References the dataset of a key, loading it if no session holds it
+
+        Args:
+            key: dataset key (e.g. ("company_data", client_id, version))
+            loader: function that builds the dataset
+
+        Returns:
+            Shared read-only dataset and its size in bytes
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[2] += 1
+                self._stats["shared"] += 1
+                return entry[0], entry[1]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Only one session builds a missing dataset, the others wait for it
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry[2] += 1
+                    self._stats["shared"] += 1
+                    return entry[0], entry[1]
+
+            value = freeze(loader())
+            size = deep_size(value)
+            with self._lock:
+                self._entries[key] = [value, size, 1]
+                self._stats["added"] += 1
+            return value, size
+
+    def share(self, key: Hashable, value: Any) -> tuple[Any, int]:
+        """References a dataset built elsewhere, keeping the copy already shared
+        under its key if there is one
+
+        Args:
+            key: dataset key
+            value: dataset
+
+        Returns:
+            Shared read-only dataset and its size in bytes
+        """
+        return self.acquire(key, lambda: value)
+
+    def peek(self, key: Hashable) -> Any:
+        """Gets the dataset of a key without referencing it (None if no session holds it)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry[0]
+
+    def release(self, key: Hashable) -> None:
+        """Drops a reference to a dataset, and the dataset with the last one"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry[2] -= 1
+            if entry[2] <= 0:
+                del self._entries[key]
+                self._key_locks.pop(key, None)
+                self._stats["dropped"] += 1
+
+    def stats(self) -> dict:
+        """Gets the number of datasets, their size and references, and the counters"""
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "bytes": sum(entry[1] for entry in self._entries.values()),
+                "references": sum(entry[2] for entry in self._entries.values()),
+            }
+
+
+shared_datasets = SharedDatasets()
+
+
+def _release_all(store: SharedDatasets, entries: OrderedDict) -> None:
+    for key, _ in entries.values():
+        store.release(key)
+    entries.clear()
+
+
+class SessionDatasets:
+    """References of one session to shared datasets, by name, within a memory
+    budget
+
+    Past the budget, the least recently used datasets are let go (their name
+    reads as missing, so the pages load them again). The references are
+    released when the session state is discarded.
+    """
+
+    def __init__(self, budget: int, store: SharedDatasets = shared_datasets):
+        self.budget = budget
+        self.store = store
+        # name: (key, size), least recently used first
+        self._entries: OrderedDict[str, tuple[Hashable, int]] = OrderedDict()
+        self._finalizer = weakref.finalize(self, _release_all, store, self._entries)
+        self.evictions = 0
+
+    def _set(
+        self, name: str, key: Hashable, acquire: Callable[[], tuple[Any, int]], keep: tuple[str, ...]
+    ) -> Any:
+        current = self._entries.get(name)
+        if current is not None and current[0] == key:
+            self._entries.move_to_end(name)
+            return self.get(name)
+
+        value, size = acquire()
+        if current is not None:
+            self.store.release(current[0])
+        self._entries[name] = (key, size)
+        self._entries.move_to_end(name)
+
+        # The dataset just set (and the ones it is used with) are kept even if
+        # they do not fit the budget alone
+        for evicted in [evicted for evicted in self._entries if evicted not in (name, *keep)]:
+            if self.size <= self.budget:
+                break
+            self.store.release(self._entries.pop(evicted)[0])
+            self.evictions += 1
+
+        return value
+
+    def put(self, name: str, key: Hashable, value: Any, keep: tuple[str, ...] = ()) -> Any:
+        """References a dataset under a name
+
+        Args:
+            name: name in the session (e.g. "company_data")
+            key: dataset key, equal for the same data in every session
+            value: dataset
+            keep: names not to be evicted to make room for it
+
+        Returns:
+            Shared read-only dataset (the copy of another session if it has the same key)
+        """
+        return self._set(name, key, lambda: self.store.share(key, value), keep)
+
+    def get_or_build(
+        self, name: str, key: Hashable, loader: Callable[[], Any], keep: tuple[str, ...] = ()
+    ) -> Any:
+        """References the dataset of a key under a name, building it if no session holds it"""
+        return self._set(name, key, lambda: self.store.acquire(key, loader), keep)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Gets the dataset referenced under a name (default if it is missing or was evicted)"""
+        entry = self._entries.get(name)
+        if entry is None:
+            return default
+        self._entries.move_to_end(name)
+
+        value = self.store.peek(entry[0])
+        return default if value is None else value
+
+    def key(self, name: str) -> Hashable | None:
+        """Gets the key of the dataset referenced under a name"""
+        entry = self._entries.get(name)
+        return None if entry is None else entry[0]
+
+    def delete(self, name: str) -> None:
+        """Drops the reference under a name"""
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            self.store.release(entry[0])
+
+    @property
+    def size(self) -> int:
+        """Size of the referenced datasets (bytes)"""
+        return sum(size for _, size in self._entries.values())
+
+    def stats(self) -> dict:
+        """Gets the size of each referenced dataset, the total, the budget and the evictions"""
+        return {
+            "datasets": {name: size for name, (_, size) in self._entries.items()},
+            "bytes": self.size,
+            "budget": self.budget,
+            "evictions": self.evictions,
+        }
+
+
+def get_session_datasets() -> SessionDatasets:
+    """Gets the shared dataset references of the current session"""
+    if session_key not in st.session_state:
+        budget = get_setting("SESSION_MEMORY_MB", default_session_memory_mb) * 2**20
+        st.session_state[session_key] = SessionDatasets(int(budget))
+    return st.session_state[session_key]
+
+
+def set_shared_state(name: str, key: Hashable, value: Any, keep: tuple[str, ...] = ()) -> Any:
+    """Stores a reference to a shared dataset in session (see SessionDatasets.put)"""
+    return get_session_datasets().put(name, key, value, keep)
+
+
+def get_shared_state(name: str, default: Any = None) -> Any:
+    """Gets a shared dataset referenced in session (see SessionDatasets.get)"""
+    return get_session_datasets().get(name, default)
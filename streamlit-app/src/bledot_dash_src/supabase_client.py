@@ -0,0 +1,113 @@
+import importlib.util
+import threading
+import httpx
+from supabase import create_client, Client, ClientOptions
+from bledot_dash_src.settings import get_setting
+
+
+# httpx only speaks HTTP/2 with the h2 package installed
+h2_available = importlib.util.find_spec("h2") is not None
+
+# Default connection pool settings, overridable through the [supabase] secrets
+# section (POOL_MAX_CONNECTIONS, POOL_MAX_KEEPALIVE, POOL_KEEPALIVE_EXPIRY,
+# POOL_HTTP2, POOL_TIMEOUT)
+default_pool_config = {
+    "max_connections": 20,
+    "max_keepalive_connections": 10,
+    "keepalive_expiry": 60.0,
+    "http2": h2_available,
+    "timeout": 30.0,
+}
+
+_secrets_keys = {
+    "max_connections": "POOL_MAX_CONNECTIONS",
+    "max_keepalive_connections": "POOL_MAX_KEEPALIVE",
+    "keepalive_expiry": "POOL_KEEPALIVE_EXPIRY",
+    "http2": "POOL_HTTP2",
+    "timeout": "POOL_TIMEOUT",
+}
+
+_clients: dict[tuple[str, str], Client] = {}
+_http_clients: dict[tuple[str, str], httpx.Client] = {}
+_stats = {"hits": 0, "misses": 0}
+_lock = threading.Lock()
+
+
+def get_pool_config() -> dict:
+    """Gets the connection pool settings
+
+    Returns:
+        Default pool settings updated with the values found in the secrets
+    """
+    return {
+        option: get_setting(_secrets_keys[option], default)
+        for option, default in default_pool_config.items()
+    }
+
+
+def _create_http_client(config: dict) -> httpx.Client:
+    limits = httpx.Limits(
+        max_connections=config["max_connections"],
+        max_keepalive_connections=config["max_keepalive_connections"],
+        keepalive_expiry=config["keepalive_expiry"],
+    )
+    return httpx.Client(
+        http2=config["http2"] and h2_available,
+        limits=limits,
+        timeout=httpx.Timeout(config["timeout"]),
+    )
+
+
+def get_shared_client(url: str, key: str) -> Client:
+    """Gets the process-wide Supabase client for the given credentials
+
+    The first call for a pair of credentials creates the client on top of a
+    keep-alive (and, if available, HTTP/2) connection pool, later calls reuse it.
+
+    Args:
+        url: Supabase project URL
+        key: Supabase API key
+
+    Returns:
+        Shared Supabase client
+    """
+    client_key = (url, key)
+
+    with _lock:
+        client = _clients.get(client_key)
+        if client is not None:
+            _stats["hits"] += 1
+            return client
+
+        _stats["misses"] += 1
+        http_client = _create_http_client(get_pool_config())
+        client = create_client(url, key, ClientOptions(httpx_client=http_client))
+
+        _http_clients[client_key] = http_client
+        _clients[client_key] = client
+
+    return client
+
+
+def get_pool_stats() -> dict:
+    """Gets the client registry counters
+
+    Returns:
+        Number of registry hits, misses and live clients
+    """
+    with _lock:
+        return {
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "clients": len(_clients),
+        }
+
+
+def close_shared_clients() -> None:
+    """Closes every pooled connection and empties the client registry"""
+    with _lock:
+        for http_client in _http_clients.values():
+            http_client.close()
+
+        _http_clients.clear()
+        _clients.clear()
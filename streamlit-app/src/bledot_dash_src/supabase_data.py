@@ -1,25 +1,79 @@
 import os
+import threading
+import time
 import pandas as pd
 import numpy as np
 import streamlit as st
-from bledot_dash_src.download_metrics import get_download_data
-from supabase import create_client, Client
-from typing import Dict, List, Optional, Tuple
+from supabase import Client
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FetchTimeoutError
 from datetime import datetime, timedelta
 import pytz
-from bledot_dash_src.session_state import init_session_state, set_session_state
+from bledot_dash_src.session_state import init_session_state
+from bledot_dash_src.supabase_client import get_shared_client
+from bledot_dash_src.data_cache import company_data_cache
+from bledot_dash_src.hot_path import hot_path_stats, instrumented
+from bledot_dash_src.settings import get_setting
+from bledot_dash_src.issue_matrix import IssueMatrix
+from bledot_dash_src.machine_history import MachineHistory
+from bledot_dash_src.metrics_store import get_metrics_store
+from bledot_dash_src.history_aggregator import HistoryAggregator, config_fields, get_first_values
+from bledot_dash_src.delta_sync import MetricsWindow, metric_windows
+from bledot_dash_src.timeseries import empty_series, get_time_series
+from bledot_dash_src.projection import (
+    client_columns,
+    company_tabs,
+    export_columns,
+    get_metric_columns,
+    machine_columns,
+    machine_tabs,
+    to_select,
+)
+
+#Process-wide pool for concurrent fetches, bounding the in-flight queries of the server
+_fetch_executor = ThreadPoolExecutor(
+    max_workers=get_setting("FETCH_MAX_WORKERS", 8), thread_name_prefix="supabase-fetch"
+)
 
 class SupabaseData:
-    def __init__(self, url=None, key=None):
-        #Allow passing credentials directly or use environment variables
-        self.url = url or st.secrets.supabase.get("SUPABASE_URL")
-        self.key = key or st.secrets.supabase.get("SUPABASE_KEY")
-
-        #Check if credentials are available
-        if not self.url or not self.key:
-            print("Error: Supabase credentials not found. Please set SUPABASE_URL and SUPABASE_KEY environment variables.")
+    def __init__(
+        self,
+        url=None,
+        key=None,
+        concurrent: bool = True,
+        fetch_timeout: Optional[float] = None,
+        pushdown: Optional[bool] = None,
+        client=None,
+    ):
+        #Issue independent queries in parallel, each one bounded by fetch_timeout seconds
+        self.concurrent = concurrent
+        self.fetch_timeout = fetch_timeout or get_setting("FETCH_TIMEOUT", 30.0)
+
+        #Let the database aggregate the fleet KPIs and issues over the last pushdown_days
+        self.pushdown = get_setting("PUSHDOWN", False) if pushdown is None else pushdown
+        self.pushdown_days = get_setting("PUSHDOWN_DAYS", 7)
+
+        #Number of round-trips made to the database by this instance, and of the errors handled
+        self.query_count = 0
+        self.error_count = 0
+        self._query_count_lock = threading.Lock()
+
+        #Pages and rows read by the last streamed history
+        self.history_read_stats = {"pages": 0, "rows": 0}
+
+        #Allow passing a client (e.g. a local stand-in) or credentials, or use the secrets
+        if client is not None:
+            self.url, self.key = url, key
+            self.client = client
         else:
-            self.client = self._get_client()
+            self.url = url or st.secrets.supabase.get("SUPABASE_URL")
+            self.key = key or st.secrets.supabase.get("SUPABASE_KEY")
+
+            #Check if credentials are available
+            if not self.url or not self.key:
+                print("Error: Supabase credentials not found. Please set SUPABASE_URL and SUPABASE_KEY environment variables.")
+            else:
+                self.client = self._get_client()
 
         self._metrics_threshold = {
             'cpu_usage': {'val': 0.8, 'asc': True, 'str': 'Uso de CPU'},
@@ -43,12 +97,39 @@ class SupabaseData:
     def _get_client(self) -> Client:
         """Load and return Supabase Database Client"""
         try:
-            return create_client(self.url, self.key)
+            return get_shared_client(self.url, self.key)
         except Exception as e:
             st.error(f"Error creating Supabase client: {e}")
             return None
     
+    #Execute a query builder, counting the round-trip and timing it under "query.<name>"
+    def _execute(self, query, name: str = "query"):
+        with self._query_count_lock:
+            self.query_count += 1
+        return hot_path_stats.call(f"query.{name}", query.execute)
+
+    #Run independent fetches (name -> (function, default on timeout)) and collect their results
+    def _gather(self, calls: Dict[str, Tuple[Callable[[], Any], Any]]) -> Dict[str, Any]:
+        if not self.concurrent:
+            return {name: call() for name, (call, _) in calls.items()}
+
+        futures = {name: _fetch_executor.submit(call) for name, (call, _) in calls.items()}
+        deadline = time.monotonic() + self.fetch_timeout
+
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FetchTimeoutError as e:
+                future.cancel()
+                self._handle_error(f"Timed out loading {name}", e)
+                results[name] = calls[name][1]
+
+        return results
+
     def _handle_error(self, error_msg: str, e: Exception) -> None:
+        with self._query_count_lock:
+            self.error_count += 1
         full_error = f"{error_msg}: {e}"
         #Check if running in Streamlit
         if 'st' in globals():
@@ -72,114 +153,124 @@ class SupabaseData:
         
         return df
     
+    #KPI table of the numeric metrics (index: metric, or (id_maquina, metric) when grouped by machine)
+    @instrumented("_get_metrics_kpi")
     def _get_metrics_kpi(
-        self, metrics_df: pd.DataFrame, default: float = 0.0
-    ) -> tuple[dict[str, pd.Series], dict[str, pd.Series], dict[str, pd.Series]]:
-        avg_metrics = {}
-        max_metrics = {}
-        min_metrics = {}
-        for metric_label in metrics_df.columns:
-            if metrics_df.empty:
-                avg_metrics[metric_label] = default
-                continue
-
-            metric_series = metrics_df[metric_label].dropna()[metrics_df[metric_label].apply(
-                lambda x: isinstance(x, int) or isinstance(x, float)
-            )]
-            if metric_series.empty:
-                # average_metrics[metric_label] = default
-                continue
-
-            avg_metrics[metric_label] = float(metric_series.mean())
-            max_metrics[metric_label] = float(metric_series.max())
-            min_metrics[metric_label] = float(metric_series.min())
-
-        return avg_metrics, max_metrics, min_metrics
-    
-    def _get_issues_report(self, metrics_df: pd.DataFrame) -> dict[int, set[str]]:
-        issues: dict[int, set[str]] = {}
-        if metrics_df.empty:
-            return {}
-
-        for metric_label, metric_threshold in self._metrics_threshold.items():
-            if metric_label not in metrics_df.columns:
-                continue
-            
-            metric_series = metrics_df[metric_label]
-
-            if metric_label == "smart_overall":
-                high_metric = (metric_series != "PASSED") & (metric_series != "OK") & (~metric_series.isna())
-
-            elif metric_label == "firewall_active":
-                high_metric = metric_series == "TRUE"
+        self, metrics_df: pd.DataFrame, by_machine: bool = False, default: float = 0.0
+    ) -> pd.DataFrame:
+        kpi_stats = ["mean", "min", "max", "count"]
 
-            elif metric_threshold['asc']:
-                high_metric = metric_series >= metric_threshold['val']
-            else:
-                high_metric = metric_series <= metric_threshold['val']
-
-            for machine_id in metrics_df["id_maquina"][high_metric]:
-                if machine_id not in issues:
-                    issues[machine_id] = set()
-                issues[machine_id].add(metric_label)
-
-        return issues
-
-    def _get_power_consumption(self, metrics_df: pd.DataFrame) -> list[list[dict[str, float]]]:
-        power_consumption : list[list[dict[str, float]]] = []
-        mach_ind : dict[int] = {}
-        for _, row in metrics_df.iterrows():
-            if not row["id_maquina"] in mach_ind.keys():
-                mach_ind[row["id_maquina"]] = 0
-
-            if row["instant_power_consumption"] is None:
-                continue
-
-            entry = {
-                "id_maquina": row["id_maquina"],
-                "instant_power_consumption": row["instant_power_consumption"]
-            }
-
-            while mach_ind[row["id_maquina"]] >= len(power_consumption):
-                power_consumption.append([])
+        if metrics_df.empty:
+            return pd.DataFrame(
+                {"mean": default, "min": np.nan, "max": np.nan, "count": 0},
+                index=pd.Index(metrics_df.columns, name="metric"),
+            )
 
-            power_consumption[mach_ind[row["id_maquina"]]].append(entry)
-            mach_ind[row["id_maquina"]] += 1
+        #Numeric columns are selected by dtype once and reduced in a single aggregation
+        numeric_df = metrics_df.select_dtypes(include=["number", "bool"]).astype(float)
 
-        return power_consumption
-    
+        if by_machine:
+            kpi = numeric_df.drop(columns="id_maquina") \
+                .groupby(metrics_df["id_maquina"]) \
+                .agg(kpi_stats) \
+                .stack(level=0, future_stack=True)
+            kpi.index.names = ["id_maquina", "metric"]
+        else:
+            kpi = numeric_df.agg(kpi_stats).T
+            kpi.index.name = "metric"
+
+        return kpi[kpi["count"] > 0]
+
+    #Split a KPI table into the avg, max and min dicts used by the dashboards
+    def _split_metrics_kpi(
+        self, kpi: pd.DataFrame
+    ) -> tuple[dict[str, float], dict[str, float], dict[str, float]]:
+        return (
+            kpi["mean"].to_dict(),
+            kpi["max"].dropna().to_dict(),
+            kpi["min"].dropna().to_dict(),
+        )
+
+    #Machines x rules matrix of the violated thresholds
+    @instrumented("_get_issues_report")
+    def _get_issues_report(self, metrics_df: pd.DataFrame) -> IssueMatrix:
+        return IssueMatrix.from_metrics(metrics_df, self._metrics_threshold)
+
+    #Power consumption avg/min/max per data_coleta bucket, oldest first and within the chart point budget
+    @instrumented("_get_power_consumption")
+    def _get_power_consumption(self, metrics_df: pd.DataFrame) -> pd.DataFrame:
+        return get_time_series(metrics_df, "instant_power_consumption")
+
+    @instrumented("_get_machine_config")
     def _get_machine_config(self, df: pd.DataFrame) -> dict:
-        config_metrics = [
-            "host_name", "model", "operation_sys", "os_version", "architecture",
-            "processor", "gpu_name", "inter_gpu_name", "motherboard_manuf",
-            "motherboard_name", "motherboard_snum", "mac", "ipv4", "ipv6",
-            "installed_softwares", "country", "region_name", "city", "lat", "lon"
-        ]
-        config = {}
-
-        for metric in config_metrics:
-            metric_series = df[metric].dropna()
-
-            if len(metric_series) == 0:
-                config[metric] = None
+        return get_first_values(df, config_fields)
+
+    #Fleet KPIs and issues aggregated by the database functions in sql/fleet_aggregates.sql
+    #Returns None when they are not available, so callers fall back to pandas
+    def _get_pushdown_aggregates(
+        self, client_id: str, days: int
+    ) -> Optional[Tuple[pd.DataFrame, IssueMatrix]]:
+        since = (datetime.now(pytz.UTC) - timedelta(days=days)).isoformat()
+        thresholds = {
+            label: {"val": threshold["val"], "asc": threshold["asc"]}
+            for label, threshold in self._metrics_threshold.items()
+        }
 
-            config[metric] = metric_series[0]
+        try:
+            kpi_response = self._execute(self.client.rpc(
+                "fleet_metric_kpis", {"p_company_id": client_id, "p_since": since}
+            ), "fleet_metric_kpis")
+            issues_response = self._execute(self.client.rpc(
+                "fleet_issue_flags",
+                {"p_company_id": client_id, "p_thresholds": thresholds, "p_since": since},
+            ), "fleet_issue_flags")
+        except Exception:
+            #Recorded as an error of fleet_aggregates, the dashboard uses pandas instead
+            hot_path_stats.record_error("fleet_aggregates")
+            return None
 
-        return config
+        metrics_kpi = pd.DataFrame(
+            kpi_response.data, columns=["id_maquina", "metric", "mean", "min", "max", "count"]
+        ).drop(columns="id_maquina").set_index("metric")
+        issues = IssueMatrix.from_pairs(
+            pd.DataFrame(issues_response.data, columns=["id_maquina", "rule"]),
+            list(self._metrics_threshold),
+        )
+
+        return metrics_kpi, issues
+
+    #Version of a company snapshot, which changes with its metrics rows, machine contacts and
+    #completeness (equal snapshots built apart, e.g. by the live updates of two sessions, share it)
+    def _get_company_version(self, machines_df: pd.DataFrame, metrics_df: pd.DataFrame, complete: bool) -> tuple:
+        metrics_hash = int(pd.util.hash_pandas_object(metrics_df["id"], index=False).sum()) \
+            if not metrics_df.empty else 0
+        machines_hash = int(pd.util.hash_pandas_object(
+            machines_df[["id", "ultimo_contato"]], index=False
+        ).sum()) if not machines_df.empty else 0
+        return (complete, len(metrics_df), metrics_hash, len(machines_df), machines_hash)
+
+    #Columns of metricas_maquina needed by some dashboard tabs (and the issue report)
+    def _get_metric_columns(self, tabs: List[str]) -> List[str]:
+        return get_metric_columns(tabs, self._metrics_threshold)
 
     #Load client data by ID
-    def get_client_data(self, client_id: str) -> Dict:
+    def get_client_data(self, client_id: str, columns: Optional[List[str]] = None) -> Dict:
         try:
-            response = self.client.table("empresas").select("*").eq("id", client_id).execute()
+            response = self._execute(
+                self.client.table("empresas").select(to_select(columns)).eq("id", client_id), "empresas"
+            )
             return response.data[0] if response.data else {}
         except Exception as e:
             self._handle_error("Error loading client data", e)
             return {}
     
     #Load all machines for a specific client
-    def get_client_machines(self, client_id: str) -> pd.DataFrame:
+    def get_client_machines(self, client_id: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
         try:
-            response = self.client.table("maquinas").select("*").eq("id_empresa", client_id).execute()
+            response = self._execute(
+                self.client.table("maquinas").select(to_select(columns)).eq("id_empresa", client_id),
+                "maquinas",
+            )
             
             if not response.data:
                 return pd.DataFrame()
@@ -193,26 +284,38 @@ class SupabaseData:
             return pd.DataFrame()
     
     #Load latest metrics for all machines of a client
-    def get_latest_metrics_by_client(self, client_id: str, limit: int = 100) -> pd.DataFrame:
+    def get_latest_metrics_by_client(
+        self,
+        client_id: str,
+        limit: int = 100,
+        machine_ids: Optional[List] = None,
+        columns: Optional[List[str]] = None,
+        since: Optional[str] = None,
+    ) -> pd.DataFrame:
         try:
-            # First get all machine IDs for this client
-            machines_response = self.client.table("maquinas").select("id").eq("id_empresa", client_id).execute()
-            
-            if not machines_response.data:
+            # Get all machine IDs for this client, unless the caller already has them
+            if machine_ids is None:
+                machines_response = self._execute(
+                    self.client.table("maquinas").select("id").eq("id_empresa", client_id), "maquinas"
+                )
+                machine_ids = [machine['id'] for machine in machines_response.data or []]
+
+            if not machine_ids:
                 return pd.DataFrame()
-                
-            machine_ids = [machine['id'] for machine in machines_response.data]
             
-            # Now get metrics for these machines
-            metrics_response = self.client.table("metricas_maquina") \
-                .select("*") \
-                .in_("id_maquina", machine_ids) \
-                .order("data_coleta", desc=True) \
-                .limit(limit) \
-                .execute()
+            # Now get metrics for these machines (only the ones collected since a watermark, if given)
+            query = self.client.table("metricas_maquina") \
+                .select(to_select(columns)) \
+                .in_("id_maquina", machine_ids)
+            if since is not None:
+                query = query.gte("data_coleta", since)
+
+            metrics_response = self._execute(
+                query.order("data_coleta", desc=True).limit(limit), "metricas_maquina"
+            )
             
+            #No rows is the usual result of a refresh since the watermark (the query records it)
             if not metrics_response.data:
-                print(f"No metrics found for machines: {machine_ids}")
                 return pd.DataFrame()
                 
             # Get machine details for these metrics
@@ -225,149 +328,184 @@ class SupabaseData:
         except Exception as e:
             self._handle_error(f"Error loading client's metrics: {e}", e)
             return pd.DataFrame()
-    #Load specific machine metrics history
-    def get_machine_metrics_history(self, machine_id: str, days: int = 7) -> dict:
-        try:
-            # Print the machine ID we're querying for
-            print(f"Getting metrics for machine ID: {machine_id}")
-            
-            # Direct query without start_date filter first to see if ANY records exist
-            response = self.client.table("metricas_maquina") \
-                .select("*") \
-                .eq("id_maquina", machine_id) \
-                .limit(5) \
-                .execute()
-            
-            # Print raw response for debugging
-            print(f"Raw response: {response}")
-            print(f"Data count: {len(response.data) if response.data else 0}")
-            
-            # Now try with the date filter
-            start_date = (datetime.now(pytz.UTC) - timedelta(days=days)).isoformat()
-            
-            response_with_date = self.client.table("metricas_maquina") \
-                .select("*") \
-                .eq("id_maquina", machine_id) \
-                .gte("data_coleta", start_date) \
-                .order("data_coleta", desc=True) \
-                .execute()
-            
-            if not response_with_date.data:
-                print(f"No recent metrics found for machine {machine_id} after {start_date}")
-                
-                if response.data:  # If we found records without the date filter
-                    print("Returning older records instead")
-                    df = pd.DataFrame(response.data)
-                    df = self._convert_timestamps(df, ['data_coleta'])
-
-                    avg_metrics, max_metrics, min_metrics = self._get_metrics_kpi(df)
-                    issues = self._get_issues_report(df)
-                    power_consumption = self._get_power_consumption(df)
-
-                    power_consumption_hist = {
-                            "avg": [],
-                            "min": [],
-                            "max": []
-                        }
-
-                    for entry in power_consumption:
-                        entry_hist = []
-                        for subentry in entry:
-                            entry_hist.append(subentry["instant_power_consumption"])
-
-                        power_consumption_hist["avg"].append(np.average(entry_hist))
-                        power_consumption_hist["max"].append(np.max(entry_hist))
-                        power_consumption_hist["min"].append(np.min(entry_hist))
-
-                    power_consumption_hist["avg"].reverse()
-                    power_consumption_hist["max"].reverse()
-                    power_consumption_hist["min"].reverse()
-
-                    pkg_loss_mean = np.mean(
-                        [np.mean(x) for x in df["pkg_loss_list"]]
-                    )
-
-                    config = self._get_machine_config(df)
-
-                    return {
-                        "avg_metrics": avg_metrics,
-                        "max_metrics": max_metrics,
-                        "min_metrics": min_metrics,
-                        "power_consumption_hist": power_consumption_hist,
-                        "pkg_loss_mean": pkg_loss_mean,
-                        "issues": issues,
-                        "config": config
-                    }
-
-                return {
-                    "avg_metrics": None,
-                    "max_metrics": None,
-                    "min_metrics": None,
-                    "power_consumption_hist": None,
-                    "pkg_loss_mean": None,
-                    "issues": None,
-                    "config": None
-                }
-                    
-            df = pd.DataFrame(response_with_date.data)
-            df = self._convert_timestamps(df, ['data_coleta'])
 
-            avg_metrics, max_metrics, min_metrics = self._get_metrics_kpi(df)
-            issues = self._get_issues_report(df)
-            power_consumption = self._get_power_consumption(df)
+    #Load some metrics rows by their IDs, newest first (every column by default, for the exports)
+    def get_metrics_by_ids(self, ids: List, columns: Optional[List[str]] = export_columns) -> pd.DataFrame:
+        if not ids:
+            return pd.DataFrame()
+
+        try:
+            query = self.client.table("metricas_maquina") \
+                .select(to_select(columns)) \
+                .in_("id", ids)
+            response = self._execute(query.order("data_coleta", desc=True), "metricas_maquina")
+            if not response.data:
+                return pd.DataFrame()
 
-            power_consumption_hist = {
-                    "avg": [],
-                    "min": [],
-                    "max": []
-                }
+            return self._convert_timestamps(pd.DataFrame(response.data), ['data_coleta'])
 
-            for entry in power_consumption:
-                entry_hist = []
-                for subentry in entry:
-                    entry_hist.append(subentry["instant_power_consumption"])
+        except Exception as e:
+            self._handle_error("Error loading metrics for the export", e)
+            return pd.DataFrame()
 
-                power_consumption_hist["avg"].append(np.average(entry_hist))
-                power_consumption_hist["max"].append(np.max(entry_hist))
-                power_consumption_hist["min"].append(np.min(entry_hist))
+    #Stream a machine's metrics newest first, in pages keyed by (data_coleta, id)
+    #page_size must not exceed the PostgREST max-rows setting (1000 by default on Supabase)
+    def iter_machine_metrics(
+        self,
+        machine_id: str,
+        start_date: str,
+        page_size: Optional[int] = None,
+        columns: Optional[List[str]] = None,
+        first_page_columns: Optional[List[str]] = None,
+    ) -> Iterator[pd.DataFrame]:
+        page_size = page_size or get_setting("HISTORY_PAGE_SIZE", 1000)
+        self.history_read_stats = {"pages": 0, "rows": 0}
+        last_key = None
+
+        while True:
+            #The first page may carry more columns (e.g. the config fields, taken from the newest rows)
+            page_columns = first_page_columns if last_key is None and first_page_columns else columns
+            query = self.client.table("metricas_maquina") \
+                .select(to_select(page_columns)) \
+                .eq("id_maquina", machine_id) \
+                .gte("data_coleta", start_date)
+
+            if last_key is not None:
+                last_time, last_id = last_key
+                query = query.or_(
+                    f'data_coleta.lt."{last_time}",and(data_coleta.eq."{last_time}",id.lt.{last_id})'
+                )
+
+            rows = self._execute(
+                query.order("data_coleta", desc=True).order("id", desc=True).limit(page_size),
+                "metricas_maquina",
+            ).data or []
+            if not rows:
+                return
+
+            self.history_read_stats["pages"] += 1
+            self.history_read_stats["rows"] += len(rows)
+            last_key = (rows[-1]["data_coleta"], rows[-1]["id"])
+
+            yield self._convert_timestamps(pd.DataFrame(rows), ['data_coleta'])
+
+            if len(rows) < page_size:
+                return
+
+    #Window of a machine's history, without the config columns (shared by the reloads and live updates)
+    def _get_machine_window(self, machine_id: str, days: int, tabs: List[str]) -> MetricsWindow:
+        columns = [column for column in self._get_metric_columns(tabs) if column not in config_fields]
+        return metric_windows.get(
+            ("machine", machine_id, days, tuple(columns)),
+            lambda: MetricsWindow(
+                self._metrics_threshold, days=days, machine_ids=[machine_id], columns=columns
+            ),
+        )
+
+    #Newest samples of a machine, whatever their age (fallback when its date window is empty)
+    def get_latest_machine_metrics(
+        self, machine_id: str, samples: Optional[int] = None, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        samples = samples or get_setting("HISTORY_FALLBACK_SAMPLES", 500)
+        rows = self._execute(
+            self.client.table("metricas_maquina")
+            .select(to_select(columns))
+            .eq("id_maquina", machine_id)
+            .order("data_coleta", desc=True)
+            .order("id", desc=True)
+            .limit(samples),
+            "metricas_maquina",
+        ).data or []
+        return self._convert_timestamps(pd.DataFrame(rows), ['data_coleta'])
+
+    #Load specific machine metrics history of the last days (HISTORY_DAYS by default)
+    #With the company ID, the history is also kept in the on-disk cache (DISK_CACHE)
+    #The window is refreshed with the rows since its watermark (minus DELTA_SYNC_LAG) in one query
+    #(per page), the config columns only come with the first page of the first load; if the window is empty, the last
+    #HISTORY_FALLBACK_SAMPLES samples are used instead
+    def get_machine_metrics_history(
+        self,
+        machine_id: str,
+        days: Optional[int] = None,
+        tabs: List[str] = machine_tabs,
+        company_id: Optional[str] = None,
+    ) -> MachineHistory:
+        started = time.perf_counter()
+        first_query = self.query_count
+        days = days or get_setting("HISTORY_DAYS", 7)
+        columns = self._get_metric_columns(tabs)
+
+        def load_info(source: str, rows: int) -> dict:
+            return {
+                "source": source,
+                "rows": rows,
+                "pages": self.history_read_stats["pages"],
+                "queries": self.query_count - first_query,
+                "seconds": time.perf_counter() - started,
+            }
 
-            power_consumption_hist["avg"].reverse()
-            power_consumption_hist["max"].reverse()
-            power_consumption_hist["min"].reverse()
+        try:
+            start_date = (datetime.now(pytz.UTC) - timedelta(days=days)).isoformat()
 
-            pkg_loss_mean = np.mean(
-                [np.mean(x) for x in df["pkg_loss_list"]]
+            #A new window starts from the on-disk cache of the company, if it covers the window
+            store = get_metrics_store() if company_id is not None else None
+            source = "window"
+
+            window = self._get_machine_window(machine_id, days, tabs)
+            with window.lock:
+                if store is not None and window.watermark is None:
+                    stored = store.read(company_id, machine_id, pd.Timestamp(start_date), window.columns)
+                    if stored is not None and not stored[0].empty:
+                        window.update(stored[0])
+                        window.fill_config(pd.DataFrame([stored[1]]))
+                        source = "disk"
+
+                window.consume(self.iter_machine_metrics(
+                    machine_id,
+                    window.since(start_date),
+                    columns=window.columns,
+                    first_page_columns=columns if window.watermark is None else None,
+                ))
+                if store is not None:
+                    store.write(company_id, machine_id, window.frame, pd.Timestamp(start_date), window.config)
+                if window.rows:
+                    return MachineHistory.from_result(window.result(), **load_info(source, window.rows))
+
+            latest_df = self.get_latest_machine_metrics(machine_id, columns=columns)
+            if latest_df.empty:
+                return MachineHistory(**load_info("empty", 0))
+
+            return MachineHistory.from_result(
+                HistoryAggregator(self._metrics_threshold).consume([latest_df]).result(),
+                **load_info("latest", len(latest_df)),
             )
 
-            config = self._get_machine_config(df)
-
-            return {
-                "avg_metrics": avg_metrics,
-                "max_metrics": max_metrics,
-                "min_metrics": min_metrics,
-                "power_consumption_hist": power_consumption_hist,
-                "pkg_loss_mean": pkg_loss_mean,
-                "issues": issues,
-                "config": config
-            }
-            
         except Exception as e:
             self._handle_error(f"Error loading machine history: {str(e)}", e)
-            return {
-                "avg_metrics": None,
-                "max_metrics": None,
-                "min_metrics": None,
-                "power_consumption_hist": None,
-                "pkg_loss_mean": None,
-                "issues": None,
-                "config": None
-            }
-    
+            return MachineHistory(**load_info("empty", 0))
+
     #Stats summary (demo)
     def get_client_summary_stats(self, client_id: str) -> Dict:
         machines_df = self.get_client_machines(client_id)
-        metrics_df = self.get_latest_metrics_by_client(client_id)
-        
+        metrics_df = self.get_latest_metrics_by_client(
+            client_id, machine_ids=machines_df["id"].tolist() if not machines_df.empty else []
+        )
+        return self._get_summary_stats(machines_df, metrics_df)
+
+    #Derive the summary stats from already loaded machines and metrics frames
+    #(KPIs and issues are taken from the aggregates when given, pushdown tells whether they
+    #are the database ones, over the last pushdown_days instead of the latest metrics)
+    def _get_summary_stats(
+        self,
+        machines_df: pd.DataFrame,
+        metrics_df: pd.DataFrame,
+        aggregates: Optional[Tuple[pd.DataFrame, IssueMatrix]] = None,
+        pushdown: bool = False,
+    ) -> Dict:
+        #Rows the KPIs and issues are computed over, shown with them
+        kpi_window = f"os últimos {self.pushdown_days} dias" if pushdown \
+            else f"as últimas {len(metrics_df)} amostras"
+
         if machines_df.empty:
             return {
                 'total_machines': 0,
@@ -375,8 +513,10 @@ class SupabaseData:
                 'offline_machines': 0,
                 'avg_cpu_usage': 0,
                 'avg_ram_usage': 0,
-                'power_consumption_hist': [],
-                'machines_with_issues': 0
+                'power_consumption_hist': empty_series(),
+                'machines_with_issues': 0,
+                'pushdown': pushdown,
+                'kpi_window': kpi_window,
             }
         
         total_machines = len(machines_df)
@@ -386,46 +526,47 @@ class SupabaseData:
         active_machines = len(machines_df[machines_df['ultimo_contato'] > cutoff_time]) if not machines_df.empty else 0
         offline_machines = total_machines - active_machines
 
-        power_consumption = self._get_power_consumption(metrics_df)
+        power_consumption_hist = self._get_power_consumption(metrics_df)
         
         #Mean CPU and RAM usage from latest metrics
-        avg_metrics, max_metrics, min_metrics = self._get_metrics_kpi(metrics_df)
-        
-        power_consumption_hist = {
-            "avg": [],
-            "max": [],
-            "min": []
-        }
-
-        for entry in power_consumption:
-            entry_hist = []
-            for subentry in entry:
-                entry_hist.append(subentry["instant_power_consumption"])
-
-            power_consumption_hist["avg"].append(np.average(entry_hist))
-            power_consumption_hist["max"].append(np.max(entry_hist))
-            power_consumption_hist["min"].append(np.min(entry_hist))
-
-        power_consumption_hist["avg"].reverse()
-        power_consumption_hist["max"].reverse()
-        power_consumption_hist["min"].reverse()
-
-        machines_with_issues = self._get_issues_report(metrics_df)
-        init_session_state("machines_with_issues", machines_with_issues)
+        if aggregates is not None:
+            metrics_kpi, machines_with_issues = aggregates
+        else:
+            metrics_kpi = self._get_metrics_kpi(metrics_df)
+            machines_with_issues = self._get_issues_report(metrics_df)
+        avg_metrics, max_metrics, min_metrics = self._split_metrics_kpi(metrics_kpi)
 
         return {
             'total_machines': total_machines,
             'active_machines': active_machines,
             'offline_machines': offline_machines,
+            'metrics_kpi': metrics_kpi,
             'avg_metrics': avg_metrics,
             'max_metrics': max_metrics,
             'min_metrics': min_metrics,
             'power_consumption_hist': power_consumption_hist,
-            'machines_with_issues': machines_with_issues
+            'machines_with_issues': machines_with_issues,
+            'pushdown': pushdown,
+            'kpi_window': kpi_window,
         }
     
+    #Window of the latest metrics of a company's machines (shared by the reloads and live updates)
+    def _get_company_window(self, client_id: str, machine_ids: List, tabs: List[str]) -> MetricsWindow:
+        columns = self._get_metric_columns(tabs)
+        return metric_windows.get(
+            ("company", client_id, tuple(sorted(machine_ids)), tuple(columns)),
+            lambda: MetricsWindow(
+                self._metrics_threshold, limit=100, machine_ids=machine_ids, columns=columns
+            ),
+        )
+
     #Load all relevant data for client dashboard
-    def load_client_dashboard_data(self, client_id: Optional[str] = None) -> Dict:
+    #("complete" is False if a query failed, so the partial snapshot is not cached, and
+    #"version" identifies the snapshot content, see _get_company_version)
+    @instrumented("load_client_dashboard_data")
+    def load_client_dashboard_data(
+        self, client_id: Optional[str] = None, tabs: List[str] = company_tabs
+    ) -> Dict:
         #If no client_id provided, try to get from session state
         if not client_id:
             client_id = st.session_state.get('company_id') if 'st' in globals() else None
@@ -437,18 +578,125 @@ class SupabaseData:
                 print("ERROR: Client ID not found")
             return {}
         
-        #Load all relevant data
-        client_data = self.get_client_data(client_id)
-        machines_df = self.get_client_machines(client_id)
-        metrics_df = self.get_latest_metrics_by_client(client_id)
-        summary_stats = self.get_client_summary_stats(client_id)
+        first_error = self.error_count
+
+        #Load each table once (empresas, maquinas, metricas_maquina) and derive the rest.
+        #The company is fetched while the machines and then their metrics are loaded
+        #The latest metrics are kept in a window refreshed with the rows since its watermark
+        #(minus DELTA_SYNC_LAG, for late uploads) only
+        def load_machines_and_metrics() -> Tuple[pd.DataFrame, pd.DataFrame, Optional[Tuple]]:
+            machines_df = self.get_client_machines(client_id, columns=machine_columns)
+            machine_ids = machines_df["id"].tolist() if not machines_df.empty else []
+
+            window = self._get_company_window(client_id, machine_ids, tabs)
+            with window.lock:
+                new_metrics_df = self.get_latest_metrics_by_client(
+                    client_id,
+                    limit=window.limit,
+                    machine_ids=machine_ids,
+                    columns=window.columns,
+                    since=window.since(),
+                )
+                window.consume([new_metrics_df])
+                aggregates = window.aggregates() if window.rows else None
+                return machines_df, window.frame, aggregates
+
+        calls = {
+            "client data": (lambda: self.get_client_data(client_id, columns=client_columns), {}),
+            "client machines": (load_machines_and_metrics, (pd.DataFrame(), pd.DataFrame(), None)),
+        }
+        if self.pushdown:
+            calls["fleet aggregates"] = (
+                lambda: self._get_pushdown_aggregates(client_id, self.pushdown_days), None
+            )
 
-        set_session_state("download_data", get_download_data(metrics_df))
+        results = self._gather(calls)
+        client_data = results["client data"]
+        machines_df, metrics_df, window_aggregates = results["client machines"]
+        pushdown_aggregates = results.get("fleet aggregates")
+        summary_stats = self._get_summary_stats(
+            machines_df,
+            metrics_df,
+            pushdown_aggregates or window_aggregates,
+            pushdown=pushdown_aggregates is not None,
+        )
+        complete = self.error_count == first_error
         
         return {
             'client_info': client_data,
             'machines': machines_df,
             'latest_metrics': metrics_df,
             'summary_stats': summary_stats,
-            'client_id': client_id
+            'client_id': client_id,
+            'complete': complete,
+            'version': self._get_company_version(machines_df, metrics_df, complete),
         }
+
+    #Rebuild the company dashboard data from the live-updated metrics window and machine
+    #contacts, without querying (the new snapshot replaces the cached one)
+    def load_live_client_dashboard_data(
+        self, company_data: Mapping, last_contacts: Dict, tabs: List[str] = company_tabs
+    ) -> Mapping:
+        client_id = company_data["client_id"]
+        machines_df = company_data["machines"]
+        if machines_df.empty:
+            return company_data
+
+        window = self._get_company_window(client_id, machines_df["id"].tolist(), tabs)
+        with window.lock:
+            if window.watermark is None:
+                return company_data
+            metrics_df = window.frame
+            aggregates = window.aggregates() if window.rows else None
+
+        #The database aggregates cover pushdown_days, not the window, so they are kept
+        summary_stats = company_data["summary_stats"]
+        pushdown = summary_stats.get("pushdown", False)
+        if pushdown:
+            aggregates = (summary_stats["metrics_kpi"], summary_stats["machines_with_issues"])
+
+        if last_contacts:
+            machines_df = machines_df.copy()
+            live_contact = pd.to_datetime(machines_df["id"].map(last_contacts), utc=True)
+            machines_df["ultimo_contato"] = pd.concat(
+                [machines_df["ultimo_contato"], live_contact], axis=1
+            ).max(axis=1)
+
+        return company_data_cache.put(client_id, {
+            **company_data,
+            'machines': machines_df,
+            'latest_metrics': metrics_df,
+            'summary_stats': self._get_summary_stats(machines_df, metrics_df, aggregates, pushdown),
+            'version': self._get_company_version(
+                machines_df, metrics_df, company_data.get("complete", True)
+            ),
+        })
+
+    #Rebuild a machine's history from its live-updated window, without querying
+    #(None if the window is not loaded)
+    def load_live_machine_metrics_history(
+        self, machine_id: str, config: Dict, days: Optional[int] = None, tabs: List[str] = machine_tabs
+    ) -> Optional[MachineHistory]:
+        window = self._get_machine_window(machine_id, days or get_setting("HISTORY_DAYS", 7), tabs)
+        with window.lock:
+            if window.watermark is None:
+                return None
+            window.evict()
+            if not window.rows:
+                return None
+            window.fill_config(pd.DataFrame([config]))
+            return MachineHistory.from_result(window.result(), source="live", rows=window.rows)
+
+    #Load client dashboard data through the server-wide cache (read-only snapshot)
+    #(loads that do not run are recorded as cache hits of load_client_dashboard_data)
+    def load_cached_client_dashboard_data(self, client_id: str) -> Mapping:
+        loaded = []
+
+        def load(client_id: str) -> Dict:
+            loaded.append(client_id)
+            return self.load_client_dashboard_data(client_id)
+
+        company_data = company_data_cache.get(client_id, load)
+        if not loaded:
+            hot_path_stats.record_hit("load_client_dashboard_data")
+        return company_data
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+from bledot_dash_src.settings import get_setting
+
+
+# Width of the chart time buckets and maximum number of plotted points,
+# overridable through the [supabase] secrets section (CHART_BUCKET, CHART_MAX_POINTS)
+default_bucket = "1h"
+default_max_points = 200
+
+series_columns = ["avg", "min", "max"]
+
+
+def empty_series() -> pd.DataFrame:
+    """Gets a time series without points"""
+    return pd.DataFrame(
+        columns=series_columns,
+        index=pd.DatetimeIndex([], tz="UTC", name="time"),
+        dtype=float,
+    )
+
+
+def get_bucket_stats(metrics_df: pd.DataFrame, metric: str, bucket: str) -> pd.DataFrame:
+    """Gets the sum, min, max and count of a metric per data_coleta bucket
+
+    Args:
+        metrics_df: metrics rows with data_coleta (as timestamps)
+        metric: metric column
+        bucket: bucket width (pandas frequency, e.g. "1h")
+
+    Returns:
+        Partial stats (index: bucket start), which can be merged across chunks
+    """
+    if metrics_df.empty or metric not in metrics_df.columns:
+        return pd.DataFrame(columns=["sum", "min", "max", "count"], dtype=float)
+
+    values = pd.to_numeric(metrics_df[metric], errors="coerce")
+    keys = metrics_df["data_coleta"].dt.floor(bucket)
+    stats = values.groupby(keys.rename("time")).agg(["sum", "min", "max", "count"])
+
+    return stats
+
+
+def series_from_stats(stats: pd.DataFrame | None) -> pd.DataFrame:
+    """Gets the avg, min and max per bucket (oldest first) from partial stats"""
+    if stats is None or stats.empty:
+        return empty_series()
+
+    stats = stats[stats["count"] > 0].sort_index()
+    series = pd.DataFrame({
+        "avg": stats["sum"] / stats["count"],
+        "min": stats["min"],
+        "max": stats["max"],
+    }).astype(float)
+    series.index.name = "time"
+
+    return series
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets downsampling
+
+    Keeps the first and last points and, from each of n_out - 2 buckets, the
+    point forming the largest triangle with the point kept before it and the
+    average of the next bucket.
+
+    Args:
+        x: increasing x values
+        y: y values
+        n_out: number of points to be kept
+
+    Returns:
+        Positions of the kept points, increasing
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def downsample(series: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    """Reduces a time series to at most max_points with LTTB on the averages
+
+    The min and max of each kept point cover every point it replaces, so the
+    envelope of the series is preserved.
+
+    Args:
+        series: avg, min and max per bucket (oldest first)
+        max_points: point budget
+
+    Returns:
+        Downsampled series
+    """
+    if len(series) <= max_points:
+        return series
+
+    x = series.index.asi8.astype(float)
+    positions = lttb(x, series["avg"].to_numpy(dtype=float), max_points)
+
+    result = series.iloc[positions].copy()
+    result["min"] = np.fmin.reduceat(series["min"].to_numpy(dtype=float), positions)
+    result["max"] = np.fmax.reduceat(series["max"].to_numpy(dtype=float), positions)
+
+    return result
+
+
+def get_time_series(
+    metrics_df: pd.DataFrame,
+    metric: str = "instant_power_consumption",
+    bucket: str | None = None,
+    max_points: int | None = None,
+) -> pd.DataFrame:
+    """Resamples a metric by data_coleta into buckets, within a point budget
+
+    Args:
+        metrics_df: metrics rows with data_coleta (as timestamps), of any machines
+        metric: metric column
+        bucket: bucket width (CHART_BUCKET by default)
+        max_points: point budget (CHART_MAX_POINTS by default)
+
+    Returns:
+        Avg, min and max of the metric per bucket (index: bucket start, oldest first)
+    """
+    bucket = bucket or get_setting("CHART_BUCKET", default_bucket)
+    max_points = max_points or get_setting("CHART_MAX_POINTS", default_max_points)
+
+    series = series_from_stats(get_bucket_stats(metrics_df, metric, bucket))
+    return downsample(series, max_points)
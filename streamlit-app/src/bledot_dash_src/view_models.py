@@ -0,0 +1,239 @@
+from collections.abc import Mapping
+from typing import Any
+import numpy as np
+import pandas as pd
+from bledot_dash_src.charts import get_colors
+from bledot_dash_src.data_cache import freeze
+
+
+def speed_gauge(
+    stats: Mapping,
+    label: str,
+    title: str,
+    issues: set[str] | None,
+    start_val: float = 0,
+    end_val: float = 100,
+    scale: float = 100,
+    format_str: str = "{:.0f} %",
+) -> dict:
+    """Gets the arguments of a speed gauge of a metric
+
+    Args:
+        stats: data with avg_metrics, min_metrics and max_metrics
+        label: metric
+        title: gauge title
+        issues: violated rules, or None to keep the default colors
+        start_val, end_val: gauge range
+        scale: factor applied to the metric (e.g. 100 for fractions)
+        format_str: value format
+    """
+    gauge = {
+        "kind": "speed",
+        "val": stats["avg_metrics"][label] * scale,
+        "start_val": start_val,
+        "end_val": end_val,
+        "min_val": stats["min_metrics"][label] * scale,
+        "max_val": stats["max_metrics"][label] * scale,
+        "format_str": format_str,
+        "title": title,
+    }
+    if issues is not None:
+        gauge["color_val"], gauge["color_avg"] = get_colors(label, issues)
+    return gauge
+
+
+def temperature_gauge(stats: Mapping, label: str, title: str, issues: set[str]) -> dict:
+    return speed_gauge(stats, label, title, issues, start_val=30, scale=1, format_str="{:.0f} \u00b0C")
+
+
+def hsbar_gauge(stats: Mapping, label: str, title: str, issues: set[str]) -> dict:
+    """Gets the arguments of a horizontal bar of a fraction metric"""
+    color_val, color_avg = get_colors(label, issues)
+    return {
+        "kind": "hsbar",
+        "val": stats["avg_metrics"][label] * 100,
+        "min_val": stats["min_metrics"][label] * 100,
+        "max_val": stats["max_metrics"][label] * 100,
+        "color_val": color_val,
+        "color_avg": color_avg,
+        "format_str": "{:.0f} %",
+        "title": title,
+        "width": 480,
+        "height": 250,
+    }
+
+
+def card(val: Any, format_str: str, title: str, color: str | None = None, **kwargs) -> dict:
+    """Gets the arguments of a card"""
+    card_args = {"kind": "card", "val": val, "format_str": format_str, "title": title, **kwargs}
+    if color is not None:
+        card_args["color"] = color
+    return card_args
+
+
+def status_card(label: str, issues: set[str], values: tuple[str, str], title: str, **kwargs) -> dict:
+    """Gets the arguments of a card showing values[1] if a rule is violated, else values[0]"""
+    _, color = get_colors(label, issues)
+    return card(values[label in issues], "{}", title, color, **kwargs)
+
+
+def power_line(stats: Mapping, issues: set[str], threshold: float) -> dict:
+    """Gets the arguments of the power consumption line chart"""
+    hist: pd.DataFrame = stats["power_consumption_hist"]
+    color_val, color_avg = get_colors("instant_power_consumption", issues)
+    return {
+        "val": hist["avg"],
+        "min_val": hist["min"],
+        "max_val": hist["max"],
+        "title": "Consumo energético (W)",
+        "color_val": color_val,
+        "color_avg": color_avg,
+        "start_val": max(0, np.min(hist["min"]) - 2),
+        "end_val": max(threshold + 2, np.max(hist["max"]) + 2),
+        "threshold": threshold,
+        "time": hist.index,
+    }
+
+
+def build_tab_views(
+    stats: Mapping,
+    issues: set[str],
+    idle: Any,
+    packet_loss: float,
+    power_threshold: float,
+) -> dict:
+    """Gets the chart arguments of the tabs shared by the company and machine dashboards
+
+    Args:
+        stats: data with avg_metrics, min_metrics, max_metrics and
+            power_consumption_hist
+        issues: violated rules
+        idle: idle card value (number of idle machines, or machine status)
+        packet_loss: mean packet loss
+        power_threshold: power consumption threshold
+
+    Returns:
+        Arguments by tab and chart, gauges carrying their kind for gauge grids
+    """
+    avg_metrics = stats["avg_metrics"]
+    _, color_fails = get_colors("recent_hardware_failures", issues)
+    _, color_idle = get_colors("idle", issues)
+    _, color_packet_loss = get_colors("packet_loss", issues)
+
+    return {
+        "overview": {
+            "failures": card(
+                avg_metrics["recent_hardware_failures"], "{:.0f}", "Histórico de falhas recentes", color_fails
+            ),
+            "idle": card(idle, "{}", "Máquinas ociosas", color_idle),
+            "power": power_line(stats, issues, power_threshold),
+            "cpu_temperature": temperature_gauge(stats, "cpu_temperature", "Temperatura da CPU", issues),
+            "gpu_temperature": temperature_gauge(stats, "gpu_temperature", "Temperatura da GPU", issues),
+            "ram_usage": speed_gauge(stats, "ram_usage", "Uso de RAM", issues),
+        },
+        "processing": {
+            "gauges": [
+                [
+                    speed_gauge(stats, "cpu_usage", "Uso da CPU", issues),
+                    speed_gauge(stats, "gpu_usage", "Uso da GPU", issues),
+                ],
+                [
+                    temperature_gauge(stats, "cpu_temperature", "Temperatura da CPU", issues),
+                    temperature_gauge(stats, "gpu_temperature", "Temperatura da GPU", issues),
+                ],
+            ],
+            "cards": [
+                [card(avg_metrics["gpu_voltage"], "{:.1f}", "Voltagem da GPU", height=240)],
+                [
+                    card(avg_metrics.get("fan_rpm_cpu", 0), "{:.0f}", "RPM da CPU", height=240),
+                    card(avg_metrics.get("fan_rpm_gpu", 0), "{:.0f}", "RPM da GPU", height=240),
+                ],
+            ],
+        },
+        "hardware": {
+            "disks": [
+                [hsbar_gauge(stats, "disk_usage_root", "Uso de armazenamento (root)", issues)],
+                [hsbar_gauge(stats, "disk_usage_home", "Uso de armazenamento (home)", issues)],
+                [hsbar_gauge(stats, "disk_usage_boot", "Uso de armazenamento (boot)", issues)],
+            ],
+            "gauges": [
+                [
+                    speed_gauge(stats, "ram_usage", "Uso de RAM", issues),
+                    speed_gauge(stats, "battery_health", "Saúde da bateria", None),
+                ],
+                [
+                    status_card("smart_overall", issues, ("OK", "FALHA"), "Diagnóstico SMART", height=175),
+                    speed_gauge(stats, "swap_usage", "Uso de swap", None),
+                ],
+            ],
+            "power": power_line(stats, issues, power_threshold),
+        },
+        "software": {
+            "firewall": status_card("firewall_active", issues, ("ATIVO", "INATIVO"), "Status do Firewall"),
+            "failed_logins": speed_gauge(
+                stats, "failed_logins", "Tentativas de login falhas", issues,
+                end_val=20, scale=1, format_str="{:.0f}",
+            ),
+            "idle": card(idle, "{}", "Máquinas ociosas", color_idle, height=250),
+            "packet_loss": card(packet_loss, "{:.1f} %", "Packet Loss", color_packet_loss, height=225),
+        },
+    }
+
+
+def company_view_models(company_data: Mapping, metrics_threshold: dict) -> Mapping:
+    """Gets the render-ready data of every company dashboard tab
+
+    Args:
+        company_data: company dashboard data (load_client_dashboard_data)
+        metrics_threshold: metric rules
+
+    Returns:
+        Read-only chart arguments by tab, plus the issues list
+    """
+    summary_data = company_data["summary_stats"]
+    machines_with_issues = summary_data["machines_with_issues"]
+    issues = machines_with_issues.rules_present()
+
+    idle = len(machines_with_issues.machines_with_all(["click_rate", "keypress_rate"]))
+    pkg_loss = company_data["latest_metrics"]["pkg_loss_list"]
+    packet_loss = np.mean([np.mean(x) for x in pkg_loss])
+
+    machines = company_data["machines"]
+    labels = dict(zip(machines["id"], machines["label_maquina"]))
+
+    views = build_tab_views(
+        summary_data, issues, idle, packet_loss,
+        metrics_threshold["instant_power_consumption"]["val"],
+    )
+    views["issues"] = [
+        {
+            "id": machine_id,
+            "label": labels.get(machine_id),
+            "issues": [metrics_threshold[issue]["str"] for issue in machine_issues],
+        }
+        for machine_id, machine_issues in machines_with_issues.items()
+    ]
+
+    return freeze(views)
+
+
+def machine_view_models(machine_data: Mapping, machine_id: Any, metrics_threshold: dict) -> Mapping:
+    """Gets the render-ready data of every machine dashboard tab
+
+    Args:
+        machine_data: machine dashboard data (MachineHistory)
+        machine_id: id of the machine
+        metrics_threshold: metric rules
+
+    Returns:
+        Read-only chart arguments by tab
+    """
+    issues = machine_data["issues"].issues_of(machine_id)
+    idle = "Ociosa" if "click_rate" in issues and "keypress_rate" in issues else "Não ociosa"
+
+    return freeze(
+        build_tab_views(
+            machine_data, issues, idle, machine_data["pkg_loss_mean"],
+            metrics_threshold["instant_power_consumption"]["val"],
+        )
+    )
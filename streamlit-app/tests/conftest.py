@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+from synthetic_fleet import make_fleet, to_records
+from bledot_dash_src.data_cache import company_data_cache
+from bledot_dash_src.delta_sync import metric_windows
+
+
+def sort_key(value):
+    """Orders ISO timestamps by time and other values as they are"""
+    return pd.Timestamp(value) if isinstance(value, str) else value
+
+
+class StubQuery:
+    """Query builder answering from in-memory rows, supporting the filters the
+    data layer uses (eq, in_, gte, order, limit)"""
+
+    def __init__(self, client: "StubClient", table: str):
+        self.client = client
+        self.table = table
+        self.columns = None
+        self.filters = []
+        self.orders = []
+        self.row_limit = None
+
+    def select(self, columns: str) -> "StubQuery":
+        self.columns = None if columns == "*" else columns.split(",")
+        return self
+
+    def eq(self, column: str, value) -> "StubQuery":
+        self.filters.append(lambda row: row[column] == value)
+        return self
+
+    def in_(self, column: str, values) -> "StubQuery":
+        values = set(values)
+        self.filters.append(lambda row: row[column] in values)
+        return self
+
+    def gte(self, column: str, value) -> "StubQuery":
+        value = sort_key(value)
+        self.filters.append(lambda row: sort_key(row[column]) >= value)
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "StubQuery":
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count: int) -> "StubQuery":
+        self.row_limit = count
+        return self
+
+    def execute(self) -> SimpleNamespace:
+        self.client.queries.append(self.table)
+        rows = [row for row in self.client.tables[self.table] if all(f(row) for f in self.filters)]
+        for column, desc in reversed(self.orders):
+            rows.sort(key=lambda row: sort_key(row[column]), reverse=desc)
+        if self.row_limit is not None:
+            rows = rows[:self.row_limit]
+        if self.columns is not None:
+            rows = [{column: row.get(column) for column in self.columns} for row in rows]
+        return SimpleNamespace(data=rows)
+
+
+class StubClient:
+    """Supabase client stand-in over in-memory tables, recording the queried tables"""
+
+    def __init__(self, tables: dict[str, list[dict]]):
+        self.tables = tables
+        self.queries: list[str] = []
+
+    def table(self, name: str) -> StubQuery:
+        return StubQuery(self, name)
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    """Every test starts without cached snapshots or metric windows"""
+    company_data_cache.invalidate()
+    metric_windows.invalidate()
+    yield
+
+
+@pytest.fixture
+def fleet():
+    """Synthetic company of 5 machines with a day of samples (maquinas, metricas_maquina)"""
+    return make_fleet(5, sample_minutes=30, days=1)
+
+
+@pytest.fixture
+def stub_client(fleet):
+    machines_df, metrics_df = fleet
+    company_id = machines_df["id_empresa"].iloc[0]
+    return StubClient({
+        "empresas": [{"id": company_id, "nome_empresa": "Empresa Teste"}],
+        "maquinas": to_records(machines_df),
+        "metricas_maquina": to_records(metrics_df),
+    })
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+from bledot_dash_src.chart_cache import ChartCache
+from bledot_dash_src.charts import create_card_chart, create_line_chart, create_speed_chart
+
+
+def speed(cache: ChartCache, val: float, **kwargs) -> dict:
+    return cache.get(create_speed_chart, val, 0, 1, 0.2, 0.9, "{:.0%}", "Uso de CPU", **kwargs)
+
+
+def test_rounded_arguments_hit_and_changed_ones_miss():
+    cache = ChartCache(max_entries=8, digits=2)
+
+    spec = speed(cache, 0.5012)
+    assert speed(cache, 0.4999) == spec
+    assert cache.stats()["hits"] == 1
+
+    assert speed(cache, 0.51) != spec
+    assert speed(cache, 0.5012, color_val="#000000") != spec
+    assert speed(cache, 0.5012, width=300) != spec
+    assert cache.stats()["misses"] == 4
+
+
+def test_series_arguments_are_keyed_by_their_rounded_values():
+    cache = ChartCache(max_entries=8, digits=2)
+    time = pd.date_range("2026-01-01", periods=3, freq="h")
+
+    cache.get(create_line_chart, [1.001, 2.0, 3.0], [1, 2, 3], [1, 2, 3], "Consumo", time=time)
+    cache.get(create_line_chart, pd.Series([1.0, 2.0, 3.004]), [1, 2, 3], [1, 2, 3], "Consumo", time=time)
+    cache.get(create_line_chart, [1.0, 2.0, 3.1], [1, 2, 3], [1, 2, 3], "Consumo", time=time)
+    cache.get(create_line_chart, [1.0, 2.0, 3.0], [1, 2, 3], [1, 2, 3], "Consumo", time=time + pd.Timedelta("1h"))
+
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 3)
+
+
+def test_least_recently_used_specs_are_evicted():
+    cache = ChartCache(max_entries=2, digits=2)
+
+    for title in ("a", "b", "a", "c"):
+        cache.get(create_card_chart, 1, "{}", title)
+    assert cache.stats() == {"hits": 1, "misses": 3, "evictions": 1, "entries": 2, "hit_rate": 0.25}
+
+    # "b" was evicted, "a" was kept as it was used after it
+    cache.get(create_card_chart, 1, "{}", "a")
+    cache.get(create_card_chart, 1, "{}", "b")
+    assert cache.stats() == {"hits": 2, "misses": 4, "evictions": 2, "entries": 2, "hit_rate": 2 / 6}
+
+
+def test_unhashable_arguments_are_rejected():
+    cache = ChartCache(max_entries=8, digits=2)
+
+    with pytest.raises(TypeError, match="DataFrame"):
+        cache.get(create_card_chart, pd.DataFrame({"val": [1]}), "{}", "Tabela")
@@ -0,0 +1,27 @@
+import os
+from streamlit.testing.v1 import AppTest
+
+app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+script = """
+import sys
+import pandas as pd
+import streamlit as st
+sys.path[:0] = [{app_dir!r}, {pages_dir!r}]
+from bledot_dash_src.shared_data import set_shared_state
+import company_dash
+
+st.session_state["company_id"] = "empresa"
+set_shared_state("company_data", ("company_data", "empresa", 0), {{"latest_metrics": pd.DataFrame()}})
+company_dash.download_metrics()
+"""
+
+
+def test_export_is_disabled_without_metrics():
+    at = AppTest.from_string(script.format(app_dir=app_dir, pages_dir=os.path.join(app_dir, "pages")))
+    at.run(timeout=30)
+    assert not at.exception
+    assert at.button[0].disabled
+
+    at.button[0].click().run(timeout=30)
+    assert not at.exception
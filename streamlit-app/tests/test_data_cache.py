@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+import pytest
+from bledot_dash_src.data_cache import freeze
+
+
+def test_freeze_makes_frames_read_only():
+    df = pd.DataFrame({
+        "id": [1, 2],
+        "cpu_usage": [0.5, 0.7],
+        "data_coleta": pd.to_datetime(["2026-01-01", "2026-01-02"], utc=True),
+    })
+    frozen = freeze({"latest_metrics": df, "rules": ["cpu_usage"], "values": np.arange(3)})
+
+    assert frozen["latest_metrics"] is df
+    assert frozen["rules"] == ("cpu_usage",)
+    with pytest.raises(ValueError):
+        df.loc[0, "cpu_usage"] = 1.0
+    with pytest.raises(ValueError):
+        df.iloc[0, 0] = 3
+    with pytest.raises(ValueError):
+        frozen["values"][0] = 1
+
+    # Derived frames are copies, which can be changed
+    derived = df.sort_values("id", ascending=False)
+    derived.loc[0, "cpu_usage"] = 1.0
+    assert df.loc[0, "cpu_usage"] == 0.5
@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+from bledot_dash_src.delta_sync import MetricsWindow
+from bledot_dash_src.supabase_data import SupabaseData
+
+
+def test_reload_fetches_rows_uploaded_late(fleet, stub_client):
+    machines_df, _ = fleet
+    company_id = machines_df["id_empresa"].iloc[0]
+    supabase_data = SupabaseData(client=stub_client, pushdown=False)
+    latest_metrics = supabase_data.load_client_dashboard_data(company_id)["latest_metrics"]
+
+    # A machine uploads a sample collected before the newest sample of another machine
+    newest = latest_metrics.iloc[0]
+    late_machine = latest_metrics.loc[latest_metrics["id_maquina"] != newest["id_maquina"], "id_maquina"].iloc[0]
+    late_row = dict(stub_client.tables["metricas_maquina"][0])
+    late_row.update({
+        "id": max(row["id"] for row in stub_client.tables["metricas_maquina"]) + 1,
+        "id_maquina": late_machine,
+        "data_coleta": (newest["data_coleta"] - pd.Timedelta(minutes=10)).isoformat(),
+    })
+    stub_client.tables["metricas_maquina"].append(late_row)
+
+    latest_metrics = supabase_data.load_client_dashboard_data(company_id)["latest_metrics"]
+
+    assert late_row["id"] in latest_metrics["id"].tolist()
+    assert latest_metrics["id"].is_unique
+
+
+def machine_pages(metrics_df: pd.DataFrame, page_size: int = 10) -> list[pd.DataFrame]:
+    """Rows of one machine newest first, in pages like iter_machine_metrics"""
+    rows = metrics_df[metrics_df["id_maquina"] == metrics_df["id_maquina"].iloc[0]] \
+        .sort_values(["data_coleta", "id"], ascending=False, ignore_index=True)
+    return [rows.iloc[start:start + page_size] for start in range(0, len(rows), page_size)]
+
+
+def test_paged_refresh_matches_a_single_chunk(fleet):
+    _, metrics_df = fleet
+    pages = machine_pages(metrics_df)
+    thresholds = SupabaseData(client=object())._metrics_threshold
+
+    paged = MetricsWindow(thresholds, days=7).consume(iter(pages))
+    whole = MetricsWindow(thresholds, days=7).consume([pd.concat(pages, ignore_index=True)])
+
+    pd.testing.assert_frame_equal(paged.frame, whole.frame)
+    pd.testing.assert_frame_equal(paged.aggregates()[0], whole.aggregates()[0])
+    assert paged.config == whole.config
+    assert paged.config["host_name"] == pages[0]["host_name"].iloc[0]
+
+
+def test_failed_refresh_leaves_the_window_unchanged(fleet):
+    _, metrics_df = fleet
+    pages = machine_pages(metrics_df)
+    window = MetricsWindow(SupabaseData(client=object())._metrics_threshold, days=7)
+    window.consume(pages[2:])
+    frame, watermark, kpi = window.frame, window.watermark, window.aggregates()[0]
+
+    def failing_pages():
+        yield from pages[:2]
+        raise ConnectionError("page fetch failed")
+
+    with pytest.raises(ConnectionError):
+        window.consume(failing_pages())
+
+    assert window.frame is frame
+    assert window.watermark == watermark
+    pd.testing.assert_frame_equal(window.aggregates()[0], kpi)
+    assert window.since() == (watermark - window.lag).isoformat()
@@ -0,0 +1,59 @@
+import gzip
+import io
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from bledot_dash_src import download_metrics
+from bledot_dash_src.download_metrics import export_formats, exportable, timestamp_format
+
+
+@pytest.fixture
+def metrics_df(fleet, monkeypatch):
+    """Latest metrics with a missing timestamp, exported in chunks of 7 rows"""
+    monkeypatch.setattr(download_metrics, "default_chunk_rows", 7)
+    _, metrics_df = fleet
+    metrics_df = metrics_df.head(30).copy()
+    metrics_df.loc[3, "data_coleta"] = pd.NaT
+    return metrics_df
+
+
+def strftime_csv(df: pd.DataFrame) -> bytes:
+    """CSV export as written with dt.strftime"""
+    return df.assign(data_coleta=df["data_coleta"].dt.strftime(timestamp_format)) \
+        .to_csv(index=False).encode("utf-8")
+
+
+@pytest.mark.parametrize("df", ["metrics", "empty"])
+def test_csv_exports_match_strftime(metrics_df, df):
+    df = metrics_df if df == "metrics" else metrics_df.iloc[0:0]
+
+    assert export_formats["csv"]["writer"](df) == strftime_csv(df)
+    assert gzip.decompress(export_formats["csv.gz"]["writer"](df)) == strftime_csv(df)
+
+
+@pytest.mark.parametrize("df", ["metrics", "empty"])
+def test_xlsx_export_matches_strftime(metrics_df, df):
+    df = metrics_df if df == "metrics" else metrics_df.iloc[0:0]
+
+    sheet = load_workbook(io.BytesIO(export_formats["xlsx"]["writer"](df))).active
+    rows = list(sheet.iter_rows(values_only=True))
+    assert list(rows[0]) == list(df.columns)
+
+    column = list(df.columns).index("data_coleta")
+    expected = df["data_coleta"].dt.strftime(timestamp_format)
+    assert [row[column] for row in rows[1:]] == expected.where(expected.notna(), None).tolist()
+
+
+@pytest.mark.parametrize("df", ["metrics", "empty"])
+def test_parquet_export_keeps_the_timestamps(metrics_df, df):
+    df = metrics_df if df == "metrics" else metrics_df.iloc[0:0]
+
+    exported = pd.read_parquet(io.BytesIO(export_formats["parquet"]["writer"](df)))
+    pd.testing.assert_series_equal(exported["data_coleta"], df["data_coleta"].reset_index(drop=True))
+    assert len(exported) == len(df)
+
+
+def test_exportable(metrics_df):
+    assert exportable(metrics_df)
+    assert not exportable(metrics_df.iloc[0:0])
+    assert not exportable(pd.DataFrame())
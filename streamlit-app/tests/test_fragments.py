@@ -0,0 +1,33 @@
+from streamlit.testing.v1 import AppTest
+from bledot_dash_src import fragments
+from bledot_dash_src.fragments import rerun_stats
+
+script = """
+import streamlit as st
+from bledot_dash_src.fragments import fragment, timed
+
+def page():
+    fragment("test_fragments.part", lambda: st.write("fragment"))()
+
+timed("test_fragments.page", page)()
+"""
+
+
+def runs(name: str) -> int:
+    return rerun_stats.stats().get(name, {}).get("runs", 0)
+
+
+def test_fragment_reruns_are_recorded_apart(monkeypatch):
+    before = {name: runs(name) for name in ("test_fragments.part", "test_fragments.part.rerun")}
+    at = AppTest.from_string(script)
+
+    at.run()
+    assert not at.exception
+    assert runs("test_fragments.part") == before["test_fragments.part"] + 1
+    assert runs("test_fragments.part.rerun") == before["test_fragments.part.rerun"]
+
+    # AppTest always reruns the whole script, so a fragment-only rerun is simulated
+    monkeypatch.setattr(fragments, "is_fragment_rerun", lambda: True)
+    at.run()
+    assert runs("test_fragments.part") == before["test_fragments.part"] + 1
+    assert runs("test_fragments.part.rerun") == before["test_fragments.part.rerun"] + 1
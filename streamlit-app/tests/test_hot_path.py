@@ -0,0 +1,76 @@
+import math
+import socket
+import urllib.error
+import urllib.request
+import pytest
+from bledot_dash_src import hot_path
+from bledot_dash_src.hot_path import Histogram, HotPathStats, serve_metrics
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram((1.0, 2.0, 5.0))
+    assert math.isnan(histogram.quantile(0.5))
+
+    for value in (0.5, 1.0, 1.5, 3.0, 4.0, 9.0):
+        histogram.observe(value)
+
+    # Bounds are inclusive, values over the last bound go to the +Inf bucket
+    assert histogram.counts == [2, 1, 2, 1]
+    assert histogram.cumulative() == [(1.0, 2), (2.0, 3), (5.0, 5), (float("inf"), 6)]
+    assert histogram.sum == 19.0
+    assert histogram.quantile(0.3) == 1.0
+    assert histogram.quantile(0.5) == 2.0
+    assert histogram.quantile(0.8) == 5.0
+    assert histogram.quantile(1.0) == 5.0
+
+
+def test_calls_are_recorded_and_exposed():
+    stats = HotPathStats()
+    stats.call("query.maquinas", lambda: [{"id": 1}, {"id": 2}])
+    stats.record_hit("query.maquinas")
+    with pytest.raises(ZeroDivisionError):
+        stats.call("transform", lambda: 1 / 0)
+    stats.record_error("fleet_aggregates")
+
+    recorded = stats.stats()["query.maquinas"]
+    assert (recorded["calls"], recorded["hits"], recorded["errors"], recorded["rows"]) == (1, 1, 0, 2)
+    assert recorded["bytes"] == len('[{"id": 1}, {"id": 2}]')
+    assert stats.stats()["transform"]["errors"] == 1
+    assert stats.stats()["fleet_aggregates"]["calls"] == 0
+
+    lines = stats.to_prometheus().splitlines()
+    assert "# TYPE bledot_hot_path_seconds histogram" in lines
+    assert 'bledot_hot_path_seconds_bucket{name="query.maquinas",le="0.001"} 1' in lines
+    assert 'bledot_hot_path_seconds_bucket{name="query.maquinas",le="+Inf"} 1' in lines
+    assert 'bledot_hot_path_seconds_count{name="query.maquinas"} 1' in lines
+    assert 'bledot_hot_path_response_bytes_bucket{name="query.maquinas",le="1000.0"} 1' in lines
+    assert 'bledot_hot_path_response_bytes_count{name="transform"} 0' in lines
+    assert 'bledot_hot_path_rows_total{name="query.maquinas"} 2' in lines
+    assert 'bledot_hot_path_cache_hits_total{name="query.maquinas"} 1' in lines
+    assert 'bledot_hot_path_errors_total{name="fleet_aggregates"} 1' in lines
+
+    # Every sample line is "<metric>{<labels>} <value>"
+    for line in lines:
+        if not line.startswith("#"):
+            metric, value = line.rsplit(" ", 1)
+            assert metric.endswith("}") and float(value) >= 0
+
+
+def test_metrics_endpoint(monkeypatch):
+    monkeypatch.setattr(hot_path, "_server", None)
+    assert serve_metrics(port=0) is None
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = serve_metrics(port=port)
+    try:
+        assert serve_metrics(port=port) is server
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert response.read().decode("utf-8") == hot_path.hot_path_stats.to_prometheus()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/other")
+    finally:
+        server.shutdown()
+        server.server_close()
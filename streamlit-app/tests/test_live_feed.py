@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import time
+import pytest
+from websockets.asyncio.server import serve
+from bledot_dash_src.live_feed import LiveFeed, in_filter_max_values
+from bledot_dash_src.realtime_standin import RealtimeStandin
+
+
+@pytest.fixture
+def standin_url():
+    """Starts a stand-in Realtime server replaying metrics inserts for the first
+    and last machines of a company of 150"""
+    changes = [
+        {"table": "metricas_maquina", "type": "INSERT", "delay": 0.5,
+         "record": {"id": 1, "id_maquina": machine_id, "data_coleta": "2026-01-01T00:00:00+00:00"}}
+        for machine_id in (1, 150)
+    ]
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    async def start():
+        return await serve(RealtimeStandin(changes).handle, "127.0.0.1", 0)
+
+    async def stop():
+        server.close()
+        await server.wait_closed()
+
+    server = asyncio.run_coroutine_threadsafe(start(), loop).result(timeout=5)
+    yield f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+    asyncio.run_coroutine_threadsafe(stop(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+
+
+def test_subscription_splits_machines_over_channels(standin_url):
+    feed = LiveFeed(standin_url, "key")
+    try:
+        feed.subscribe("company", range(1, 151))
+
+        deadline = time.monotonic() + 5
+        while feed.stats["metric_inserts"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        assert feed.stats["errors"] == 0
+        assert feed.stats["metric_inserts"] == 2
+        assert feed.version("company") == 2
+        _, channels = feed._channels["company"]
+        assert len(channels) == 150 // in_filter_max_values + 2
+    finally:
+        feed.close()
@@ -0,0 +1,111 @@
+import threading
+import pandas as pd
+import pytest
+from bledot_dash_src.metrics_store import MetricsStore
+
+columns = ["id", "id_maquina", "data_coleta", "cpu_usage", "instant_power_consumption"]
+
+
+@pytest.fixture
+def machine_rows(fleet):
+    """Rows of the first machine of the fleet, newest first, and the beginning of their range"""
+    _, metrics_df = fleet
+    rows = metrics_df.loc[metrics_df["id_maquina"] == metrics_df["id_maquina"].iloc[0], columns] \
+        .sort_values(["data_coleta", "id"], ascending=False, ignore_index=True)
+    return rows, rows["data_coleta"].min().floor("D")
+
+
+def new_store(path, max_days: int = 30, max_bytes: float = 1e9) -> MetricsStore:
+    return MetricsStore(str(path), max_days, max_bytes)
+
+
+def test_rows_are_read_back_after_a_restart(tmp_path, machine_rows):
+    rows, start = machine_rows
+    machine_id = rows["id_maquina"].iloc[0]
+    new_store(tmp_path).write("empresa", machine_id, rows, start, {"host_name": "host-0001"})
+
+    stored_rows, config = new_store(tmp_path).read("empresa", machine_id, start, columns)
+
+    pd.testing.assert_frame_equal(stored_rows, rows)
+    assert config == {"host_name": "host-0001"}
+    assert new_store(tmp_path).read("empresa", machine_id, start - pd.Timedelta(days=1), columns) is None
+
+
+def test_rows_uploaded_late_into_the_stored_range_are_written(tmp_path, machine_rows):
+    rows, start = machine_rows
+    machine_id = rows["id_maquina"].iloc[0]
+    store = new_store(tmp_path)
+    store.write("empresa", machine_id, rows, start, {})
+
+    # Writing the same rows again is a no-op
+    store.write("empresa", machine_id, rows, start, {})
+    assert store.stats["writes"] == 1
+
+    late_row = rows.iloc[[len(rows) // 2]].assign(
+        id=rows["id"].max() + 1, data_coleta=rows["data_coleta"].iloc[len(rows) // 2] - pd.Timedelta(minutes=1)
+    )
+    store.write("empresa", machine_id, pd.concat([rows, late_row], ignore_index=True), start, {})
+    assert store.stats["rows_written"] == len(rows) + 1
+
+    stored_rows, _ = new_store(tmp_path).read("empresa", machine_id, start, columns)
+    assert late_row["id"].iloc[0] in stored_rows["id"].tolist()
+    assert stored_rows["id"].is_unique
+
+
+def test_other_columns_or_a_damaged_file_invalidate_the_company(tmp_path, machine_rows):
+    rows, start = machine_rows
+    machine_id = rows["id_maquina"].iloc[0]
+    store = new_store(tmp_path)
+    store.write("empresa", machine_id, rows, start, {})
+
+    store.write("empresa", machine_id, rows.drop(columns="cpu_usage"), start, {})
+    assert store.stats["invalidations"] == 1
+    assert store.read("empresa", machine_id, start, columns) is None
+
+    store.write("empresa", machine_id, rows, start, {})
+    day_file = next((tmp_path / "v1" / "company=empresa").glob("day=*.arrow"))
+    day_file.write_bytes(day_file.read_bytes()[:-8])
+    assert store.read("empresa", machine_id, start, columns) is None
+    assert store.stats["invalidations"] == 3
+    assert not list((tmp_path / "v1" / "company=empresa").glob("day=*.arrow"))
+
+
+def test_old_days_and_days_over_the_size_limit_are_evicted(tmp_path, machine_rows):
+    rows, start = machine_rows
+    machine_id = rows["id_maquina"].iloc[0]
+    # The same samples two days earlier, so the rows span several days
+    earlier = rows.assign(id=rows["id"] + rows["id"].max(), data_coleta=rows["data_coleta"] - pd.Timedelta(days=2))
+    rows, start = pd.concat([rows, earlier], ignore_index=True), start - pd.Timedelta(days=2)
+    days = rows["data_coleta"].dt.strftime("%Y-%m-%d").nunique()
+    store = new_store(tmp_path, max_days=30)
+    store.write("empresa", machine_id, rows, start, {})
+
+    # Only the newest day is within max_days
+    now = rows["data_coleta"].max().floor("D") + pd.Timedelta(days=30)
+    assert store.evict(now) == days - 1
+    stored_rows, _ = store.read("empresa", machine_id, now - pd.Timedelta(days=30), columns)
+    assert (stored_rows["data_coleta"] >= now - pd.Timedelta(days=30)).all()
+    assert store.read("empresa", machine_id, start, columns) is None
+
+    store.max_bytes = 0
+    assert store.evict(now) == 1
+    assert store.size() == 0
+
+
+def test_concurrent_writes_of_a_company_are_serialized(tmp_path, fleet):
+    _, metrics_df = fleet
+    start = metrics_df["data_coleta"].min().floor("D")
+    store = new_store(tmp_path)
+
+    threads = [
+        threading.Thread(target=store.write, args=("empresa", machine_id, rows[columns], start, {}))
+        for machine_id, rows in metrics_df.groupby("id_maquina")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for machine_id, rows in metrics_df.groupby("id_maquina"):
+        stored_rows, _ = new_store(tmp_path).read("empresa", machine_id, start, columns)
+        assert sorted(stored_rows["id"]) == sorted(rows["id"])
@@ -0,0 +1,91 @@
+import os
+import uuid
+import pandas as pd
+import pytest
+from synthetic_fleet import make_fleet, to_records
+from bledot_dash_src.supabase_data import SupabaseData
+
+psycopg2 = pytest.importorskip("psycopg2")
+from psycopg2.extras import Json, execute_values  # noqa: E402
+from bledot_dash_src.local_postgres import LocalPostgresClient  # noqa: E402
+
+# Scratch Postgres database the tables and functions of sql/ are loaded into
+dsn = os.environ.get("BLEDOT_TEST_DSN")
+pytestmark = pytest.mark.skipif(not dsn, reason="BLEDOT_TEST_DSN is not set")
+
+sql_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql")
+
+
+def adapt(value):
+    return Json(value) if isinstance(value, (dict, list)) else value
+
+
+def insert_rows(cursor, table: str, df: pd.DataFrame, returning: str = "") -> list:
+    records = to_records(df)
+    columns = list(df.columns)
+    return execute_values(
+        cursor,
+        f"insert into public.{table} ({', '.join(columns)}) values %s {returning}",
+        [tuple(adapt(record[column]) for column in columns) for record in records],
+        fetch=bool(returning),
+        page_size=1000,
+    )
+
+
+@pytest.fixture
+def loaded_fleet():
+    """Synthetic company inserted into the scratch database under a new id,
+    with the metrics frame renumbered to the machine ids given by the database"""
+    machines_df, metrics_df = make_fleet(8, sample_minutes=30, days=2)
+    company_id = str(uuid.uuid4())
+
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn, conn.cursor() as cursor:
+            for name in ("local_schema.sql", "fleet_aggregates.sql"):
+                with open(os.path.join(sql_dir, name), encoding="utf-8") as file:
+                    cursor.execute(file.read())
+
+            cursor.execute(
+                "insert into public.empresas (id, nome_empresa) values (%s, %s)",
+                (company_id, f"pushdown-test-{company_id}"),
+            )
+            new_ids = insert_rows(
+                cursor, "maquinas",
+                machines_df.drop(columns="id").assign(id_empresa=company_id),
+                returning="returning id",
+            )
+            machine_ids = dict(zip(machines_df["id"], (row[0] for row in new_ids)))
+            metrics_df = metrics_df.assign(id_maquina=metrics_df["id_maquina"].map(machine_ids))
+            insert_rows(cursor, "metricas_maquina", metrics_df.drop(columns="id"))
+
+        yield company_id, metrics_df
+    finally:
+        with conn, conn.cursor() as cursor:
+            cursor.execute(
+                "delete from public.metricas_maquina where id_maquina in "
+                "(select id from public.maquinas where id_empresa = %s)",
+                (company_id,),
+            )
+            cursor.execute("delete from public.maquinas where id_empresa = %s", (company_id,))
+            cursor.execute("delete from public.empresas where id = %s", (company_id,))
+        conn.close()
+
+
+def test_pushdown_matches_pandas(loaded_fleet):
+    company_id, metrics_df = loaded_fleet
+    supabase_data = SupabaseData(client=LocalPostgresClient(dsn), pushdown=True, concurrent=False)
+
+    aggregates = supabase_data._get_pushdown_aggregates(company_id, days=7)
+    assert aggregates is not None
+    pushdown_kpi, pushdown_issues = aggregates
+
+    # pandas also aggregates the ids and coordinates, which are not metrics
+    pandas_kpi = supabase_data._get_metrics_kpi(metrics_df).drop(["id", "id_maquina", "lat", "lon"])
+    pd.testing.assert_frame_equal(
+        pushdown_kpi.sort_index(), pandas_kpi.sort_index(), check_dtype=False, rtol=1e-9
+    )
+
+    pandas_issues = supabase_data._get_issues_report(metrics_df)
+    assert dict(pushdown_issues) == dict(pandas_issues)
+    assert len(pushdown_issues) > 0
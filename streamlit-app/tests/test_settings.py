@@ -0,0 +1,25 @@
+import pytest
+import streamlit as st
+from bledot_dash_src.settings import get_setting, parse_setting
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("false", False), ("False", False), ("0", False), ("no", False), (False, False),
+    ("true", True), ("1", True), ("yes", True), (True, True),
+])
+def test_booleans_are_parsed(value, expected):
+    assert parse_setting(value, False) is expected
+    assert parse_setting(value, True) is expected
+
+
+def test_numbers_take_the_type_of_the_default():
+    assert parse_setting("8", 4) == 8
+    assert parse_setting("2.5", 1.0) == 2.5
+
+
+def test_invalid_settings_fall_back_to_the_default(monkeypatch, capsys):
+    monkeypatch.setattr(st, "secrets", type("Secrets", (), {"supabase": {"FETCH_MAX_WORKERS": "eight", "LIVE_MODE": "maybe"}})())
+
+    assert get_setting("FETCH_MAX_WORKERS", 8) == 8
+    assert get_setting("LIVE_MODE", False) is False
+    assert "Invalid setting FETCH_MAX_WORKERS" in capsys.readouterr().out
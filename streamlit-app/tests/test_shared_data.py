@@ -0,0 +1,13 @@
+import pytest
+from bledot_dash_src.shared_data import deep_size
+
+
+def test_sampled_size_estimates_the_exact_size(fleet):
+    _, metrics_df = fleet
+    frame = metrics_df[["cpu_usage", "host_name"]].copy()
+    frame["host_name"] = [f"{host}-{i}" for i, host in enumerate(frame["host_name"])]
+    rows = frame.to_dict("records")
+
+    for value in (frame, rows):
+        exact = deep_size(value)
+        assert deep_size(value, sample_items=16) == pytest.approx(exact, rel=0.05)
@@ -0,0 +1,66 @@
+from bledot_dash_src.download_metrics import ExportCache
+from bledot_dash_src.supabase_data import SupabaseData
+
+
+def test_company_dashboard_loads_each_table_once(fleet, stub_client):
+    machines_df, _ = fleet
+    company_id = machines_df["id_empresa"].iloc[0]
+    supabase_data = SupabaseData(client=stub_client, pushdown=False)
+
+    company_data = supabase_data.load_client_dashboard_data(company_id)
+
+    assert supabase_data.query_count == 3
+    assert sorted(stub_client.queries) == ["empresas", "maquinas", "metricas_maquina"]
+    assert company_data["complete"]
+    assert company_data["client_info"]["nome_empresa"] == "Empresa Teste"
+    assert len(company_data["machines"]) == len(machines_df)
+    assert company_data["summary_stats"]["total_machines"] == len(machines_df)
+
+
+def test_export_fetches_every_column(fleet, stub_client):
+    machines_df, _ = fleet
+    company_id = machines_df["id_empresa"].iloc[0]
+    supabase_data = SupabaseData(client=stub_client, pushdown=False)
+    latest_metrics = supabase_data.load_client_dashboard_data(company_id)["latest_metrics"]
+    assert "host_name" not in latest_metrics.columns
+
+    cache = ExportCache(max_entries=4)
+    key = cache.key(company_id, latest_metrics, "csv")
+    data = cache.build(key, lambda: supabase_data.get_metrics_by_ids(latest_metrics["id"].tolist()))
+
+    header = data.decode("utf-8").splitlines()[0].split(",")
+    assert {"host_name", "installed_softwares", "ipv4"} <= set(header)
+    assert len(data.decode("utf-8").splitlines()) == len(latest_metrics) + 1
+    assert cache.peek(key) == data
+
+
+def test_company_version_follows_the_content(fleet, stub_client):
+    machines_df, _ = fleet
+    company_id = machines_df["id_empresa"].iloc[0]
+    supabase_data = SupabaseData(client=stub_client, pushdown=False)
+
+    first = supabase_data.load_client_dashboard_data(company_id)
+    again = supabase_data.load_client_dashboard_data(company_id)
+    assert again is not first
+    assert again["version"] == first["version"]
+
+    newest = dict(stub_client.tables["metricas_maquina"][0])
+    newest["id"] = max(row["id"] for row in stub_client.tables["metricas_maquina"]) + 1
+    stub_client.tables["metricas_maquina"].append(newest)
+    assert supabase_data.load_client_dashboard_data(company_id)["version"] != first["version"]
+
+
+def test_pushdown_fallback_shows_the_pandas_window(fleet, stub_client):
+    machines_df, _ = fleet
+    company_id = machines_df["id_empresa"].iloc[0]
+
+    # The stub client has no RPC calls, so the aggregates fall back to the latest metrics
+    company_data = SupabaseData(client=stub_client, pushdown=True).load_client_dashboard_data(company_id)
+    summary_stats = company_data["summary_stats"]
+
+    assert not summary_stats["pushdown"]
+    assert summary_stats["kpi_window"] == f"as últimas {len(company_data['latest_metrics'])} amostras"
+    supabase_data = SupabaseData(client=stub_client)
+    assert supabase_data._get_summary_stats(
+        company_data["machines"], company_data["latest_metrics"], pushdown=True
+    )["kpi_window"] == f"os últimos {supabase_data.pushdown_days} dias"
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from bledot_dash_src import timeseries
+from bledot_dash_src.timeseries import downsample, get_bucket_stats, get_time_series, lttb
+
+
+def power_rows(hours: int, machines: int = 3, seed: int = 0) -> pd.DataFrame:
+    """Power readings of some machines every 10 minutes"""
+    rng = np.random.default_rng(seed)
+    time = pd.date_range("2026-01-01", periods=hours * 6, freq="10min", tz="UTC")
+    return pd.DataFrame({
+        "data_coleta": np.repeat(time, machines),
+        "id_maquina": np.tile(np.arange(machines), len(time)),
+        "instant_power_consumption": rng.normal(20, 5, len(time) * machines),
+    })
+
+
+def test_series_fits_the_point_budget_and_keeps_the_ends(monkeypatch):
+    monkeypatch.setattr(timeseries, "default_max_points", 50)
+    rows = power_rows(hours=24 * 7)
+
+    full = get_time_series(rows, max_points=10**6)
+    series = get_time_series(rows)
+
+    assert len(full) == 24 * 7
+    assert len(series) == 50
+    assert series.index[0] == full.index[0] and series.index[-1] == full.index[-1]
+    assert series.index.is_monotonic_increasing
+    assert series.index.isin(full.index).all()
+
+
+def test_downsampling_keeps_the_envelope():
+    full = get_time_series(power_rows(hours=24 * 7), max_points=10**6)
+    series = downsample(full, 40)
+
+    assert series["min"].min() == full["min"].min()
+    assert series["max"].max() == full["max"].max()
+    # Each kept point covers the points up to the next kept one
+    positions = full.index.get_indexer(series.index)
+    for position, next_position, (_, point) in zip(positions, [*positions[1:], len(full)], series.iterrows()):
+        replaced = full.iloc[position:next_position]
+        assert point["min"] == replaced["min"].min() and point["max"] == replaced["max"].max()
+        assert point["avg"] == full["avg"].iloc[position]
+
+
+def test_lttb_keeps_the_spikes():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[[137, 512, 880]] = [10.0, -10.0, 10.0]
+
+    positions = lttb(x, y, 20)
+
+    assert len(positions) == 20
+    assert positions[0] == 0 and positions[-1] == 999
+    assert {137, 512, 880} <= set(positions)
+    assert (np.diff(positions) > 0).all()
+    assert (lttb(x[:10], y[:10], 20) == np.arange(10)).all()
+
+
+def test_missing_readings_are_skipped():
+    rows = power_rows(hours=3)
+    first_hour = rows["data_coleta"] < rows["data_coleta"].iloc[0] + pd.Timedelta("1h")
+    rows.loc[first_hour, "instant_power_consumption"] = np.nan
+    rows.loc[rows.index[-1], "instant_power_consumption"] = np.nan
+
+    series = get_time_series(rows, bucket="1h")
+    last_hour = rows[rows["data_coleta"] >= rows["data_coleta"].iloc[0] + pd.Timedelta("2h")]
+
+    # The hour without readings is dropped, the others average their readings only
+    assert len(series) == 2
+    assert series["avg"].iloc[-1] == pytest.approx(last_hour["instant_power_consumption"].mean())
+    assert get_bucket_stats(rows, "instant_power_consumption", "1h")["count"].tolist() == [0, 18, 17]
+    assert get_time_series(rows.assign(instant_power_consumption=np.nan)).empty